@@ -0,0 +1,101 @@
+"""Initial schema
+
+Creates the tables as the application uses them. Every statement is
+IF NOT EXISTS, so databases created before the migrations existed can be
+upgraded in place; on those, later revisions bring health_check_logs and
+the indexes up to date. On a fresh database health_check_logs is created
+range-partitioned by checked_at from the start.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";')
+    op.execute('CREATE EXTENSION IF NOT EXISTS "pgcrypto";')
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            full_name VARCHAR NOT NULL,
+            email VARCHAR NOT NULL UNIQUE,
+            password VARCHAR NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            last_login_at TIMESTAMP,
+            refresh_token VARCHAR UNIQUE
+        );
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS monitored_endpoints (
+            id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+            name VARCHAR NOT NULL,
+            http_method VARCHAR NOT NULL DEFAULT 'GET',
+            url VARCHAR NOT NULL,
+            request_headers JSONB,
+            request_body JSONB,
+            check_interval_seconds INTEGER NOT NULL DEFAULT 60,
+            periodic_summary_report INTEGER DEFAULT 60,
+            expected_status_code INTEGER NOT NULL,
+            expected_latency_ms INTEGER,
+            response_validation JSONB,
+            connection_mode VARCHAR NOT NULL DEFAULT 'warm',
+            detection_policy JSONB,
+            is_active BOOLEAN NOT NULL DEFAULT TRUE,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP NOT NULL DEFAULT now(),
+            owner_user_id UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            last_checked_at TIMESTAMP
+        );
+    """)
+    # Columns added after the first deployments
+    op.execute("ALTER TABLE monitored_endpoints ADD COLUMN IF NOT EXISTS connection_mode VARCHAR NOT NULL DEFAULT 'warm';")
+    op.execute("ALTER TABLE monitored_endpoints ADD COLUMN IF NOT EXISTS check_interval_seconds INTEGER NOT NULL DEFAULT 60;")
+    op.execute("ALTER TABLE monitored_endpoints ADD COLUMN IF NOT EXISTS detection_policy JSONB;")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS health_check_logs (
+            id BIGSERIAL NOT NULL,
+            endpoint_id UUID NOT NULL REFERENCES monitored_endpoints (id) ON DELETE CASCADE,
+            checked_at TIMESTAMP NOT NULL DEFAULT now(),
+            is_healthy BOOLEAN NOT NULL,
+            response_time_ms INTEGER,
+            status_code INTEGER,
+            response_body VARCHAR,
+            error_message VARCHAR,
+            dns_ms INTEGER,
+            connect_ms INTEGER,
+            tls_ms INTEGER,
+            ttfb_ms INTEGER,
+            download_ms INTEGER,
+            PRIMARY KEY (id, checked_at)
+        ) PARTITION BY RANGE (checked_at);
+    """)
+    for column in ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "download_ms"):
+        op.execute(f"ALTER TABLE health_check_logs ADD COLUMN IF NOT EXISTS {column} INTEGER;")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS incidents (
+            id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+            endpoint_id UUID NOT NULL REFERENCES monitored_endpoints (id) ON DELETE CASCADE,
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP,
+            initial_error VARCHAR
+        );
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS incidents;")
+    op.execute("DROP TABLE IF EXISTS health_check_logs;")
+    op.execute("DROP TABLE IF EXISTS monitored_endpoints;")
+    op.execute("DROP TABLE IF EXISTS users;")
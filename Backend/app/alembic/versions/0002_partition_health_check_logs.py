@@ -0,0 +1,95 @@
+"""Range-partition an existing health_check_logs table
+
+Databases created before the migrations have a plain health_check_logs
+table. It is renamed to health_check_logs_legacy and attached as the
+partition holding everything before the next day boundary, so no rows
+are copied. A CHECK constraint matching the partition bound is added NOT
+VALID and validated first, outside the migration transaction: the
+validation scan only takes a SHARE UPDATE EXCLUSIVE lock, and ATTACH
+PARTITION then skips its own scan under the exclusive lock. The new parent
+keeps the legacy id sequence. Later partitions are created by
+app.services.log_partitions, and the legacy partition is dropped as a
+whole once retention passes its upper bound. Every database also gets the
+default partition.
+
+Irreversible: downgrading past this revision logs a warning and leaves
+health_check_logs partitioned, which the earlier schema works with as is.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+from sqlalchemy import text
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_LEGACY_RANGE = "health_check_logs_legacy_range"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    relkind = bind.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('health_check_logs');")).scalar()
+    if relkind == "r":
+        _partition_legacy_table(bind)
+    op.execute("CREATE TABLE IF NOT EXISTS health_check_logs_default PARTITION OF health_check_logs DEFAULT;")
+
+
+def _partition_legacy_table(bind) -> None:
+    cutover = bind.execute(text("""
+        SELECT date_trunc('day', greatest(max(checked_at), now()::timestamp)) + interval '1 day'
+        FROM health_check_logs;
+    """)).scalar()
+    bound = f"'{cutover.isoformat(sep=' ')}'"
+
+    # Prove the partition bound up front: adding the constraint NOT VALID is
+    # instant, and VALIDATE scans the table without blocking writes
+    with op.get_context().autocommit_block():
+        bind.execute(text(f"ALTER TABLE health_check_logs DROP CONSTRAINT IF EXISTS {_LEGACY_RANGE};"))
+        bind.execute(text(
+            f"ALTER TABLE health_check_logs ADD CONSTRAINT {_LEGACY_RANGE} "
+            f"CHECK (checked_at IS NOT NULL AND checked_at < {bound}) NOT VALID;"))
+        bind.execute(text(f"ALTER TABLE health_check_logs VALIDATE CONSTRAINT {_LEGACY_RANGE};"))
+
+    bind.execute(text("""
+        DO $$
+        DECLARE
+            seq TEXT;
+        BEGIN
+            ALTER TABLE health_check_logs RENAME TO health_check_logs_legacy;
+            ALTER INDEX IF EXISTS health_check_logs_pkey RENAME TO health_check_logs_legacy_pkey;
+            ALTER INDEX IF EXISTS uq_health_check_logs_endpoint_checked
+                RENAME TO health_check_logs_legacy_endpoint_checked;
+
+            -- Same columns, types and defaults (the id default keeps using the legacy sequence)
+            CREATE TABLE health_check_logs (LIKE health_check_logs_legacy INCLUDING DEFAULTS)
+                PARTITION BY RANGE (checked_at);
+            ALTER TABLE health_check_logs ADD PRIMARY KEY (id, checked_at);
+            ALTER TABLE health_check_logs ADD FOREIGN KEY (endpoint_id)
+                REFERENCES monitored_endpoints (id) ON DELETE CASCADE;
+
+            seq := pg_get_serial_sequence('health_check_logs_legacy', 'id');
+            IF seq IS NOT NULL THEN
+                -- Dropping the legacy partition later must not drop the sequence
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY health_check_logs.id', seq);
+            END IF;
+        END
+        $$;
+    """))
+    # The validated constraint implies the bound, so ATTACH skips its scan; it is redundant afterwards
+    bind.execute(text(
+        f"ALTER TABLE health_check_logs ATTACH PARTITION health_check_logs_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ({bound});"))
+    bind.execute(text(f"ALTER TABLE health_check_logs_legacy DROP CONSTRAINT {_LEGACY_RANGE};"))
+
+
+def downgrade() -> None:
+    logger.warning("Revision 0002 is irreversible: health_check_logs stays partitioned")
@@ -0,0 +1,37 @@
+"""Hot-path indexes for health_check_logs and incidents
+
+The hot queries filter by endpoint_id and read the newest rows first, so
+each table gets a composite index ordered by time descending. An index on
+open incidents serves the consumer's state load, and one on endpoint
+owners serves the per-user listings. All of them are built CONCURRENTLY
+(partition by partition on health_check_logs), so writes keep flowing
+while they build. Uniqueness comes separately, in 0004.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+from app.db.migrate import create_index_concurrently, drop_index_concurrently
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        create_index_concurrently("ix_health_check_logs_endpoint_checked", "health_check_logs", "endpoint_id, checked_at DESC")
+        create_index_concurrently("ix_incidents_endpoint_start", "incidents", "endpoint_id, start_time DESC")
+        create_index_concurrently("ix_incidents_open", "incidents", "endpoint_id", where="end_time IS NULL")
+        create_index_concurrently("ix_monitored_endpoints_owner", "monitored_endpoints", "owner_user_id")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        drop_index_concurrently("ix_monitored_endpoints_owner")
+        drop_index_concurrently("ix_incidents_open")
+        drop_index_concurrently("ix_incidents_endpoint_start")
+        drop_index_concurrently("ix_health_check_logs_endpoint_checked")
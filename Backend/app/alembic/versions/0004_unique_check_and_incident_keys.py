@@ -0,0 +1,63 @@
+"""Unique keys for health check logs and incidents
+
+The consumer's writes are idempotent only if the database enforces one
+log row per (endpoint_id, checked_at) and one incident per
+(endpoint_id, start_time): log inserts use ON CONFLICT DO NOTHING, and
+the NOT EXISTS guard on incidents needs a unique index to hold under
+concurrent writers. Existing duplicates are not removed: the migration
+stops, before changing anything, and names some of them, so they can be
+reviewed and cleaned up by hand. The unique indexes cover the same columns
+as the 0003 indexes, which they replace.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+from sqlalchemy import text
+from app.db.migrate import create_index_concurrently, drop_index_concurrently
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+KEYS = [
+    # (unique index, 0003 index it replaces, table, columns)
+    ("uq_health_check_logs_endpoint_checked", "ix_health_check_logs_endpoint_checked",
+     "health_check_logs", ("endpoint_id", "checked_at")),
+    ("uq_incidents_endpoint_start", "ix_incidents_endpoint_start",
+     "incidents", ("endpoint_id", "start_time")),
+]
+
+
+def check_no_duplicates(table: str, columns: Sequence[str]):
+    key = ", ".join(columns)
+    duplicates = op.get_bind().execute(text(f"""
+        SELECT {key}, count(*) FROM {table}
+        GROUP BY {key} HAVING count(*) > 1
+        LIMIT 5;
+    """)).fetchall()
+    if duplicates:
+        examples = "; ".join(", ".join(str(value) for value in row[:-1]) + f" ({row[-1]} rows)" for row in duplicates)
+        raise RuntimeError(
+            f"{table} has several rows for the same ({key}), e.g. {examples}. "
+            f"Remove or merge them, then run the migration again; nothing was changed."
+        )
+
+
+def upgrade() -> None:
+    for _, _, table, columns in KEYS:
+        check_no_duplicates(table, columns)
+    with op.get_context().autocommit_block():
+        for unique, replaced, table, (key, time) in KEYS:
+            create_index_concurrently(unique, table, f"{key}, {time} DESC", unique=True)
+            drop_index_concurrently(replaced)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for unique, replaced, table, (key, time) in KEYS:
+            create_index_concurrently(replaced, table, f"{key}, {time} DESC")
+            drop_index_concurrently(unique)
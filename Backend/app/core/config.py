@@ -11,6 +11,7 @@ class Settings(BaseSettings):
     PGUSER: Optional[str] = None
     PGPASSWORD: Optional[str] = None
     PGPORT: Optional[int] = 5432
+    DB_AUTO_MIGRATE: bool = False  # run the Alembic migrations to head on startup
 
     KAFKA_BROKER: str = "localhost:9092"
     KAFKA_BROKER_URL: str = "localhost:9092"  # Alias for consistency
@@ -18,12 +19,77 @@ class Settings(BaseSettings):
     KAFKA_PASSWORD: str | None = None
     KAFKA_SECURITY_PROTOCOL: str = "PLAINTEXT"  # PLAINTEXT, SASL_PLAINTEXT, SASL_SSL, SSL
     KAFKA_TOPIC_NAME: str = "api-monitoring-results"
+    KAFKA_TOPIC_PARTITIONS: int = 12  # upper bound on consumer replicas doing work in parallel
+    KAFKA_TOPIC_REPLICATION_FACTOR: int = 1
+    KAFKA_CONSUMER_GROUP_ID: str = "monitoring_consumer_group"
+    KAFKA_CONSUMER_MAX_RECORDS: int = 500  # records fetched per poll across all assigned partitions
+
+    RESULT_TRANSPORT: str = "kafka"  # kafka, memory (producer and consumer in one process), redis (Redis Streams)
+    TRANSPORT_PARTITIONS: int = 12  # partitions of the memory and redis transports
+    MEMORY_TRANSPORT_MAX_PENDING: int = 10000  # publish() waits beyond this
+    REDIS_STREAM_NAME: str = "api-monitoring-results"
+    REDIS_STREAM_GROUP: str = "monitoring_consumer_group"
+    REDIS_STREAM_MAXLEN: int = 100000  # approximate cap per partition stream
+    REDIS_STREAM_LEASE_S: float = 15.0  # partition lease; a batch must be processed within it
     KAFKA_MAX_RETRIES: int = 5
     KAFKA_RETRY_DELAY_S: int = 2
     KAFKA_REQUEST_TIMEOUT_MS: int = 30000
     KAFKA_ENABLE_IDEMPOTENCE: bool = True
     KAFKA_ACKS: str = "all"  # 0, 1, all
     KAFKA_COMPRESSION_TYPE: str = "gzip"  # none, gzip, snappy, lz4, zstd
+    KAFKA_LINGER_MS: int = 20  # let aiokafka accumulate records into larger batches
+    KAFKA_MAX_BATCH_BYTES: int = 256 * 1024  # per-partition batch size in bytes
+    KAFKA_PUBLISH_BATCH_SIZE: int = 500  # results handed to send_batch at once
+    KAFKA_WIRE_FORMAT: str = "binary"  # binary, json (json only while old consumers are still running)
+    KAFKA_SPILL_DIR: str = "kafka-spill"  # local log for results Kafka could not take
+    KAFKA_SPILL_SEGMENT_BYTES: int = 16 * 1024 * 1024
+    KAFKA_SPILL_MAX_BYTES: int = 512 * 1024 * 1024  # oldest segments are dropped beyond this
+    KAFKA_SPILL_FSYNC_EVERY: int = 200  # records between fsyncs (the replay loop also fsyncs)
+    KAFKA_SPILL_REPLAY_INTERVAL_S: float = 2.0
+    KAFKA_RECONNECT_MAX_DELAY_S: float = 60.0  # cap on the backoff between background reconnect attempts
+
+    HEALTH_CHECK_INTERVAL_SECONDS: int = 60
+    HEALTH_CHECK_MAX_CONCURRENCY: int = 200  # global cap on in-flight checks per cycle
+    HEALTH_CHECK_MIN_INTERVAL_SECONDS: int = 10  # floor for per-endpoint check_interval_seconds
+    HEALTH_CHECK_MAX_BODY_BYTES: int = 64 * 1024  # response bytes kept per check; the rest is not read
+    FAILURE_CONFIRM_RECHECKS: int = 3  # immediate rechecks after a failed check, 0 = off
+    FAILURE_CONFIRM_SPACING_S: float = 5.0
+    FAILURE_CONFIRM_MAX_CONCURRENCY: int = 50  # slots reserved for rechecks, separate from regular checks
+    HEALTH_CHECK_REFRESH_SECONDS: int = 5  # how often pending endpoint changes are applied
+    ENDPOINT_REGISTRY_POLL_SECONDS: int = 300  # updated_at poll for writes made outside this process, 0 = off
+    ENDPOINT_REGISTRY_FULL_RELOAD_SECONDS: int = 3600  # full reload to catch external deletes, 0 = off
+    HEALTH_LOG_BATCH_SIZE: int = 500  # rows per multi-row INSERT into health_check_logs
+    HEALTH_LOG_FLUSH_INTERVAL_S: float = 1.0
+    LOG_PARTITION_INTERVAL: str = "day"  # day or week: range partitions of health_check_logs on checked_at
+    LOG_PARTITION_PREMAKE_DAYS: int = 7  # partitions are created this far ahead
+    LOG_RETENTION_DAYS: int = 0  # partitions older than this are dropped, 0 = keep forever
+    LOG_HOT_WINDOW_HOURS: int = 24  # how far back latest-status reads look; older checks count as no data
+    HEALTH_LOG_WRITER: str = "producer"  # producer (batched writer next to the checks), consumer (with incident evaluation)
+    HEALTH_CONSUMER_BATCH_MODE: bool = True  # evaluate each consumed batch with set-based queries
+    CONSUMER_WINDOW_SIZE: int = 20  # recent results kept in memory per endpoint
+    CONSUMER_WINDOW_MAX_ENDPOINTS: int = 100000  # least recently seen endpoints are evicted beyond this
+    THRESHOLD_CACHE_TTL_S: float = 300.0  # consumer's endpoint threshold cache; edits also arrive via NOTIFY
+    THRESHOLD_LISTEN_RETRY_S: float = 5.0
+    CONSUMER_RETRY_BACKOFF_S: float = 2.0  # pause before a batch that failed to commit is redelivered
+    CONSUMER_MAX_ATTEMPTS: int = 5  # a result that keeps failing on its own is dead-lettered (logged, skipped) after this
+    INCIDENT_RECOVERY_CHECKS: int = 2  # consecutive good results that close an open incident
+    BASELINE_JOB_INTERVAL_MINUTES: int = 15  # latency anomaly job against learned baselines, 0 = off
+    BASELINE_LOOKBACK_HOURS: int = 168
+    BASELINE_RECENT_MINUTES: int = 15  # recent median compared with the baseline
+    BASELINE_MIN_RECENT_SAMPLES: int = 5
+    BASELINE_MIN_DAYS: int = 3  # same-hour days needed for an hour-of-day baseline; fewer = all hours
+    BASELINE_Z_THRESHOLD: float = 6.0  # robust standard deviations (1.4826 * MAD) above the baseline
+    BASELINE_MIN_SPREAD_RATIO: float = 0.1  # spread floor as a fraction of the baseline, for very steady endpoints
+
+    HTTP_CLIENT_TIMEOUT_S: float = 10.0
+    HTTP_CLIENT_CONNECT_TIMEOUT_S: float = 5.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 500
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 200
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_S: float = 90.0  # keep idle sockets across a 60s check interval
+    HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST: int = 10
+    HTTP_CLIENT_HTTP2: bool = False  # requires the optional "h2" package
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive connection failures before a host's circuit opens
+    CIRCUIT_BREAKER_PROBE_INTERVAL_S: float = 60.0  # while open, one probe per host per interval
 
     NOTIFY_EMAIL: str | None = None
     NOTIFY_WEBHOOK: str | None = None
@@ -0,0 +1,2 @@
+class ValidationRuleError(ValueError):
+    """Raised when an endpoint's response_validation rules cannot be compiled."""
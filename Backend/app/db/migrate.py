@@ -0,0 +1,105 @@
+"""
+Schema migrations.
+
+alembic.ini is not tracked, so the Alembic config is built here:
+
+    python -m app.db.migrate                    # upgrade to head
+    python -m app.db.migrate upgrade 0002
+    python -m app.db.migrate downgrade 0002
+
+Revision 0002 (partitioning health_check_logs) is irreversible: downgrading
+past it only logs a warning and leaves the table partitioned.
+"""
+import sys
+from pathlib import Path
+from alembic import command, op
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import text
+
+SCRIPT_LOCATION = Path(__file__).resolve().parent.parent / "alembic"
+
+
+def alembic_config() -> AlembicConfig:
+    config = AlembicConfig()
+    config.set_main_option("script_location", str(SCRIPT_LOCATION))
+    return config
+
+
+def run_migrations(revision: str = "head"):
+    """Upgrade the database to the given revision. Blocking: use asyncio.to_thread from async code."""
+    command.upgrade(alembic_config(), revision)
+
+
+def create_index_concurrently(name: str, table: str, columns: str, unique: bool = False, where: str = ""):
+    """
+    Build an index without blocking writes to the table. Call it inside
+    op.get_context().autocommit_block().
+
+    CREATE INDEX CONCURRENTLY is not supported on a partitioned table, so
+    there the index is created ON ONLY the parent (invalid at first), built
+    CONCURRENTLY on each partition that lacks it and attached; the parent
+    becomes valid once every partition is attached, and partitions created
+    later inherit it. A partition's index is named after the partition, so
+    name has to contain the table name. Safe to re-run after an interruption:
+    invalid partition indexes are dropped and rebuilt.
+    """
+    bind = op.get_bind()
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    predicate = f" WHERE {where}" if where else ""
+    partitioned = bind.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table);"), {"table": table}
+    ).scalar()
+    if not partitioned:
+        _drop_invalid_index(name)
+        bind.execute(text(f'CREATE {kind} CONCURRENTLY IF NOT EXISTS "{name}" ON {table} ({columns}){predicate};'))
+        return
+
+    bind.execute(text(f'CREATE {kind} IF NOT EXISTS "{name}" ON ONLY {table} ({columns}){predicate};'))
+    missing = bind.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+          AND NOT EXISTS (
+              SELECT 1
+              FROM pg_inherits attached
+              JOIN pg_index ix ON ix.indexrelid = attached.inhrelid
+              WHERE attached.inhparent = to_regclass(:name) AND ix.indrelid = i.inhrelid
+          );
+    """), {"table": table, "name": name}).scalars().all()
+    for partition in missing:
+        child = name.replace(table, partition, 1)
+        _drop_invalid_index(child)
+        bind.execute(text(
+            f'CREATE {kind} CONCURRENTLY IF NOT EXISTS "{child}" ON "{partition}" ({columns}){predicate};'))
+        bind.execute(text(f'ALTER INDEX "{name}" ATTACH PARTITION "{child}";'))
+
+
+def drop_index_concurrently(name: str):
+    """Drop an index without blocking writes; a partitioned index is dropped with its partitions' indexes in one go."""
+    bind = op.get_bind()
+    partitioned = bind.execute(
+        text("SELECT relkind = 'I' FROM pg_class WHERE oid = to_regclass(:name);"), {"name": name}
+    ).scalar()
+    bind.execute(text(f'DROP INDEX {"" if partitioned else "CONCURRENTLY "}IF EXISTS "{name}";'))
+
+
+def _drop_invalid_index(name: str):
+    # Left behind by an interrupted CREATE INDEX CONCURRENTLY; IF NOT EXISTS would keep it forever
+    bind = op.get_bind()
+    valid = bind.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name);"), {"name": name}
+    ).scalar()
+    if valid is False:
+        bind.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}";'))
+
+
+if __name__ == "__main__":
+    action = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    target = sys.argv[2] if len(sys.argv) > 2 else "head"
+    if action == "upgrade":
+        run_migrations(target)
+    elif action == "downgrade":
+        command.downgrade(alembic_config(), target)
+    else:
+        sys.exit(f"unknown action {action!r}, expected upgrade or downgrade")
@@ -1,7 +1,7 @@
 from uuid import UUID
 from sqlmodel import SQLModel, Field
 from sqlalchemy.dialects.postgresql import UUID as pgUUID, JSONB
-from sqlalchemy import text, TIMESTAMP
+from sqlalchemy import text, TIMESTAMP, Index
 from datetime import datetime
 from typing import Optional, Dict, Any
 
@@ -40,6 +40,10 @@ class Users(SQLModel, table=True):
     refresh_token: Optional[str] = Field(default=None, sa_column_kwargs={"unique": True})
     
 class MonitoredEndpoints(SQLModel, table=True):
+    __tablename__ = "monitored_endpoints"
+    __table_args__ = (
+        Index("ix_monitored_endpoints_owner", "owner_user_id"),
+    )
 
     id: UUID = Field(
         default=None,
@@ -59,8 +63,20 @@ class MonitoredEndpoints(SQLModel, table=True):
     request_body: Optional[Dict[str, Any]] = Field(default=None, sa_type=JSONB)
 
     check_interval_seconds: int = Field(default=60, nullable=False)
+    periodic_summary_report: Optional[int] = Field(default=60, sa_column_kwargs={"server_default": text("60")})
     expected_status_code: int = Field(nullable=False)
+    expected_latency_ms: Optional[int] = None
     response_validation: Optional[Dict[str, Any]] = Field(default=None, sa_type=JSONB)
+    # Per-endpoint incident detection rules (see app.services.detection.DetectionPolicy); NULL = defaults
+    detection_policy: Optional[Dict[str, Any]] = Field(default=None, sa_type=JSONB)
+    # "warm" probes reuse pooled connections, "cold" probes open a fresh one
+    connection_mode: str = Field(
+        default="warm",
+        sa_column_kwargs={
+            "nullable": False,
+            "server_default": text("'warm'")
+        }
+    )
 
     is_active: bool = Field(default=True, nullable=False)
 
@@ -90,8 +106,17 @@ class MonitoredEndpoints(SQLModel, table=True):
 
 
 class HealthCheckLogs(SQLModel, table=True):
+    __tablename__ = "health_check_logs"
+    # Range-partitioned by checked_at (see app.services.log_partitions), so every
+    # unique key, the primary key included, has to contain checked_at.
+    # One row per endpoint and check time; lets the consumer re-insert a redelivered batch safely.
+    # Newest first, matching the latest-N reads per endpoint (migrations 0003 and 0004)
+    __table_args__ = (
+        Index("uq_health_check_logs_endpoint_checked", "endpoint_id", text("checked_at DESC"), unique=True),
+        {"postgresql_partition_by": "RANGE (checked_at)"},
+    )
 
-    id: Optional[int] = Field(default=None, primary_key=True)
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": True})
     endpoint_id: UUID = Field(
         sa_type=pgUUID,
         foreign_key="monitored_endpoints.id",
@@ -100,6 +125,7 @@ class HealthCheckLogs(SQLModel, table=True):
 
     checked_at: datetime = Field(
         default_factory=datetime.utcnow,
+        primary_key=True,
         sa_column_kwargs={
             "nullable": False,
             "server_default": text("now()")
@@ -112,8 +138,21 @@ class HealthCheckLogs(SQLModel, table=True):
     response_body: Optional[str] = None
     error_message: Optional[str] = None
 
+    # Latency breakdown; connection phases are NULL when a keep-alive connection was reused
+    dns_ms: Optional[int] = None
+    connect_ms: Optional[int] = None
+    tls_ms: Optional[int] = None
+    ttfb_ms: Optional[int] = None
+    download_ms: Optional[int] = None
+
 
 class Incidents(SQLModel, table=True):
+    # An incident is identified by its endpoint and start; consumer writes rely on it being unique.
+    # Newest first for the per-endpoint incident history (migrations 0003 and 0004)
+    __table_args__ = (
+        Index("uq_incidents_endpoint_start", "endpoint_id", text("start_time DESC"), unique=True),
+        Index("ix_incidents_open", "endpoint_id", postgresql_where=text("end_time IS NULL")),
+    )
 
     id: UUID = Field(
         default=None,
@@ -10,20 +10,277 @@ logger = get_logger()
 
 
 from app.utils.loggers import get_logger
+import asyncio
+import hashlib
+import json
+import socket
 import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
+import httpcore
 import httpx
-from typing import Optional, Any
-from app.schemas.service import ApiServiceModal, ApiResponseModal
+from typing import Optional, Any, AsyncIterator, Dict, Tuple
+from app.core.config import Config
+from app.schemas.service import ApiServiceModal, ApiResponseModal, PhaseTimingsModal
+from app.utils.response_rules import CompiledValidator, NO_JSON
 
 logger = get_logger()
 
-async def check_api_health(service: ApiServiceModal) -> ApiResponseModal:
+# Timer of the check running in the current task; the network backend reports DNS time to it
+_phase_timer: ContextVar[Optional["PhaseTimer"]] = ContextVar("phase_timer", default=None)
+
+
+class TimedResolverBackend(httpcore.AsyncNetworkBackend):
+    """
+    httpcore network backend that resolves the host itself so the lookup can
+    be timed, then connects to the resolved addresses in order. Each new
+    connection does exactly one DNS lookup. TLS is unaffected: httpcore takes
+    the SNI/verification hostname from the request origin, not from the
+    address it connected to.
+    """
+
+    def __init__(self):
+        self._inner = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        timer = _phase_timer.get()
+        started = time.perf_counter()
+        try:
+            addresses = await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError as e:
+            raise httpcore.ConnectTimeout(f"DNS lookup for {host} timed out") from e
+        except OSError as e:
+            raise httpcore.ConnectError(f"DNS lookup for {host} failed: {e}") from e
+        finally:
+            if timer is not None:
+                timer.resolved(started, time.perf_counter())
+
+        deadline = started + timeout if timeout is not None else None
+        last_error: Optional[Exception] = None
+        for ip in dict.fromkeys(sockaddr[0] for _, _, _, _, sockaddr in addresses):
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                raise httpcore.ConnectTimeout(f"Connecting to {host} timed out")
+            try:
+                return await self._inner.connect_tcp(
+                    ip, port, timeout=remaining, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        raise last_error or httpcore.ConnectError(f"No addresses found for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._inner.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float):
+        await self._inner.sleep(seconds)
+
+
+class TimedTransport(httpx.AsyncHTTPTransport):
+    """httpx transport whose connection pool uses TimedResolverBackend."""
+
+    def __init__(self, limits: httpx.Limits, http2: bool):
+        super().__init__(limits=limits, http2=http2)
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=TimedResolverBackend(),
+        )
+
+
+class HttpClientPool:
+    """
+    Long-lived httpx client shared by all health checks.
+    Keeps connections alive between check cycles so that probes on "warm"
+    endpoints do not pay a TCP+TLS handshake every time. Endpoints configured
+    with connection_mode="cold" get a throwaway client so their latency still
+    includes connection setup. Per-host request limits are enforced by the
+    check engine (see host_guard.HostGuard) before a global slot is taken.
+    """
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.http2 = Config.HTTP_CLIENT_HTTP2
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(Config.HTTP_CLIENT_TIMEOUT_S, connect=Config.HTTP_CLIENT_CONNECT_TIMEOUT_S)
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=Config.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=Config.HTTP_CLIENT_KEEPALIVE_EXPIRY_S,
+        )
+        return httpx.AsyncClient(timeout=self._timeout(), transport=TimedTransport(limits, self.http2))
+
+    async def start(self):
+        """Create the shared client. Called from the application lifespan."""
+        if self.client is not None:
+            return
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP_CLIENT_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+                self.http2 = False
+        self.client = self._build_client()
+        logger.info(f"HTTP client pool started (http2={self.http2})")
+
+    async def close(self):
+        """Close the shared client and drop all pooled connections."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            logger.info("HTTP client pool closed.")
+
+    @asynccontextmanager
+    async def acquire(self, service: ApiServiceModal) -> AsyncIterator[httpx.AsyncClient]:
+        """Yield the client to use for a probe of `service`."""
+        if getattr(service, "connection_mode", "warm") == "cold":
+            async with httpx.AsyncClient(
+                timeout=self._timeout(),
+                transport=TimedTransport(httpx.Limits(max_keepalive_connections=0), self.http2),
+            ) as client:
+                yield client
+            return
+
+        if self.client is None:
+            await self.start()
+        yield self.client
+
+
+http_pool = HttpClientPool()
+
+
+class PhaseTimer:
+    """
+    Collects per-phase timings for one request from httpcore trace events.
+
+    DNS is reported by TimedResolverBackend, which does the connection's only
+    lookup, so connect_ms starts when the lookup ends. Connect and TLS phases
+    are only reported when the request opened a new connection; on a reused
+    keep-alive connection they are None.
+    """
+
+    __slots__ = ("dns_started", "dns_done", "connect_started", "connect_done", "tls_started", "tls_done",
+                 "request_started", "headers_received", "finished")
+
+    def __init__(self):
+        self.dns_started: Optional[float] = None
+        self.dns_done: Optional[float] = None
+        self.connect_started: Optional[float] = None
+        self.connect_done: Optional[float] = None
+        self.tls_started: Optional[float] = None
+        self.tls_done: Optional[float] = None
+        self.request_started: Optional[float] = None
+        self.headers_received: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def resolved(self, started: float, done: float):
+        self.dns_started = started
+        self.dns_done = done
+
+    async def trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.started":
+            self.connect_started = time.perf_counter()
+        elif event_name == "connection.connect_tcp.complete":
+            self.connect_done = time.perf_counter()
+        elif event_name == "connection.start_tls.started":
+            self.tls_started = time.perf_counter()
+        elif event_name == "connection.start_tls.complete":
+            self.tls_done = time.perf_counter()
+        elif event_name.endswith(".send_request_headers.started"):
+            self.request_started = time.perf_counter()
+        elif event_name.endswith(".receive_response_headers.complete"):
+            self.headers_received = time.perf_counter()
+
+    def mark_finished(self):
+        self.finished = time.perf_counter()
+
+    @staticmethod
+    def _ms(begin: Optional[float], end: Optional[float]) -> Optional[int]:
+        if begin is None or end is None:
+            return None
+        return int((end - begin) * 1000)
+
+    def timings(self) -> PhaseTimingsModal:
+        return PhaseTimingsModal(
+            dns_ms=self._ms(self.dns_started, self.dns_done),
+            connect_ms=self._ms(self.dns_done or self.connect_started, self.connect_done),
+            tls_ms=self._ms(self.tls_started, self.tls_done),
+            ttfb_ms=self._ms(self.request_started, self.headers_received),
+            download_ms=self._ms(self.headers_received, self.finished),
+        )
+
+
+async def read_capped_body(response: httpx.Response, max_bytes: int) -> Tuple[bytes, bool]:
+    """
+    Stream at most `max_bytes` of a response body.
+    Returns (captured bytes, truncated). Stops reading as soon as the cap is
+    hit, so a huge payload never sits in memory in full.
+    """
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        if size + len(chunk) > max_bytes:
+            chunks.append(chunk[:max_bytes - size])
+            return b"".join(chunks), True
+        chunks.append(chunk)
+        size += len(chunk)
+    return b"".join(chunks), False
+
+
+def decode_json(raw: bytes) -> Any:
+    """Parse a fully captured body as JSON, or return NO_JSON."""
+    if not raw:
+        return NO_JSON
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return NO_JSON
+
+
+def summarize_body(raw: bytes, truncated: bool, encoding: Optional[str] = None, body_json: Any = NO_JSON) -> dict:
+    """
+    Bounded record of a response body: the captured excerpt (parsed JSON when
+    the whole body was captured and parses, text otherwise) plus a SHA-256 of
+    the captured bytes. Reading stops at the capture limit, so on a truncated
+    body the hash only covers that prefix and changes past it go unnoticed.
+    """
+    if body_json is not NO_JSON:
+        excerpt: Any = body_json
+    elif raw:
+        excerpt = raw.decode(encoding or "utf-8", errors="replace")
+    else:
+        excerpt = None
+
+    return {
+        "excerpt": excerpt,
+        "sha256_captured": hashlib.sha256(raw).hexdigest(),
+        "size_bytes": len(raw),
+        "truncated": truncated,
+    }
+
+
+async def check_api_health(
+    service: ApiServiceModal,
+    pool: HttpClientPool = http_pool,
+    validator: Optional[CompiledValidator] = None,
+) -> ApiResponseModal:
     """
     Perform a single API health check for the given service.
-    Handles various HTTP methods, parses JSON/text responses,
-    measures latency, and returns a structured ApiResponseModal.
-    Always returns response_body as a dict or list.
+    Handles various HTTP methods, streams at most HEALTH_CHECK_MAX_BODY_BYTES
+    of the response, measures latency, and returns a structured ApiResponseModal.
+    response_body is the bounded summary built by summarize_body(). When a
+    compiled validator is given, its failures are returned in validation_errors.
     """
 
     checked_at = datetime.utcnow()
@@ -31,13 +288,20 @@ async def check_api_health(service: ApiServiceModal) -> ApiResponseModal:
     status_code: Optional[int] = None
     response_body: Optional[Any] = None
     error_message: Optional[str] = None
+    validation_errors: Optional[list] = None
     method = (service.http_method or "GET").upper()
     headers = service.request_headers or {}
     body = service.request_body
 
+    timer: Optional[PhaseTimer] = None
+    timer_token = None
+
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=5.0)) as client:
-            request_kwargs: dict[str, Any] = {"headers": headers}
+        async with pool.acquire(service) as client:
+            start_time = time.perf_counter()
+            timer = PhaseTimer()
+            timer_token = _phase_timer.set(timer)
+            request_kwargs: dict[str, Any] = {"headers": headers, "extensions": {"trace": timer.trace}}
 
             if body is not None:
                 if isinstance(body, (dict, list)):
@@ -45,24 +309,16 @@ async def check_api_health(service: ApiServiceModal) -> ApiResponseModal:
                 else:
                     request_kwargs["content"] = str(body)
 
-            response = await client.request(method, str(service.url), **request_kwargs)
-            status_code = response.status_code
-            try:
-                json_data = response.json()
-                json_str = json.dumps(json_data, ensure_ascii=False)
-                if len(json_str) > 100_000:
-                    response_body = {
-                        "_truncated": True,
-                        "preview": json_data 
-                    }
-                else:
-                    response_body = json_data
+            async with client.stream(method, str(service.url), **request_kwargs) as response:
+                status_code = response.status_code
+                raw, truncated = await read_capped_body(response, Config.HEALTH_CHECK_MAX_BODY_BYTES)
+                timer.mark_finished()
+            body_json = NO_JSON if truncated else decode_json(raw)
+            response_body = summarize_body(raw, truncated, response.encoding, body_json)
 
-            except Exception:
-                text = response.text
-                response_body = {
-                    "_raw_text": text[:100_000] + "...[truncated]" if len(text) > 100_000 else text
-                }
+            if validator is not None:
+                body_text = raw.decode(response.encoding or "utf-8", errors="replace") if validator.needs_text else None
+                validation_errors = validator.validate(response.headers, body_json, body_text)
 
     except httpx.TimeoutException:
         error_message = "Request timed out"
@@ -77,7 +333,11 @@ async def check_api_health(service: ApiServiceModal) -> ApiResponseModal:
         logger.exception(f"Unexpected error while hitting {service.name}")
 
     finally:
-        response_time_ms = int((time.perf_counter() - start_time) * 1000)
+        if timer_token is not None:
+            _phase_timer.reset(timer_token)
+        # Stop the clock at the end of the body read, before parsing/validation
+        end_time = timer.finished if timer is not None and timer.finished is not None else time.perf_counter()
+        response_time_ms = int((end_time - start_time) * 1000)
 
     return ApiResponseModal(
         checked_at=checked_at,
@@ -85,5 +345,7 @@ async def check_api_health(service: ApiServiceModal) -> ApiResponseModal:
         status_code=status_code,
         response_body=response_body,
         error_message=error_message,
+        validation_errors=validation_errors,
+        phases=timer.timings() if timer is not None else None,
     )
 
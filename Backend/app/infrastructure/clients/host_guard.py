@@ -0,0 +1,108 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from app.core.config import Config
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    closed    -> every check goes out; `failure_threshold` consecutive
+                 connection-level failures open the circuit.
+    open      -> checks are short-circuited, except that once every
+                 `probe_interval_s` a single probe is let through (half-open).
+    half-open -> the probe's outcome closes the circuit or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    __slots__ = ("host", "failure_threshold", "probe_interval_s", "state", "failures", "opened_at", "short_circuited")
+
+    def __init__(self, host: str, failure_threshold: int, probe_interval_s: float):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.probe_interval_s = probe_interval_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.short_circuited = 0
+
+    def allow(self, claim: bool = True) -> bool:
+        """
+        Whether a check may hit the network now. Claims the probe when
+        half-opening, unless `claim` is False (a check that still has to wait
+        for a host slot only peeks, and claims once it holds one).
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.probe_interval_s:
+            if claim:
+                self.state = self.HALF_OPEN
+            return True
+        self.short_circuited += 1
+        return False
+
+    def release_probe(self):
+        """Give back a probe that ended without an outcome (e.g. cancelled), so the next check probes."""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for host {self.host} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            if self.state == self.CLOSED:
+                logger.warning(f"Circuit for host {self.host} opened after {self.failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class HostGuard:
+    """Per-host concurrency limits and circuit breakers for the check engine."""
+
+    def __init__(self):
+        self.max_per_host = Config.HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST
+        self.failure_threshold = Config.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.probe_interval_s = Config.CIRCUIT_BREAKER_PROBE_INTERVAL_S
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host, self.failure_threshold, self.probe_interval_s)
+            self._breakers[host] = breaker
+        return breaker
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        """Hold one of the host's `max_per_host` concurrent request slots."""
+        semaphore = self._slots.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_host)
+            self._slots[host] = semaphore
+        async with semaphore:
+            yield
+
+    def open_circuits(self) -> Dict[str, int]:
+        """Hosts whose circuit is not closed, with their short-circuited check counts."""
+        return {
+            host: breaker.short_circuited
+            for host, breaker in self._breakers.items()
+            if breaker.state != CircuitBreaker.CLOSED
+        }
+
+
+host_guard = HostGuard()
@@ -0,0 +1,153 @@
+"""
+Wire format for monitoring results.
+
+Version 1 is a fixed little-endian struct, 54 bytes per result:
+
+    B    schema version (1)
+    B    flags: 0x01 is_healthy known, 0x02 is_healthy, 0x04 phases present,
+         0x08 skipped (open circuit, no request made)
+    16s  endpoint id (UUID bytes)
+    q    checked_at, microseconds since the Unix epoch (UTC)
+    i    response_time_ms     (-1 = None)
+    h    status_code          (-1 = None)
+    5i   dns/connect/tls/ttfb/download ms (-1 = None)
+    B    confirm_attempt
+    B    confirm_total
+
+Version 2 is the same struct (with version 2) followed by the fields the
+consumer needs to write the health_check_logs row itself
+(HEALTH_LOG_WRITER=consumer):
+
+    H    error_message length in bytes, then that many UTF-8 bytes
+    I    response_body length in bytes, then that many UTF-8 bytes
+
+Results without a body or error message are still written as version 1.
+
+Messages written before the binary format existed are JSON objects, whose
+first byte is always "{", so decode_result() tells them apart by the first
+byte and still reads them.
+"""
+import json
+import struct
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from uuid import UUID
+from app.schemas.service import ProducerResultModal
+
+WIRE_VERSION = 1
+WIRE_VERSION_LOGS = 2
+_V1 = struct.Struct("<BB16sqih5iBB")
+_V2_LENGTHS = struct.Struct("<HI")
+_JSON_START = ord("{")
+_EPOCH = datetime(1970, 1, 1)
+_PHASES = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "download_ms")
+
+_HEALTH_KNOWN = 0x01
+_HEALTHY = 0x02
+_HAS_PHASES = 0x04
+_SKIPPED = 0x08
+
+
+def _opt(value: Optional[int]) -> int:
+    return -1 if value is None else value
+
+
+def _unopt(value: int) -> Optional[int]:
+    return None if value < 0 else value
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def encode_result(result: ProducerResultModal) -> bytes:
+    """Encode a result in the current binary wire format (version 2 when it carries log fields)."""
+    flags = 0
+    if result.is_healthy is not None:
+        flags |= _HEALTH_KNOWN
+        if result.is_healthy:
+            flags |= _HEALTHY
+    if result.skipped:
+        flags |= _SKIPPED
+    phases = result.phases
+    if phases is not None:
+        flags |= _HAS_PHASES
+        phase_values = (
+            _opt(phases.dns_ms), _opt(phases.connect_ms), _opt(phases.tls_ms),
+            _opt(phases.ttfb_ms), _opt(phases.download_ms),
+        )
+    else:
+        phase_values = (-1, -1, -1, -1, -1)
+
+    error = result.error_message.encode("utf-8")[:0xFFFF] if result.error_message else b""
+    body = result.response_body.encode("utf-8") if result.response_body else b""
+    fixed = _V1.pack(
+        WIRE_VERSION_LOGS if error or body else WIRE_VERSION,
+        flags,
+        result.id.bytes,
+        _to_micros(result.checked_at),
+        _opt(result.response_time_ms),
+        _opt(result.status_code),
+        *phase_values,
+        result.confirm_attempt,
+        result.confirm_total,
+    )
+    if not (error or body):
+        return fixed
+    return b"".join((fixed, _V2_LENGTHS.pack(len(error), len(body)), error, body))
+
+
+def encode_result_json(result: ProducerResultModal) -> bytes:
+    """Legacy JSON encoding, still produced when KAFKA_WIRE_FORMAT=json."""
+    return result.model_dump_json().encode("utf-8")
+
+
+def decode_result(payload: bytes) -> Dict[str, Any]:
+    """
+    Decode a result message into the dict shape the consumer works with.
+    Accepts both the binary format and legacy JSON messages.
+    """
+    if not payload:
+        raise ValueError("Empty monitoring result message")
+    version = payload[0]
+    if version == _JSON_START:
+        return json.loads(payload.decode("utf-8"))
+    if version not in (WIRE_VERSION, WIRE_VERSION_LOGS):
+        raise ValueError(f"Unsupported monitoring result wire version {version}")
+
+    (_, flags, id_bytes, micros, response_time_ms, status_code,
+     dns_ms, connect_ms, tls_ms, ttfb_ms, download_ms,
+     confirm_attempt, confirm_total) = _V1.unpack_from(payload)
+
+    error_message = response_body = None
+    if version == WIRE_VERSION_LOGS:
+        error_len, body_len = _V2_LENGTHS.unpack_from(payload, _V1.size)
+        offset = _V1.size + _V2_LENGTHS.size
+        if error_len:
+            error_message = payload[offset:offset + error_len].decode("utf-8", errors="replace")
+        offset += error_len
+        if body_len:
+            response_body = payload[offset:offset + body_len].decode("utf-8", errors="replace")
+
+    phases = None
+    if flags & _HAS_PHASES:
+        phases = dict(zip(_PHASES, (
+            _unopt(dns_ms), _unopt(connect_ms), _unopt(tls_ms), _unopt(ttfb_ms), _unopt(download_ms),
+        )))
+
+    return {
+        "id": str(UUID(bytes=id_bytes)),
+        "checked_at": _EPOCH + timedelta(microseconds=micros),
+        "response_time_ms": _unopt(response_time_ms),
+        "status_code": _unopt(status_code),
+        "is_healthy": bool(flags & _HEALTHY) if flags & _HEALTH_KNOWN else None,
+        "phases": phases,
+        "confirm_attempt": confirm_attempt,
+        "confirm_total": confirm_total,
+        "skipped": bool(flags & _SKIPPED),
+        "error_message": error_message,
+        "response_body": response_body,
+    }
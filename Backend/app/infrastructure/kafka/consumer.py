@@ -1,34 +1,54 @@
 import asyncio
-import json
-from aiokafka import AIOKafkaConsumer
+from typing import Any, Dict, Iterable, Tuple
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener
 from aiokafka.errors import KafkaError
 from app.core.config import Config
+from app.infrastructure.kafka.codec import decode_result
+from app.infrastructure.transport.base import ResultConsumer
 from app.utils.loggers import get_logger
 
 logger = get_logger()
 
 
-class KafkaConsumerClient:
+class _RebalanceListener(ConsumerRebalanceListener):
+    def __init__(self, client: "KafkaConsumerClient"):
+        self.client = client
+
+    async def on_partitions_revoked(self, revoked):
+        for tp in revoked:
+            self.client._uncommitted.pop(tp, None)
+        self.client._notify_revoked(revoked)
+
+    async def on_partitions_assigned(self, assigned):
+        logger.info(f"Kafka consumer assigned partitions: {sorted(tp.partition for tp in assigned)}")
+
+
+class KafkaConsumerClient(ResultConsumer):
     """Core Kafka consumer — reads and yields messages asynchronously."""
 
     def __init__(self):
         self.consumer = None
         self.topic_name = Config.KAFKA_TOPIC_NAME
         self.broker_url = Config.KAFKA_BROKER_URL
-        self.group_id = "monitoring_consumer_group"
+        self.group_id = Config.KAFKA_CONSUMER_GROUP_ID
+        self.max_records = Config.KAFKA_CONSUMER_MAX_RECORDS
         self.is_connected = False
+        # TopicPartition -> (first offset, last offset, count) of the batch handed out
+        self._uncommitted: Dict[Any, Tuple[int, int, int]] = {}
 
     async def connect(self):
         """Connect to Kafka broker."""
         logger.info(f"Connecting Kafka consumer to broker: {self.broker_url}")
         self.consumer = AIOKafkaConsumer(
-            self.topic_name,
             bootstrap_servers=self.broker_url,
             group_id=self.group_id,
-            enable_auto_commit=True,
+            # Offsets are committed once a batch has been processed (at-least-once)
+            enable_auto_commit=False,
             auto_offset_reset="earliest",
-            value_deserializer=lambda v: json.loads(v.decode("utf-8")),
+            # Binary results, with a fallback for older JSON messages
+            value_deserializer=decode_result,
         )
+        self.consumer.subscribe([self.topic_name], listener=_RebalanceListener(self))
         await self.consumer.start()
         self.is_connected = True
         logger.info(f"Kafka consumer connected and listening to topic: {self.topic_name}")
@@ -42,6 +62,36 @@ class KafkaConsumerClient:
             async for message in self.consumer:
                 logger.info(f"📩 Received message from topic {self.topic_name}: {message.value}")
                 yield message.value
+                await self.consumer.commit()
+        except KafkaError as e:
+            logger.error(f"Kafka error while consuming: {e}", exc_info=True)
+        except Exception as e:
+            logger.error(f"Unexpected consumer error: {e}", exc_info=True)
+        finally:
+            await self.close()
+
+    async def consume_partition_batches(self):
+        """
+        Async generator that yields one poll's worth of messages grouped by
+        partition: {TopicPartition: [value, ...]} with each list in offset order.
+        Callers can work through partitions concurrently; per-endpoint order
+        holds because producers key results by endpoint id.
+        """
+        if not self.consumer or not self.is_connected:
+            await self.connect()
+
+        try:
+            while True:
+                self._rewind_uncommitted()
+                batch = await self.consumer.getmany(timeout_ms=1000, max_records=self.max_records)
+                if not batch:
+                    continue
+                logger.debug(
+                    f"📩 Received {sum(len(r) for r in batch.values())} messages "
+                    f"from {len(batch)} partitions of {self.topic_name}")
+                for tp, records in batch.items():
+                    self._uncommitted[tp] = (records[0].offset, records[-1].offset, len(records))
+                yield {tp: [record.value for record in records] for tp, records in batch.items()}
         except KafkaError as e:
             logger.error(f"Kafka error while consuming: {e}", exc_info=True)
         except Exception as e:
@@ -49,6 +99,31 @@ class KafkaConsumerClient:
         finally:
             await self.close()
 
+    async def commit(self, partitions: Iterable[Any]):
+        """Commit the offsets of the last batch for partitions whose effects are durable."""
+        offsets = {}
+        for tp in partitions:
+            handed_out = self._uncommitted.pop(tp, None)
+            if handed_out is not None:
+                offsets[tp] = handed_out[1] + 1
+        if offsets:
+            await self.consumer.commit(offsets)
+
+    def _rewind_uncommitted(self):
+        """Seek partitions whose last batch was not committed back to its first message."""
+        if not self._uncommitted:
+            return
+        assigned = self.consumer.assignment()
+        for tp, (first_offset, _, count) in self._uncommitted.items():
+            if tp in assigned:
+                self.consumer.seek(tp, first_offset)
+                logger.warning(f"Redelivering {count} uncommitted messages from partition {tp.partition}")
+        self._uncommitted.clear()
+
+    @property
+    def in_flight(self) -> int:
+        return sum(count for _, _, count in self._uncommitted.values())
+
     async def close(self):
         """Gracefully close Kafka connection."""
         if self.consumer and self.is_connected:
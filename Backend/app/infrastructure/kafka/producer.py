@@ -1,15 +1,55 @@
 import asyncio
-from typing import Optional, Dict, Any
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple
 from aiokafka import AIOKafkaProducer
-from aiokafka.errors import KafkaConnectionError, KafkaError
+from aiokafka.errors import (
+    CorruptRecordException, KafkaConnectionError, KafkaError, KafkaTimeoutError, MessageSizeTooLargeError,
+    NodeNotReadyError, RecordListTooLargeError, RecordTooLargeError, RequestTimedOutError,
+)
+from app.infrastructure.kafka.codec import encode_result, encode_result_json
+from app.infrastructure.kafka.spill import SpillLog
+from app.infrastructure.transport.base import ResultPublisher
+from app.utils.batcher import AsyncBatcher
 from app.utils.loggers import get_logger
 from app.core.config import Config
 from app.schemas.service import ProducerResultModal
 
 logger = get_logger()
 
+# Delivery failures that mean the broker is gone rather than a bad record
+_CONNECTION_ERRORS = (KafkaConnectionError, KafkaTimeoutError, NodeNotReadyError, RequestTimedOutError)
+# Failures of the record itself: retrying can never deliver it
+_RECORD_ERRORS = (MessageSizeTooLargeError, RecordTooLargeError, RecordListTooLargeError, CorruptRecordException)
 
-class KafkaProducerClient:
+# Per-record delivery outcomes
+_DELIVERED = "delivered"
+_RETRY = "retry"  # not delivered yet; kept (spilled) and sent again later
+_REJECTED = "rejected"  # permanently undeliverable; dropped
+
+
+def _outcome_of(error: Optional[BaseException]) -> str:
+    if error is None:
+        return _DELIVERED
+    # Errors outside aiokafka come from the record (e.g. serialization), not the broker
+    if isinstance(error, _RECORD_ERRORS) or (isinstance(error, Exception) and not isinstance(error, KafkaError)):
+        return _REJECTED
+    return _RETRY
+
+
+@dataclass
+class BatchSendReport:
+    """Outcome of one send_batch() call."""
+    sent: int = 0
+    failed: List[str] = field(default_factory=list)  # service ids whose delivery failed
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+class KafkaProducerClient(ResultPublisher):
     """
     A robust, production-ready Kafka client for producing messages.
     It handles connection retries, authentication, and provides a clean interface for sending data.
@@ -22,9 +62,28 @@ class KafkaProducerClient:
         self.producer: Optional[AIOKafkaProducer] = None
         self.broker_url = Config.KAFKA_BROKER_URL
         self.topic_name = Config.KAFKA_TOPIC_NAME
+        self.num_partitions = Config.KAFKA_TOPIC_PARTITIONS
         self.max_retries = Config.KAFKA_MAX_RETRIES
         self.retry_delay_s = Config.KAFKA_RETRY_DELAY_S
         self.is_connected = False
+        self.encode = encode_result_json if Config.KAFKA_WIRE_FORMAT == "json" else encode_result
+        # Buffered publishing: publish() enqueues, the batcher hands batches to send_batch()
+        self.publisher: AsyncBatcher[ProducerResultModal] = AsyncBatcher(
+            "kafka_publisher",
+            self._publish_batch,
+            max_size=Config.KAFKA_PUBLISH_BATCH_SIZE,
+            max_delay_s=Config.KAFKA_LINGER_MS / 1000,
+        )
+        self.publish_stats: Dict[str, Any] = {"batches": 0, "sent": 0, "failed": 0, "rejected": 0,
+                                              "last_batch_ms": 0.0}
+        # Results Kafka could not take are spilled to disk and replayed in order
+        self.spill = SpillLog()
+        self.replay_interval_s = Config.KAFKA_SPILL_REPLAY_INTERVAL_S
+        self._replay_task: Optional[asyncio.Task] = None
+        self.reconnect_max_delay_s = Config.KAFKA_RECONNECT_MAX_DELAY_S
+        self._connect_failures = 0
+        self._next_connect_at = 0.0
+        self._connecting = False  # startup attempts in progress; the replay loop leaves reconnecting alone
 
     def _get_producer_config(self) -> Dict[str, Any]:
         """
@@ -37,6 +96,8 @@ class KafkaProducerClient:
             'enable_idempotence': Config.KAFKA_ENABLE_IDEMPOTENCE,
             'acks': Config.KAFKA_ACKS,
             'compression_type': Config.KAFKA_COMPRESSION_TYPE,
+            'linger_ms': Config.KAFKA_LINGER_MS,
+            'max_batch_size': Config.KAFKA_MAX_BATCH_BYTES,
         }
 
         # Add authentication if configured
@@ -53,11 +114,13 @@ class KafkaProducerClient:
 
     async def _ensure_topic_exists(self):
         """
-        Ensure the Kafka topic exists, create it if it doesn't.
-        Simplified version that handles errors gracefully.
+        Ensure the Kafka topic exists with at least KAFKA_TOPIC_PARTITIONS
+        partitions, creating it or adding partitions as needed.
+        Results are keyed by endpoint id, so each endpoint stays on one
+        partition and its results are consumed in order.
         """
         try:
-            from aiokafka.admin import AIOKafkaAdminClient, NewTopic
+            from aiokafka.admin import AIOKafkaAdminClient, NewPartitions, NewTopic
 
             admin_client = AIOKafkaAdminClient(
                 bootstrap_servers=self.broker_url,
@@ -65,51 +128,83 @@ class KafkaProducerClient:
             )
 
             await admin_client.start()
-
-            # Check if topic exists by trying to describe it
             try:
                 metadata = await admin_client.describe_topics([self.topic_name])
-                logger.info(f"Kafka topic '{self.topic_name}' already exists")
-            except Exception:
-                # Topic doesn't exist, create it
-                logger.info(f"Creating Kafka topic: {self.topic_name}")
-                topic = NewTopic(
-                    name=self.topic_name,
-                    num_partitions=1,  # Single partition for simplicity
-                    replication_factor=1
-                )
-                await admin_client.create_topics([topic])
-                logger.info(
-                    f"Kafka topic '{self.topic_name}' created successfully")
-
-            await admin_client.close()
+                topic_meta = metadata[0] if metadata else {}
+                if topic_meta.get("error_code", 0) == 0 and topic_meta.get("partitions"):
+                    current = len(topic_meta["partitions"])
+                    logger.info(f"Kafka topic '{self.topic_name}' already exists with {current} partitions")
+                    if current < self.num_partitions:
+                        # Adding partitions remaps some endpoint keys; results already
+                        # in flight for them may be consumed out of order once.
+                        logger.info(
+                            f"Increasing partitions of '{self.topic_name}' from {current} to {self.num_partitions}")
+                        await admin_client.create_partitions(
+                            {self.topic_name: NewPartitions(total_count=self.num_partitions)})
+                else:
+                    logger.info(f"Creating Kafka topic: {self.topic_name} ({self.num_partitions} partitions)")
+                    topic = NewTopic(
+                        name=self.topic_name,
+                        num_partitions=self.num_partitions,
+                        replication_factor=Config.KAFKA_TOPIC_REPLICATION_FACTOR
+                    )
+                    await admin_client.create_topics([topic])
+                    logger.info(
+                        f"Kafka topic '{self.topic_name}' created successfully")
+            finally:
+                await admin_client.close()
 
         except Exception as e:
             logger.warning(
                 f"Could not ensure topic exists: {e}. Topic may need to be created manually.")
             # Don't fail the connection if topic creation fails
 
+    async def _start_producer(self):
+        """Create and start one AIOKafkaProducer; raises if the broker is unreachable."""
+        config = self._get_producer_config()
+        logger.debug(f"Kafka producer config: {config}")
+        producer = AIOKafkaProducer(**config)
+        try:
+            await producer.start()
+        except Exception:
+            try:
+                await producer.stop()  # release the half-started client
+            except Exception:
+                pass
+            raise
+        self.producer = producer
+        self.is_connected = True
+
     async def connect(self):
         """
         Initializes and starts the Kafka producer with a robust retry mechanism.
         This is essential for production startups where services may start in any order.
+        Publishing works from the start: until Kafka is reachable results are
+        spilled to disk, and the background replay loop keeps reconnecting.
         """
         logger.info(
             f"Attempting to connect to Kafka broker at {self.broker_url}...")
         logger.info(
             f"Kafka configuration: topic={self.topic_name}, max_retries={self.max_retries}")
 
+        await asyncio.to_thread(self.spill.open)
+        await self.publisher.start()
+        if self._replay_task is None:
+            self._replay_task = asyncio.create_task(self._replay_loop())
+
+        self._connecting = True
+        try:
+            await self._connect_with_retries()
+        finally:
+            self._connecting = False
+
+    async def _connect_with_retries(self):
         # Ensure topic exists before connecting producer
         await self._ensure_topic_exists()
 
         for attempt in range(self.max_retries):
             try:
-                config = self._get_producer_config()
-                logger.debug(f"Kafka producer config: {config}")
-
-                self.producer = AIOKafkaProducer(**config)
-                await self.producer.start()
-                self.is_connected = True
+                await self._start_producer()
                 logger.info("Kafka producer connected successfully.")
                 return  # Exit the loop on success
             except (KafkaConnectionError, KafkaError) as e:
@@ -120,8 +215,7 @@ class KafkaProducerClient:
                 if attempt + 1 == self.max_retries:
                     logger.error(
                         f"All Kafka connection attempts failed. Broker URL: {self.broker_url}")
-                    logger.error("Application startup will fail.")
-                    # Re-raise the final exception to halt application startup
+                    logger.error("Results are spilled to disk; reconnecting in the background.")
                     raise
                 await asyncio.sleep(self.retry_delay_s)
             except Exception as e:
@@ -131,58 +225,248 @@ class KafkaProducerClient:
                     raise
                 await asyncio.sleep(self.retry_delay_s)
 
+    async def _reconnect(self) -> bool:
+        """One background connection attempt, backing off exponentially between failures."""
+        if self._connecting or time.monotonic() < self._next_connect_at:
+            return False
+        if self.producer is not None:
+            # Drop the client that lost the broker before starting a fresh one
+            stale, self.producer = self.producer, None
+            try:
+                await stale.stop()
+            except Exception:
+                pass
+        try:
+            await self._ensure_topic_exists()
+            await self._start_producer()
+        except Exception as e:
+            self._connect_failures += 1
+            delay = min(self.retry_delay_s * 2 ** self._connect_failures, self.reconnect_max_delay_s)
+            self._next_connect_at = time.monotonic() + delay
+            logger.warning(f"Kafka reconnect failed ({e}); next attempt in {delay:.0f}s")
+            return False
+        self._connect_failures = 0
+        logger.info("Kafka producer reconnected; replaying spilled results.")
+        return True
+
+    def _connection_lost(self, error: BaseException):
+        """Route publishing to the spill log and let the replay loop reconnect."""
+        if self.is_connected:
+            logger.warning(f"Kafka connection lost ({error}); spilling results and reconnecting in the background")
+        self.is_connected = False
+
     async def close(self):
         """Stops the Kafka producer connection gracefully."""
-        if self.producer and self.is_connected:
-            logger.info("Closing Kafka producer connection...")
-            try:
+        logger.info("Closing Kafka producer connection...")
+        try:
+            if self._replay_task is not None:
+                self._replay_task.cancel()
+                try:
+                    await self._replay_task
+                except asyncio.CancelledError:
+                    pass
+                self._replay_task = None
+            # Deliver (or spill) whatever is still buffered before stopping
+            await self.publisher.close()
+            if self.producer is not None:
                 await self.producer.stop()
-                self.is_connected = False
-                logger.info("Kafka producer closed successfully.")
+            await asyncio.to_thread(self.spill.close)
+            self.is_connected = False
+            logger.info("Kafka producer closed successfully.")
+        except Exception as e:
+            logger.error(
+                f"Error closing Kafka producer: {e}", exc_info=True)
+
+    async def _send_records(self, records: List[Tuple[bytes, bytes]]) -> List[str]:
+        """
+        Hand (key, value) records to aiokafka and wait for all deliveries.
+
+        send() only enqueues a record, so linger_ms/max_batch_size can pack
+        them into large batches; the delivery futures are then awaited
+        together. Returns one delivery outcome per record, in order.
+        """
+        futures = []
+        errors: List[Optional[BaseException]] = []
+        for key, value in records:
+            try:
+                futures.append(await self.producer.send(self.topic_name, value, key=key))
+                errors.append(None)
             except Exception as e:
-                logger.error(
-                    f"Error closing Kafka producer: {e}", exc_info=True)
+                logger.error(f"Failed to enqueue Kafka message for key {key.decode('utf-8', 'replace')}: {e}")
+                futures.append(None)
+                errors.append(e)
+
+        outcomes = iter(await asyncio.gather(*(f for f in futures if f is not None), return_exceptions=True))
+        for index, future in enumerate(futures):
+            if future is not None:
+                outcome = next(outcomes)
+                if isinstance(outcome, BaseException):
+                    errors[index] = outcome
+        lost = next((e for e in errors if isinstance(e, _CONNECTION_ERRORS)), None)
+        if lost is not None:
+            self._connection_lost(lost)
+        return [_outcome_of(error) for error in errors]
 
-    async def send_result(self, result: ProducerResultModal) -> bool:
+    async def _send_in_key_order(self, records: List[Tuple[bytes, bytes]]) -> List[str]:
         """
-        Serializes a Pydantic model and sends it to the Kafka topic.
+        Deliver records so that no record goes out before the previous record
+        with the same key was delivered. Records with distinct keys are sent
+        together; a key that repeats within the batch (e.g. a confirmation
+        recheck) waits for the next round. Once a record fails, the later
+        records with its key are not sent and are to be retried, so the
+        caller spills them behind it and the endpoint's order holds. A
+        rejected record is never delivered, so it holds back nothing.
+        """
+        outcomes = [_RETRY] * len(records)
+        rounds: List[List[int]] = []
+        depth: Dict[bytes, int] = {}
+        for index, (key, _) in enumerate(records):
+            level = depth.get(key, 0)
+            depth[key] = level + 1
+            if level == len(rounds):
+                rounds.append([])
+            rounds[level].append(index)
+
+        failed_keys = set()
+        for indexes in rounds:
+            if not self.is_connected:
+                break  # the broker went away; the rest is spilled
+            indexes = [i for i in indexes if records[i][0] not in failed_keys]
+            if not indexes:
+                continue
+            round_outcomes = await self._send_records([records[i] for i in indexes])
+            for i, outcome in zip(indexes, round_outcomes):
+                outcomes[i] = outcome
+                if outcome == _RETRY:
+                    failed_keys.add(records[i][0])
+        return outcomes
 
-        Args:
-            result (ProducerResultModal): The data to send.
+    def _drop_rejected(self, records: List[Tuple[bytes, bytes]]):
+        """Give up on records Kafka can never take, so they do not block the ones behind them."""
+        self.publish_stats["rejected"] += len(records)
+        keys = sorted({key.decode("utf-8", "replace") for key, _ in records})
+        logger.critical(
+            f"ALERT: Kafka permanently rejected {len(records)} results; dropped them "
+            f"(endpoints: {', '.join(keys)}, sizes: {[len(value) for _, value in records]} bytes)")
+
+    def _to_record(self, result: ProducerResultModal) -> Tuple[bytes, bytes]:
+        # Service ID is the key so one endpoint's results stay on one partition
+        return str(result.id).encode('utf-8'), self.encode(result)
+
+    async def send_batch(self, results: List[ProducerResultModal]) -> BatchSendReport:
+        """
+        Publish many results without waiting for each broker round trip.
+        Idempotence and acks from the producer config still apply per record.
 
         Returns:
-            bool: True if message was sent successfully, False otherwise.
+            BatchSendReport: how many records were delivered and which failed.
         """
+        report = BatchSendReport()
+        if not results:
+            return report
         if not self.producer or not self.is_connected:
-            logger.error("Producer not connected. Cannot send message.")
-            return False
+            logger.error("Producer not connected. Cannot send batch.")
+            report.failed = [str(result.id) for result in results]
+            return report
 
-        try:
-            # Serialize the Pydantic model to a JSON string, then encode to bytes
-            message_json = result.model_dump_json()
-            message_bytes = message_json.encode('utf-8')
-
-            # Send with delivery report callback for better error handling
-            future = await self.producer.send_and_wait(
-                self.topic_name,
-                message_bytes,
-                # Use service ID as key for partitioning
-                key=str(result.id).encode('utf-8')
-            )
+        start = time.perf_counter()
+        outcomes = await self._send_in_key_order([self._to_record(result) for result in results])
+        for result, outcome in zip(results, outcomes):
+            if outcome == _DELIVERED:
+                report.sent += 1
+            else:
+                report.failed.append(str(result.id))
 
-            logger.info(
-                f"Successfully sent message for service {result.id} to topic {self.topic_name}")
-            return True
+        report.elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        if report.failed:
+            logger.warning(
+                f"Kafka batch: {report.sent} delivered, {len(report.failed)} failed in {report.elapsed_ms} ms")
+        else:
+            logger.debug(f"Kafka batch: {report.sent} delivered in {report.elapsed_ms} ms")
+        return report
 
-        except KafkaError as e:
-            logger.error(
-                f"Kafka error sending message for service {result.id}: {e}", exc_info=True)
-            return False
-        except Exception as e:
-            # This will catch serialization errors or other unexpected failures
-            logger.error(
-                f"Failed to send Kafka message for service {result.id}: {e}", exc_info=True)
-            return False
+    async def publish(self, result: ProducerResultModal):
+        """Queue a result for batched delivery through send_batch()."""
+        await self.publisher.add(result)
+
+    async def _publish_batch(self, results: List[ProducerResultModal]):
+        records = [self._to_record(result) for result in results]
+        # While older results are still on disk, new ones queue behind them to keep order
+        if self.spill.has_backlog or not self.producer or not self.is_connected:
+            for key, value in records:
+                await self.spill.append(key, value)
+            self.publish_stats["batches"] += 1
+            return
+
+        start = time.perf_counter()
+        outcomes = await self._send_in_key_order(records)
+        failed = 0
+        for record, outcome in zip(records, outcomes):
+            if outcome == _RETRY:
+                await self.spill.append(*record)
+                failed += 1
+        if failed:
+            logger.warning(f"Kafka batch: {failed}/{len(records)} results failed, spilled to disk")
+        rejected = [record for record, outcome in zip(records, outcomes) if outcome == _REJECTED]
+        if rejected:
+            self._drop_rejected(rejected)
+        self.publish_stats["batches"] += 1
+        self.publish_stats["sent"] += outcomes.count(_DELIVERED)
+        self.publish_stats["failed"] += failed
+        self.publish_stats["last_batch_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    async def _replay_loop(self):
+        """(Re)connect to Kafka when needed and drain the spill log in order once it accepts records."""
+        while True:
+            await asyncio.sleep(self.replay_interval_s)
+            try:
+                await self.spill.flush()
+                if not self.is_connected and not await self._reconnect():
+                    continue
+                if self.spill.has_backlog:
+                    await self.replay_spill()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Kafka spill replay failed: {e}", exc_info=True)
+
+    async def replay_spill(self) -> int:
+        """
+        Replay spilled results oldest-first, one batch at a time. Stops at the
+        first batch with a record to retry and retries it next pass, so
+        a replayed batch may reach Kafka more than once, but records with the
+        same key never go out ahead of an undelivered earlier one. Records
+        Kafka permanently rejects are dropped, so they cannot block the log.
+
+        Returns:
+            int: number of results replayed.
+        """
+        if not self.producer or not self.is_connected:
+            return 0
+        replayed = 0
+        start = time.perf_counter()
+        while self.spill.has_backlog:
+            records, position = await self.spill.read_batch(Config.KAFKA_PUBLISH_BATCH_SIZE)
+            if not records:
+                break
+            outcomes = await self._send_in_key_order(records)
+            if _RETRY in outcomes:
+                logger.warning(
+                    f"Kafka spill replay stalled: {outcomes.count(_RETRY)}/{len(records)} not delivered, "
+                    f"{self.spill.stats['backlog_records']} results still on disk")
+                break
+            rejected = [record for record, outcome in zip(records, outcomes) if outcome == _REJECTED]
+            if rejected:
+                self._drop_rejected(rejected)
+            await self.spill.commit(position)
+            replayed += len(records) - len(rejected)
+        if replayed:
+            elapsed_s = time.perf_counter() - start
+            self.spill.note_replay_rate(replayed, elapsed_s)
+            logger.info(
+                f"Replayed {replayed} spilled results in {elapsed_s:.2f}s "
+                f"({self.spill.stats['backlog_records']} left)")
+        return replayed
 
     async def health_check(self) -> bool:
         """
@@ -0,0 +1,300 @@
+import asyncio
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from app.core.config import Config
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+# length of value, crc32 of key+value, length of key
+_HEADER = struct.Struct("<IIH")
+_SEGMENT_SUFFIX = ".seg"
+_CURSOR_FILE = "cursor"
+
+
+class SpillPosition(NamedTuple):
+    """Cursor after a read_batch(), plus what the batch consumed from each segment."""
+    seq: int
+    offset: int
+    consumed: Dict[int, Tuple[int, int]]  # segment -> (records, bytes)
+
+
+class SpillLog:
+    """
+    Append-only, segment-based local log for results Kafka could not take.
+
+    Records are appended to numbered segment files and fsync'ed in batches
+    (every `fsync_every` records or on flush()). Replay reads segments
+    through mmap in append order and persists a (segment, offset) cursor so
+    that a restart resumes where it stopped; fully replayed segments are
+    deleted. Total disk usage is capped at `max_bytes` by dropping the
+    oldest segments.
+
+    The async methods run on the event loop, so fsyncs, segment reads,
+    deletions and cursor writes go through asyncio.to_thread, serialized by
+    a lock. Pending records and bytes are counted per segment, so dropping
+    a segment never has to read it.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or Config.KAFKA_SPILL_DIR)
+        self.segment_bytes = Config.KAFKA_SPILL_SEGMENT_BYTES
+        self.max_bytes = Config.KAFKA_SPILL_MAX_BYTES
+        self.fsync_every = Config.KAFKA_SPILL_FSYNC_EVERY
+        self._file = None
+        self._active_seq = 0
+        self._active_size = 0
+        self._unsynced = 0
+        self._cursor: Tuple[int, int] = (0, 0)
+        # Records / bytes not yet replayed, per segment from the cursor on
+        self._pending: Dict[int, List[int]] = {}
+        self._lock = asyncio.Lock()
+        self._opened = False
+        self.stats: Dict[str, Any] = {
+            "backlog_records": 0,
+            "backlog_bytes": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "dropped": 0,
+            "last_replay_rate": 0.0,  # records per second of the last replay pass
+        }
+
+    # ----------------------------
+    # Segments
+    # ----------------------------
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{seq:012d}{_SEGMENT_SUFFIX}"
+
+    def _segments(self) -> List[int]:
+        return sorted(int(p.stem) for p in self.directory.glob(f"*{_SEGMENT_SUFFIX}"))
+
+    def open(self):
+        """Create the directory, load the cursor and count what is still pending (blocking; startup only)."""
+        if self._opened:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        cursor_path = self.directory / _CURSOR_FILE
+        if cursor_path.exists():
+            seq, offset = cursor_path.read_text().split()
+            self._cursor = (int(seq), int(offset))
+
+        segments = self._segments()
+        for seq in segments:
+            if seq < self._cursor[0]:
+                self._segment_path(seq).unlink(missing_ok=True)
+        segments = [seq for seq in segments if seq >= self._cursor[0]]
+        if not segments:
+            self._cursor = (max(self._cursor[0], 1), 0)
+            segments = [self._cursor[0]]
+        elif self._cursor[0] < segments[0]:
+            self._cursor = (segments[0], 0)
+
+        self._pending = {}
+        for seq in segments:
+            path = self._segment_path(seq)
+            start = self._cursor[1] if seq == self._cursor[0] else 0
+            # Only intact records count: replay stops at a torn or corrupt record
+            records, end = 0, start
+            if path.exists():
+                for _, _, end in self._scan(path, start):
+                    records += 1
+            self._pending[seq] = [records, end - start]
+            if seq == segments[-1] and path.exists() and path.stat().st_size > end:
+                # Appending after a bad tail would hide every later record from replay
+                logger.warning(f"Spill log segment {path.name} has a torn or corrupt tail; truncating it at {end}")
+                os.truncate(path, end)
+        self._refresh_backlog()
+
+        self._active_seq = segments[-1]
+        self._file = open(self._segment_path(self._active_seq), "ab")
+        self._active_size = self._file.tell()
+        self._opened = True
+        if self.stats["backlog_records"]:
+            logger.warning(
+                f"Spill log has {self.stats['backlog_records']} unsent results "
+                f"({self.stats['backlog_bytes']} bytes) from a previous run")
+
+    def _refresh_backlog(self):
+        self.stats["backlog_records"] = sum(records for records, _ in self._pending.values())
+        self.stats["backlog_bytes"] = sum(size for _, size in self._pending.values())
+
+    def _fsync(self, file):
+        os.fsync(file.fileno())
+
+    async def _sync(self):
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            self._unsynced = 0
+            await asyncio.to_thread(self._fsync, self._file)
+
+    async def _roll(self):
+        await self._sync()
+        previous = self._file
+        self._active_seq += 1
+        self._file = await asyncio.to_thread(open, self._segment_path(self._active_seq), "ab")
+        self._active_size = 0
+        self._pending[self._active_seq] = [0, 0]
+        previous.close()
+
+    def _write_cursor(self, seq: int, offset: int, drop: List[int]):
+        for done in drop:
+            self._segment_path(done).unlink(missing_ok=True)
+        tmp = self.directory / f"{_CURSOR_FILE}.tmp"
+        tmp.write_text(f"{seq} {offset}")
+        os.replace(tmp, self.directory / _CURSOR_FILE)
+
+    async def _advance_cursor(self, seq: int, offset: int, drop: List[int] = ()):
+        """Move the cursor, deleting the segments in `drop`, off the event loop."""
+        self._cursor = (seq, offset)
+        for done in drop:
+            self._pending.pop(done, None)
+        await asyncio.to_thread(self._write_cursor, seq, offset, list(drop))
+
+    async def _enforce_limit(self):
+        """Drop the oldest segments while the log is over its disk budget."""
+        while self.stats["backlog_bytes"] > self.max_bytes:
+            oldest = self._cursor[0]
+            if oldest >= self._active_seq:
+                break
+            dropped, size = self._pending.get(oldest, (0, 0))
+            await self._advance_cursor(oldest + 1, 0, drop=[oldest])
+            self.stats["dropped"] += dropped
+            self.stats["backlog_records"] -= dropped
+            self.stats["backlog_bytes"] -= size
+            logger.error(f"Spill log over {self.max_bytes} bytes: dropped segment {oldest} ({dropped} results)")
+
+    @staticmethod
+    def _scan(path: Path, start: int = 0, limit: Optional[int] = None):
+        """Yield (key, value, end offset) for complete, intact records from `start`."""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= start:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                offset = start
+                count = 0
+                while offset + _HEADER.size <= size and (limit is None or count < limit):
+                    value_len, crc, key_len = _HEADER.unpack_from(view, offset)
+                    body_start = offset + _HEADER.size
+                    end = body_start + key_len + value_len
+                    if end > size:
+                        break  # torn/partial tail write
+                    body = view[body_start:end]
+                    if zlib.crc32(body) != crc:
+                        logger.error(f"Spill log record at {path.name}:{offset} is corrupt; skipping the rest of the segment")
+                        break
+                    yield body[:key_len], body[key_len:], end
+                    offset = end
+                    count += 1
+
+    def _read(self, seq: int, offset: int, max_records: int):
+        """Read records from (seq, offset) on; runs in a worker thread."""
+        records: List[Tuple[bytes, bytes]] = []
+        consumed: Dict[int, Tuple[int, int]] = {}
+        while len(records) < max_records and seq <= self._active_seq:
+            path = self._segment_path(seq)
+            if path.exists():
+                count, size = 0, 0
+                for key, value, end in self._scan(path, offset, max_records - len(records)):
+                    records.append((key, value))
+                    count += 1
+                    size += end - offset
+                    offset = end
+                if count:
+                    consumed[seq] = (count, size)
+                if len(records) >= max_records or seq == self._active_seq:
+                    break
+            seq, offset = seq + 1, 0
+        return records, SpillPosition(seq, offset, consumed)
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    @property
+    def has_backlog(self) -> bool:
+        return self.stats["backlog_records"] > 0
+
+    async def append(self, key: bytes, value: bytes):
+        """Append one record; fsync happens every `fsync_every` records or on flush()."""
+        if not self._opened:
+            await asyncio.to_thread(self.open)
+        body = key + value
+        record = _HEADER.pack(len(value), zlib.crc32(body), len(key)) + body
+        async with self._lock:
+            if self._active_size and self._active_size + len(record) > self.segment_bytes:
+                await self._roll()
+            self._file.write(record)
+            self._active_size += len(record)
+            self._unsynced += 1
+            pending = self._pending.setdefault(self._active_seq, [0, 0])
+            pending[0] += 1
+            pending[1] += len(record)
+            self.stats["spilled"] += 1
+            self.stats["backlog_records"] += 1
+            self.stats["backlog_bytes"] += len(record)
+            if self._unsynced >= self.fsync_every:
+                await self._sync()
+            await self._enforce_limit()
+
+    async def flush(self):
+        """Flush and fsync pending appends off the event loop."""
+        async with self._lock:
+            await self._sync()
+
+    async def read_batch(self, max_records: int) -> Tuple[List[Tuple[bytes, bytes]], SpillPosition]:
+        """
+        Read up to `max_records` records from the cursor, in append order.
+        Returns the records and the position after them; pass that position
+        to commit() once the records have been delivered.
+        """
+        if not self._opened:
+            await asyncio.to_thread(self.open)
+        async with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            seq, offset = self._cursor
+            return await asyncio.to_thread(self._read, seq, offset, max_records)
+
+    async def commit(self, position: SpillPosition):
+        """Advance the cursor past delivered records and delete finished segments."""
+        async with self._lock:
+            if position.seq < self._cursor[0]:
+                return  # the segments were dropped over the size limit in the meantime
+            delivered = 0
+            for seq, (records, size) in position.consumed.items():
+                pending = self._pending.get(seq)
+                if pending is None:
+                    continue
+                pending[0] = max(pending[0] - records, 0)
+                pending[1] = max(pending[1] - size, 0)
+                delivered += records
+            finished = [seq for seq in range(self._cursor[0], position.seq) if seq != self._active_seq]
+            await self._advance_cursor(position.seq, position.offset, drop=finished)
+            self.stats["replayed"] += delivered
+            self._refresh_backlog()
+
+            # Fully drained: start a fresh segment so the old one can go
+            if not self.has_backlog and self._active_size:
+                previous = self._active_seq
+                await self._roll()
+                await self._advance_cursor(self._active_seq, 0, drop=[previous])
+                self._refresh_backlog()
+
+    def close(self):
+        """Fsync and close the active segment (blocking; run it off the loop)."""
+        if self._file is not None:
+            if self._unsynced:
+                self._file.flush()
+                self._fsync(self._file)
+                self._unsynced = 0
+            self._file.close()
+            self._file = None
+        self._opened = False
+
+    def note_replay_rate(self, records: int, elapsed_s: float):
+        if elapsed_s > 0:
+            self.stats["last_replay_rate"] = round(records / elapsed_s, 1)
@@ -0,0 +1,75 @@
+"""
+Result transport interface.
+
+The producer publishes ProducerResultModal results; the health consumer
+reads them back as the dicts produced by codec.decode_result(). Every
+backend (Kafka, in-process queue, Redis Streams) provides the same
+delivery semantics:
+
+* Results are spread over partitions by endpoint id, so all results for one
+  endpoint land in one partition and are delivered in publish order.
+* consume_partition_batches() yields {partition: [result, ...]}; lists are
+  in order and partitions may be processed concurrently.
+* Delivery is at-least-once: the caller acknowledges partitions with
+  commit() once their effects are durable. Partitions of a batch that were
+  not committed when the next batch is requested are redelivered from their
+  first uncommitted result, and a crash redelivers everything uncommitted.
+* `in_flight` counts results handed out but not yet committed.
+"""
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+from app.schemas.service import ProducerResultModal
+
+
+def partition_for(key: bytes, partitions: int) -> int:
+    """Stable partition for an endpoint key (same in every process)."""
+    return zlib.crc32(key) % partitions
+
+
+class ResultPublisher(ABC):
+    """Producer side of a result transport."""
+
+    @abstractmethod
+    async def connect(self):
+        ...
+
+    @abstractmethod
+    async def close(self):
+        """Deliver or persist anything still buffered, then disconnect."""
+
+    @abstractmethod
+    async def publish(self, result: ProducerResultModal):
+        """Queue one result for delivery."""
+
+
+class ResultConsumer(ABC):
+    """Consumer side of a result transport."""
+
+    _revoke_listener: Optional[Callable[[List[Any]], None]] = None
+
+    def on_partitions_revoked(self, listener: Callable[[List[Any]], None]):
+        """Register a callback for partitions this consumer stops owning (rebalance)."""
+        self._revoke_listener = listener
+
+    def _notify_revoked(self, partitions: Iterable[Any]):
+        partitions = list(partitions)
+        if partitions and self._revoke_listener is not None:
+            self._revoke_listener(partitions)
+
+    @abstractmethod
+    def consume_partition_batches(self) -> AsyncIterator[Dict[Any, List[Dict[str, Any]]]]:
+        """Yield batches of decoded results grouped by partition (see module docstring)."""
+
+    @abstractmethod
+    async def commit(self, partitions: Iterable[Any]):
+        """Acknowledge the last yielded batch for these partitions."""
+
+    @property
+    @abstractmethod
+    def in_flight(self) -> int:
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
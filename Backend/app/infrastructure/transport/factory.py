@@ -0,0 +1,42 @@
+from app.core.config import Config
+from app.infrastructure.transport.base import ResultConsumer, ResultPublisher
+
+TRANSPORTS = ("kafka", "memory", "redis")
+
+
+def _transport_name() -> str:
+    name = Config.RESULT_TRANSPORT.lower()
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown RESULT_TRANSPORT '{Config.RESULT_TRANSPORT}', expected one of {TRANSPORTS}")
+    return name
+
+
+def uses_in_process_consumer() -> bool:
+    """The in-memory transport only works when the API process also runs the health consumer."""
+    return _transport_name() == "memory"
+
+
+def get_result_publisher() -> ResultPublisher:
+    """Publisher for the configured RESULT_TRANSPORT (imported lazily so unused backends stay optional)."""
+    name = _transport_name()
+    if name == "memory":
+        from app.infrastructure.transport.memory import memory_transport
+        return memory_transport
+    if name == "redis":
+        from app.infrastructure.transport.redis_streams import redis_transport
+        return redis_transport
+    from app.infrastructure.kafka.producer import producer_client
+    return producer_client
+
+
+def get_result_consumer() -> ResultConsumer:
+    """Consumer for the configured RESULT_TRANSPORT."""
+    name = _transport_name()
+    if name == "memory":
+        from app.infrastructure.transport.memory import memory_transport
+        return memory_transport
+    if name == "redis":
+        from app.infrastructure.transport.redis_streams import RedisStreamsTransport
+        return RedisStreamsTransport()
+    from app.infrastructure.kafka.consumer import KafkaConsumerClient
+    return KafkaConsumerClient()
@@ -0,0 +1,94 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List
+from app.core.config import Config
+from app.infrastructure.kafka.codec import decode_result, encode_result
+from app.infrastructure.transport.base import ResultConsumer, ResultPublisher, partition_for
+from app.schemas.service import ProducerResultModal
+
+
+class MemoryTransport(ResultPublisher, ResultConsumer):
+    """
+    In-process transport for single-process deployments: the producer and
+    the health consumer run in the same event loop and share this object.
+
+    Results go through the binary codec so the consumer sees exactly what
+    it would get from Kafka. publish() waits while `max_pending` results
+    are queued (back-pressure on the check engine). Results stay queued
+    until committed; they are lost if the process dies, which is the
+    trade-off for not running a broker.
+    """
+
+    def __init__(self):
+        self.partitions = Config.TRANSPORT_PARTITIONS
+        self.max_pending = Config.MEMORY_TRANSPORT_MAX_PENDING
+        self.max_records = Config.KAFKA_CONSUMER_MAX_RECORDS
+        self._queues: List[Deque[bytes]] = [deque() for _ in range(self.partitions)]
+        self._pending = 0
+        self._uncommitted: Dict[int, int] = {}  # partition -> results handed out, not yet committed
+        self._available = asyncio.Event()  # something is queued
+        self._space = asyncio.Event()  # below max_pending
+        self._space.set()
+        self._closed = False
+        self.stats: Dict[str, Any] = {"published": 0, "consumed": 0, "max_pending_seen": 0}
+
+    async def connect(self):
+        self._closed = False
+
+    async def close(self):
+        # The consumer keeps draining what is queued, then stops
+        self._closed = True
+        self._available.set()
+
+    async def publish(self, result: ProducerResultModal):
+        while self._pending >= self.max_pending:
+            self._space.clear()
+            await self._space.wait()
+        key = str(result.id).encode("utf-8")
+        self._queues[partition_for(key, self.partitions)].append(encode_result(result))
+        self._pending += 1
+        self.stats["published"] += 1
+        self.stats["max_pending_seen"] = max(self.stats["max_pending_seen"], self._pending)
+        self._available.set()
+
+    async def consume_partition_batches(self):
+        while self._pending or not self._closed:
+            if not self._pending:
+                self._available.clear()
+                await self._available.wait()
+                continue
+
+            # Peek, don't pop: results are only removed once committed,
+            # so uncommitted ones are handed out again with the next batch
+            per_partition = max(self.max_records // self.partitions, 1)
+            self._uncommitted = {}
+            batch: Dict[int, List[Dict[str, Any]]] = {}
+            for partition, queue in enumerate(self._queues):
+                if queue:
+                    count = min(len(queue), per_partition)
+                    self._uncommitted[partition] = count
+                    batch[partition] = [decode_result(queue[i]) for i in range(count)]
+
+            yield batch
+            self._uncommitted = {}
+
+    async def commit(self, partitions: Iterable[int]):
+        for partition in partitions:
+            count = self._uncommitted.pop(partition, 0)
+            queue = self._queues[partition]
+            for _ in range(count):
+                queue.popleft()
+            self._pending -= count
+            self.stats["consumed"] += count
+        self._space.set()
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._uncommitted.values())
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+
+memory_transport = MemoryTransport()
@@ -0,0 +1,245 @@
+import asyncio
+import math
+import os
+import socket
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+from app.core.config import Config
+from app.infrastructure.kafka.codec import decode_result, encode_result
+from app.infrastructure.transport.base import ResultConsumer, ResultPublisher, partition_for
+from app.schemas.service import ProducerResultModal
+from app.utils.batcher import AsyncBatcher
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+# Extend a lease only if we still hold it / release only our own lease
+_RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def redis_url() -> str:
+    return (
+        f"redis://{Config.REDIS_USER or ''}:{Config.REDIS_PASSWORD or ''}@"
+        f"{Config.REDIS_HOST}:{Config.REDIS_PORT}"
+    )
+
+
+class RedisStreamsTransport(ResultPublisher, ResultConsumer):
+    """
+    Redis Streams transport: one stream per partition
+    (`<REDIS_STREAM_NAME>:<n>`) read through a consumer group.
+
+    A consumer group alone would hand entries of one stream to several
+    consumers and break per-endpoint ordering, so each consumer holds
+    short leases on a fair share of the partitions (live consumers are
+    tracked in a heartbeat sorted set) and only reads the streams it owns.
+    When it takes over a partition it first XAUTOCLAIMs whatever the
+    previous owner left unacknowledged. Entries are XACKed on commit();
+    uncommitted ones stay pending and are claimed again before new reads.
+    """
+
+    def __init__(self):
+        self.stream = Config.REDIS_STREAM_NAME
+        self.group = Config.REDIS_STREAM_GROUP
+        self.partitions = Config.TRANSPORT_PARTITIONS
+        self.maxlen = Config.REDIS_STREAM_MAXLEN
+        self.lease_ms = int(Config.REDIS_STREAM_LEASE_S * 1000)
+        self.max_records = Config.KAFKA_CONSUMER_MAX_RECORDS
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self.client: Optional[redis.Redis] = None
+        self._owned: Set[int] = set()
+        self._recovering: Set[int] = set()  # pending entries to (re)claim before reading new ones
+        self._uncommitted: Dict[int, List[Any]] = {}  # partition -> entry ids handed out, not yet acked
+        self._last_rebalance = 0.0
+        self.publisher: AsyncBatcher[ProducerResultModal] = AsyncBatcher(
+            "redis_stream_publisher",
+            self._publish_batch,
+            max_size=Config.KAFKA_PUBLISH_BATCH_SIZE,
+            max_delay_s=Config.KAFKA_LINGER_MS / 1000,
+        )
+        self.stats: Dict[str, Any] = {"published": 0, "consumed": 0, "claimed": 0, "owned_partitions": 0}
+
+    def _stream_name(self, partition: int) -> str:
+        return f"{self.stream}:{partition}"
+
+    async def connect(self):
+        if self.client is None:
+            # Binary payloads: no response decoding
+            self.client = redis.from_url(redis_url())
+            self._renew = self.client.register_script(_RENEW_LEASE)
+            self._release = self.client.register_script(_RELEASE_LEASE)
+            await self.client.ping()
+            logger.info(f"Redis Streams transport connected ({self.partitions} partitions of '{self.stream}')")
+        await self.publisher.start()
+
+    async def close(self):
+        await self.publisher.close()
+        if self.client is not None:
+            for partition in list(self._owned):
+                await self._release(keys=[self._lease_key(partition)], args=[self.consumer_name])
+            self._owned.clear()
+            await self.client.zrem(self._members_key, self.consumer_name)
+            await self.client.close()
+            self.client = None
+
+    # ----------------------------
+    # Producer side
+    # ----------------------------
+    async def publish(self, result: ProducerResultModal):
+        await self.publisher.add(result)
+
+    async def _publish_batch(self, results: List[ProducerResultModal]):
+        # Raising here makes the batcher keep the batch and retry it
+        async with self.client.pipeline(transaction=False) as pipe:
+            for result in results:
+                key = str(result.id).encode("utf-8")
+                pipe.xadd(
+                    self._stream_name(partition_for(key, self.partitions)),
+                    {"v": encode_result(result)},
+                    maxlen=self.maxlen,
+                    approximate=True,
+                )
+            await pipe.execute()
+        self.stats["published"] += len(results)
+
+    # ----------------------------
+    # Consumer side
+    # ----------------------------
+    @property
+    def _members_key(self) -> str:
+        return f"{self.stream}:{self.group}:consumers"
+
+    def _lease_key(self, partition: int) -> str:
+        return f"{self.stream}:{self.group}:lease:{partition}"
+
+    async def _ensure_groups(self):
+        for partition in range(self.partitions):
+            try:
+                await self.client.xgroup_create(self._stream_name(partition), self.group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def _rebalance(self):
+        """Heartbeat, renew held leases and claim or release partitions toward a fair share."""
+        now = time.time()
+        await self.client.zadd(self._members_key, {self.consumer_name: now})
+        await self.client.zremrangebyscore(self._members_key, 0, now - self.lease_ms / 1000)
+        live = max(await self.client.zcard(self._members_key), 1)
+        share = math.ceil(self.partitions / live)
+
+        for partition in list(self._owned):
+            if not await self._renew(keys=[self._lease_key(partition)], args=[self.consumer_name, self.lease_ms]):
+                self._owned.discard(partition)
+                self._recovering.discard(partition)
+                self._notify_revoked([partition])
+                logger.warning(f"Lost lease on results partition {partition}")
+
+        while len(self._owned) > share:
+            partition = max(self._owned)
+            await self._release(keys=[self._lease_key(partition)], args=[self.consumer_name])
+            self._owned.discard(partition)
+            self._recovering.discard(partition)
+            self._notify_revoked([partition])
+
+        for partition in range(self.partitions):
+            if len(self._owned) >= share:
+                break
+            if partition in self._owned:
+                continue
+            if await self.client.set(self._lease_key(partition), self.consumer_name, nx=True, px=self.lease_ms):
+                self._owned.add(partition)
+                self._recovering.add(partition)
+
+        self.stats["owned_partitions"] = len(self._owned)
+        self._last_rebalance = time.monotonic()
+
+    async def _claim_pending(self, partition: int) -> List[Any]:
+        """Take over entries the previous owner of `partition` never acknowledged."""
+        stream = self._stream_name(partition)
+        claimed: List[Any] = []
+        start = "0-0"
+        while True:
+            response = await self.client.xautoclaim(
+                stream, self.group, self.consumer_name, min_idle_time=0, start_id=start, count=self.max_records)
+            start, entries = response[0], response[1]
+            claimed.extend(entry for entry in entries if entry[1])
+            if start in (b"0-0", "0-0") or not entries:
+                break
+        self.stats["claimed"] += len(claimed)
+        return claimed
+
+    async def consume_partition_batches(self):
+        if self.client is None:
+            await self.connect()
+        await self._ensure_groups()
+
+        while self.client is not None:
+            if time.monotonic() - self._last_rebalance >= self.lease_ms / 3000:
+                await self._rebalance()
+            if not self._owned:
+                await asyncio.sleep(self.lease_ms / 3000)
+                continue
+
+            entries_by_partition: Dict[int, List[Any]] = {}
+            for partition in list(self._recovering):
+                claimed = await self._claim_pending(partition)
+                if claimed:
+                    entries_by_partition[partition] = claimed
+                self._recovering.discard(partition)
+
+            if not entries_by_partition:
+                response = await self.client.xreadgroup(
+                    self.group,
+                    self.consumer_name,
+                    {self._stream_name(partition): ">" for partition in sorted(self._owned)},
+                    count=max(self.max_records // len(self._owned), 1),
+                    block=1000,
+                )
+                for stream, entries in response or []:
+                    name = stream.decode() if isinstance(stream, bytes) else stream
+                    entries_by_partition[int(name.rsplit(":", 1)[1])] = entries
+            if not entries_by_partition:
+                continue
+
+            self._uncommitted = {
+                partition: [entry_id for entry_id, _ in entries]
+                for partition, entries in entries_by_partition.items()
+            }
+            yield {
+                partition: [decode_result(fields[b"v"]) for _, fields in entries]
+                for partition, entries in entries_by_partition.items()
+            }
+
+            # Not acknowledged: still pending in the group, claim them again first
+            for partition in self._uncommitted:
+                if partition in self._owned:
+                    self._recovering.add(partition)
+            self._uncommitted = {}
+
+    async def commit(self, partitions: Iterable[int]):
+        for partition in partitions:
+            entry_ids = self._uncommitted.pop(partition, None)
+            if entry_ids:
+                await self.client.xack(self._stream_name(partition), self.group, *entry_ids)
+                self.stats["consumed"] += len(entry_ids)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(len(entry_ids) for entry_ids in self._uncommitted.values())
+
+
+redis_transport = RedisStreamsTransport()
@@ -1,14 +1,23 @@
+import asyncio
 import logging
+from datetime import datetime
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from .utils.connect import db
+from .core.config import Config
 from .routers import auth, service
 from .middlewares.token_refresh import TokenRefreshMiddleware
 from .services.monitoring import Producer
-from .infrastructure.kafka.producer import producer_client
+from .infrastructure.transport.factory import get_result_consumer, uses_in_process_consumer
+from .infrastructure.clients.api_client import http_pool
+from .services.log_writer import health_log_writer
 from .services.alert_scheduler import send_user_incident_alerts
+from .services.healthConsumer import run_health_consumer
+from .services.baseline import run_baseline_job
+from .services.log_partitions import maintain_log_partitions
+from .db.migrate import run_migrations
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,24 +28,42 @@ producer = Producer()
 async def lifespan(app: FastAPI):
     logger.info("Starting up application...")
     
+    # Bring the schema up to date before anything touches it
+    if Config.DB_AUTO_MIGRATE:
+        await asyncio.to_thread(run_migrations)
+
     # Initialize database
     await db.init_db()
     
-    # Initialize Kafka producer
+    # Initialize the result transport (Kafka, in-process queue or Redis Streams)
     try:
-        await producer_client.connect()
-        logger.info("Kafka producer initialized successfully.")
+        await producer.publisher.connect()
+        logger.info(f"Result transport '{Config.RESULT_TRANSPORT}' initialized successfully.")
     except Exception as e:
-        logger.error(f"Failed to initialize Kafka producer: {e}")
+        logger.error(f"Failed to initialize result transport '{Config.RESULT_TRANSPORT}': {e}")
         # In production, you might want to fail fast here
         # raise
 
-    # Start scheduler
+    # The in-process transport has no broker, so the health consumer runs here
+    consumer_task = None
+    if uses_in_process_consumer():
+        consumer_task = asyncio.create_task(run_health_consumer(get_result_consumer()))
+        logger.info("In-process health consumer started.")
+
+    # Shared HTTP client pool used by every health check
+    await http_pool.start()
+
+    # Batched writer for health_check_logs
+    await health_log_writer.start()
+
+    # Per-endpoint check scheduler; the job below keeps its endpoint list fresh
+    await producer.refresh_schedule()
+    await producer.scheduler.start()
     scheduler.add_job(
-        producer.run_all_health_checks,
+        producer.refresh_schedule,
         'interval',
-        minutes=1,
-        id="health_check_job"
+        seconds=Config.HEALTH_CHECK_REFRESH_SECONDS,
+        id="endpoint_refresh_job"
     )
 
     # Add alert notification job every 30 minutes
@@ -47,8 +74,28 @@ async def lifespan(app: FastAPI):
         id="alert_scheduler_job"
     )
 
+    # Daily health_check_logs partition creation and retention, first run right away
+    scheduler.add_job(
+        maintain_log_partitions,
+        'interval',
+        hours=24,
+        id="log_partitions_job",
+        next_run_time=datetime.now()
+    )
+
+    # Latency anomalies against per-endpoint baselines
+    if Config.BASELINE_JOB_INTERVAL_MINUTES > 0:
+        scheduler.add_job(
+            run_baseline_job,
+            'interval',
+            minutes=Config.BASELINE_JOB_INTERVAL_MINUTES,
+            id="baseline_job",
+            max_instances=1,
+            coalesce=True
+        )
+
     scheduler.start()
-    logger.info("Scheduler started with the health check job.")
+    logger.info("Scheduler started with the endpoint refresh job.")
 
     yield 
 
@@ -56,11 +103,23 @@ async def lifespan(app: FastAPI):
 
     # Shutdown scheduler
     scheduler.shutdown()
+    await producer.close()
     logger.info("Scheduler shut down gracefully.")
+
+    # Close pooled health check connections
+    await http_pool.close()
+
+    # Flush buffered health check logs
+    await health_log_writer.close()
     
-    # Close Kafka producer
-    await producer_client.close()
-    logger.info("Kafka producer closed.")
+    # Close the result transport (delivers what is still buffered)
+    await producer.publisher.close()
+    if consumer_task is not None:
+        try:
+            await asyncio.wait_for(consumer_task, timeout=10)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+    logger.info("Result transport closed.")
     
     # Close database
     await db.close_db()
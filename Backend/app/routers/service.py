@@ -2,7 +2,10 @@ from fastapi import APIRouter, Depends, Response
 from app.core.security import get_current_user_uid
 from ..utils.connect import db
 from ..services.service import ApiService
+from ..services.endpoint_registry import endpoint_registry
 from ..utils.loggers import get_logger
+from ..utils.response_rules import compile_rules
+from ..core.exceptions import ValidationRuleError
 from typing import List
 from ..schemas.service import (
     ApiServiceModal,
@@ -62,7 +65,9 @@ async def create_new_service(
 ):
     try:
         logger.info("Creating service for user %s with data %s", user_uid, api_service_data)
+        compile_rules(api_service_data.response_validation)
         service_id = await api_services.create_service(user_uid, api_service_data, session)
+        endpoint_registry.invalidate(service_id["id"])
         logger.info("User %s created service %s", user_uid, service_id)
         response.status_code = 201
         return {
@@ -70,6 +75,13 @@ async def create_new_service(
             "message": "Service created successfully",
             "data": {"service_id": service_id["id"]}
         }
+    except ValidationRuleError as e:
+        response.status_code = 422
+        return {
+            "success": False,
+            "message": f"Invalid response_validation rules: {str(e)}",
+            "data": None
+        }
     except Exception as e:
         logger.error("Error creating service for user %s: %s", user_uid, e, exc_info=True)
         response.status_code = 500
@@ -144,7 +156,9 @@ async def update_service(
     session=Depends(get_db_session)
 ):
     try:
+        compile_rules(api_service_data.response_validation)
         updated_service = await api_services.update_service(user_uid, service_id, api_service_data, session)
+        endpoint_registry.invalidate(service_id)
         logger.info("User %s updated service %s", user_uid, service_id)
         response.status_code = 200
         return {
@@ -152,6 +166,13 @@ async def update_service(
             "message": "Service updated successfully",
             "data": updated_service
         }
+    except ValidationRuleError as e:
+        response.status_code = 422
+        return {
+            "success": False,
+            "message": f"Invalid response_validation rules: {str(e)}",
+            "data": None
+        }
     except Exception as e:
         logger.error("Error updating service %s for user %s: %s", service_id, user_uid, e, exc_info=True)
         response.status_code = 500
@@ -171,6 +192,7 @@ async def delete_service(
 ):
     try:
         await api_services.delete_service(user_uid, service_id, session)
+        endpoint_registry.remove(service_id)
         logger.info("User %s deleted service %s", user_uid, service_id)
         response.status_code = 200
         return {
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, HttpUrl, Field
 from datetime import datetime
-from typing import Optional, Dict, Any, Generic, TypeVar, List, Union
+from typing import Optional, Dict, Any, Generic, TypeVar, List, Union, Literal
 from pydantic.generics import GenericModel
 from uuid import UUID
 
@@ -20,6 +20,20 @@ class ApiResponse(GenericModel, Generic[DataT]):
 # ----------------------------
 # Request / Input Models
 # ----------------------------
+class DetectionPolicyModal(BaseModel):
+    """Incident detection rules of an endpoint; unset fields keep the consumer's defaults."""
+    failure_n: Optional[int] = Field(default=None, ge=1, le=100)
+    failure_m: Optional[int] = Field(default=None, ge=1, le=100)
+    fixed_latency: Optional[bool] = None  # n of m rule against expected_latency_ms; on unless False
+    latency_n: Optional[int] = Field(default=None, ge=1, le=100)
+    latency_m: Optional[int] = Field(default=None, ge=1, le=100)
+    p95_threshold_ms: Optional[int] = Field(default=None, ge=1)
+    p95_window: Optional[int] = Field(default=None, ge=1, le=1000)
+    ewma_drift_ratio: Optional[float] = Field(default=None, gt=1)
+    ewma_alpha: Optional[float] = Field(default=None, gt=0, le=1)
+    ewma_baseline_alpha: Optional[float] = Field(default=None, gt=0, le=1)
+    ewma_min_samples: Optional[int] = Field(default=None, ge=1)
+
 class ApiServiceModal(BaseModel):
     name: str
     http_method: str = "GET"
@@ -30,6 +44,8 @@ class ApiServiceModal(BaseModel):
     expected_latency_ms: Optional[int] = 200
     expected_status_code: Optional[int] = 200
     response_validation: Optional[Dict[str, Any]] = None
+    connection_mode: Optional[Literal["warm", "cold"]] = "warm"
+    detection_policy: Optional[DetectionPolicyModal] = None
 
 class ApiProducerServiceModal(BaseModel):
     id: UUID
@@ -41,6 +57,9 @@ class ApiProducerServiceModal(BaseModel):
     periodic_summary_report: Optional[int] = 60
     expected_status_code: Optional[int] = 200
     response_validation: Optional[Dict[str, Any]] = None
+    connection_mode: Optional[Literal["warm", "cold"]] = "warm"
+    check_interval_seconds: Optional[int] = 60
+    updated_at: Optional[datetime] = None
 
 # ----------------------------
 # Response / Output Models
@@ -59,9 +78,14 @@ class ApiLogsModal(BaseModel):
     id: int
     is_healthy: bool
     checked_at: datetime
-    response_time_ms: int
+    response_time_ms: Optional[int] = None  # None when the check was skipped (open circuit)
     response_body: Optional[str] = None
     error_message: Optional[str] = None
+    dns_ms: Optional[int] = None
+    connect_ms: Optional[int] = None
+    tls_ms: Optional[int] = None
+    ttfb_ms: Optional[int] = None
+    download_ms: Optional[int] = None
 
 class ApiIncidentLogsModal(BaseModel):
     id: UUID
@@ -85,6 +109,7 @@ class ApiServiceDetailModal(BaseModel):
     expected_status_code: int
     response_validation: Optional[Dict[str, Any]] = None
     expected_latency_ms: int
+    connection_mode: Optional[str] = "warm"
 
     # Health check info
     is_healthy: bool
@@ -96,12 +121,24 @@ class ApiServiceDetailModal(BaseModel):
     last_20_latencies: List[LatencyData] = []
     
     
+class PhaseTimingsModal(BaseModel):
+    """Per-phase latency of one check; connection phases are None on a reused connection."""
+    dns_ms: Optional[int] = None
+    connect_ms: Optional[int] = None
+    tls_ms: Optional[int] = None
+    ttfb_ms: Optional[int] = None
+    download_ms: Optional[int] = None
+
+
 class ApiResponseModal(BaseModel):
     checked_at: datetime
     response_time_ms : Optional[int] = None
     status_code : Optional[int] = None
     response_body : Optional[Any] = None
     error_message : Optional[str] = None
+    validation_errors : Optional[List[str]] = None
+    phases : Optional[PhaseTimingsModal] = None
+    skipped : bool = False  # short-circuited by an open circuit breaker; no request was made
 
 
 class ProducerResultModal(BaseModel):
@@ -109,6 +146,16 @@ class ProducerResultModal(BaseModel):
     checked_at: datetime
     response_time_ms: Optional[int] = None
     status_code: Optional[int] = None
+    is_healthy: Optional[bool] = None  # status and response_validation verdict from the producer
+    phases: Optional[PhaseTimingsModal] = None
+    # Failure confirmation burst: attempt 1..total are rechecks of a failed check, 0 is a regular check
+    confirm_attempt: int = 0
+    confirm_total: int = 0
+    # No request was made (open circuit); kept out of incident detection
+    skipped: bool = False
+    # Only set when the consumer writes health_check_logs (HEALTH_LOG_WRITER=consumer)
+    response_body: Optional[str] = None
+    error_message: Optional[str] = None
 
 class ApiClientLogs(BaseModel):
     id: UUID
@@ -118,6 +165,7 @@ class ApiClientLogs(BaseModel):
     is_healthy: bool
     response_body : Optional[Any] = None
     error_message: Optional[str] = None
+    phases: Optional[PhaseTimingsModal] = None
 
 class ConsumerMonitoringData(BaseModel):
     id: UUID
@@ -125,12 +173,13 @@ class ConsumerMonitoringData(BaseModel):
     http_method: str = "GET"
     expected_status_code: Optional[int] 
     expected_latency_ms: Optional[int] 
+    detection_policy: Optional[DetectionPolicyModal] = None
 
 class ApiLastThreeRecords(BaseModel):
     id: int
     is_healthy: bool
     checked_at: datetime
-    response_time_ms: int
+    response_time_ms: Optional[int] = None
     status_code: Optional[int]
 
 
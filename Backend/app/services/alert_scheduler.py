@@ -87,7 +87,7 @@ async def send_user_incident_alerts():
                 body_lines.append(
                     f"- API ID: {inc['api_id']}\n"
                     f"  Start: {inc['start_time']}\n"
-                    f"  End:   {inc['end_time']}\n"
+                    f"  End:   {inc['end_time'] or 'ongoing'}\n"
                     f"  Error: {inc['error']}\n"
                 )
             body_lines.append("Regards,\nHealth Monitor Service")
@@ -0,0 +1,172 @@
+import asyncio
+import warnings
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import Config
+from app.services.service import ApiService
+from app.utils.connect import db
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+api_service = ApiService()
+
+_EPOCH = datetime(1970, 1, 1)
+_MAD_SCALE = 1.4826  # MAD -> standard deviation for normally distributed data
+
+
+def _hour_number(value: datetime) -> int:
+    """Hours since the Unix epoch of a naive UTC datetime."""
+    return int((value - _EPOCH).total_seconds() // 3600)
+
+
+class LatencyBaselines:
+    """
+    Rolling per-endpoint latency baselines for anomaly detection.
+
+    Holds an (endpoints x lookback hours) float32 matrix of hourly median
+    latencies; column `h % hours` holds absolute hour `h`, so the matrix is
+    a ring over time and each refresh only loads the hours it does not have
+    yet (a full lookback on the first run, then about one hour per run).
+    Baselines are computed for all endpoints at once: per endpoint the
+    median and MAD of the same hour of day over the lookback (hour-of-day
+    seasonality), or of every hour when too few days have data.
+    """
+
+    def __init__(self, hours: Optional[int] = None):
+        self.hours = hours or Config.BASELINE_LOOKBACK_HOURS
+        self.index: Dict[str, int] = {}
+        self.endpoint_ids: List[str] = []
+        self.medians = np.full((1024, self.hours), np.nan, dtype=np.float32)
+        self.slot_hour = np.full(self.hours, -1, dtype=np.int64)  # absolute hour held by each column
+        self.stats: Dict[str, Any] = {"runs": 0, "hours_loaded": 0, "endpoints": 0, "anomalies": 0,
+                                      "last_run_ms": 0.0}
+
+    def _row(self, endpoint_id: str) -> int:
+        row = self.index.get(endpoint_id)
+        if row is None:
+            row = len(self.endpoint_ids)
+            if row == self.medians.shape[0]:
+                grown = np.full((row * 2, self.hours), np.nan, dtype=np.float32)
+                grown[:row] = self.medians
+                self.medians = grown
+            self.index[endpoint_id] = row
+            self.endpoint_ids.append(endpoint_id)
+        return row
+
+    def missing_span(self, now: datetime) -> Optional[Tuple[datetime, datetime]]:
+        """[since, until) covering the completed hours of the lookback not loaded yet, or None."""
+        current = _hour_number(now)
+        wanted = np.arange(current - self.hours, current)
+        missing = wanted[self.slot_hour[wanted % self.hours] != wanted]
+        if not missing.size:
+            return None
+        return (_EPOCH + timedelta(hours=int(missing[0])), _EPOCH + timedelta(hours=int(missing[-1]) + 1))
+
+    def ingest(self, span: Tuple[datetime, datetime], rows):
+        """Store hourly medians (endpoint_id, hour, median_ms) for every hour of `span`."""
+        first, last = _hour_number(span[0]), _hour_number(span[1])
+        for hour in range(first, last):
+            self.medians[:, hour % self.hours] = np.nan
+            self.slot_hour[hour % self.hours] = hour
+
+        endpoint_rows, columns, values = [], [], []
+        for row in rows:
+            endpoint_rows.append(self._row(str(row.endpoint_id)))
+            columns.append(_hour_number(row.hour) % self.hours)
+            values.append(row.median_ms)
+        if values:
+            self.medians[np.asarray(endpoint_rows), np.asarray(columns)] = np.asarray(values, dtype=np.float32)
+        self.stats["hours_loaded"] += last - first
+        self.stats["endpoints"] = len(self.endpoint_ids)
+
+    def baselines(self, hour_of_day: int):
+        """(median, mad, same-hour days) per endpoint row for an hour of day (UTC)."""
+        count = len(self.endpoint_ids)
+        loaded = self.slot_hour >= 0
+        seasonal = self.medians[:count][:, loaded & (self.slot_hour % 24 == hour_of_day)]
+        overall = self.medians[:count][:, loaded]
+        days = np.count_nonzero(~np.isnan(seasonal), axis=1)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows yield NaN, which never flags
+            use_seasonal = days >= Config.BASELINE_MIN_DAYS
+            median = np.where(use_seasonal, np.nanmedian(seasonal, axis=1), np.nanmedian(overall, axis=1))
+            mad = np.where(
+                use_seasonal,
+                np.nanmedian(np.abs(seasonal - median[:, None]), axis=1),
+                np.nanmedian(np.abs(overall - median[:, None]), axis=1),
+            )
+        return median, mad, days
+
+    def detect(self, recent_rows, now: datetime) -> List[Dict[str, Any]]:
+        """
+        Compare each endpoint's recent median latency with its baseline for
+        the current hour of day; returns the endpoints that are slower by
+        more than BASELINE_Z_THRESHOLD robust standard deviations.
+        """
+        rows = [row for row in recent_rows
+                if str(row.endpoint_id) in self.index and row.samples >= Config.BASELINE_MIN_RECENT_SAMPLES]
+        if not rows:
+            return []
+        median, mad, days = self.baselines(_hour_number(now) % 24)
+
+        idx = np.fromiter((self.index[str(row.endpoint_id)] for row in rows), dtype=np.int64, count=len(rows))
+        recent = np.fromiter((row.median_ms for row in rows), dtype=np.float64, count=len(rows))
+        base = median[idx]
+        # A MAD of (nearly) zero would flag any wobble of a very steady endpoint
+        scale = _MAD_SCALE * np.maximum(mad[idx], np.maximum(base * Config.BASELINE_MIN_SPREAD_RATIO, 1.0))
+        with np.errstate(invalid="ignore"):
+            z = (recent - base) / scale
+            flagged = np.nonzero(z > Config.BASELINE_Z_THRESHOLD)[0]
+
+        return [{
+            "endpoint_id": str(rows[i].endpoint_id),
+            "recent_ms": float(recent[i]),
+            "baseline_ms": float(base[i]),
+            "z": float(z[i]),
+            "seasonal": bool(days[idx[i]] >= Config.BASELINE_MIN_DAYS),
+            "first_at": rows[i].first_at,
+            "last_at": rows[i].last_at,
+        } for i in flagged]
+
+
+baselines = LatencyBaselines()
+
+
+async def run_baseline_job():
+    """Periodic job: refresh latency baselines and record latency anomalies as incidents."""
+    if db.pg_session_factory is None:
+        raise RuntimeError("pg_session_factory is not initialized")
+    start = datetime.utcnow()
+    async with db.pg_session_factory() as session:
+        # The numpy work runs in a worker thread so it never stalls the event loop;
+        # only this job touches the baselines, and it does so one step at a time
+        span = baselines.missing_span(start)
+        if span:
+            medians = await api_service.get_hourly_latency_medians(session, *span)
+            await asyncio.to_thread(baselines.ingest, span, medians)
+
+        recent = await api_service.get_recent_latency_medians(
+            session, start - timedelta(minutes=Config.BASELINE_RECENT_MINUTES))
+        anomalies = await asyncio.to_thread(baselines.detect, recent, start)
+
+        for anomaly in anomalies:
+            kind = "hour-of-day" if anomaly["seasonal"] else "overall"
+            detail = (
+                f"Median latency {anomaly['recent_ms']:.0f} ms vs {kind} baseline "
+                f"{anomaly['baseline_ms']:.0f} ms ({anomaly['z']:.1f} robust SD)."
+            )
+            records = [{"checked_at": anomaly["last_at"]}, {"checked_at": anomaly["first_at"]}]
+            try:
+                await api_service.createOrUpdateIncident(
+                    session, anomaly["endpoint_id"], records, reason="baseline", detail=detail)
+            except Exception as e:
+                logger.error(f"Failed to record latency anomaly for endpoint {anomaly['endpoint_id']}: {e}")
+                # The session is shared by every anomaly of this run; an aborted transaction would fail the rest
+                await session.rollback()
+
+    baselines.stats["runs"] += 1
+    baselines.stats["anomalies"] += len(anomalies)
+    baselines.stats["last_run_ms"] = round((datetime.utcnow() - start).total_seconds() * 1000, 2)
+    logger.info(f"Baseline job: {len(anomalies)} latency anomalies, stats: {baselines.stats}")
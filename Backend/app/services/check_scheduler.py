@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import itertools
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from app.core.config import Config
+from app.schemas.service import ApiProducerServiceModal
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+# dispatch(service, due_at) -> awaitable that performs the check
+DispatchFn = Callable[[ApiProducerServiceModal, float], Awaitable[None]]
+
+
+class _Entry:
+    __slots__ = ("service", "interval_s", "generation")
+
+    def __init__(self, service: ApiProducerServiceModal, interval_s: float, generation: int):
+        self.service = service
+        self.interval_s = interval_s
+        self.generation = generation
+
+
+class CheckScheduler:
+    """
+    Fires each endpoint on its own check_interval_seconds.
+
+    Endpoints live in a min-heap keyed by their next due time, so popping the
+    next check and rescheduling it are both O(log n). Every endpoint gets a
+    deterministic phase offset inside its interval (derived from its UUID), so
+    load is spread evenly across the interval instead of bursting at :00 and
+    stays at the same position across restarts.
+
+    Removals and interval changes are lazy: the entry's generation is bumped
+    and stale heap items are discarded when they reach the top.
+
+    An endpoint has at most one check in flight: a slot that comes due while
+    its previous check is still running is skipped and counted in
+    `busy_slots`, so a slow endpoint never overlaps itself and tasks cannot
+    pile up behind the concurrency limit.
+    """
+
+    def __init__(self, dispatch: DispatchFn):
+        self.dispatch = dispatch
+        self.default_interval_s = Config.HEALTH_CHECK_INTERVAL_SECONDS
+        self.min_interval_s = Config.HEALTH_CHECK_MIN_INTERVAL_SECONDS
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._entries: Dict[str, _Entry] = {}
+        self._seq = itertools.count()
+        self._generations = itertools.count(1)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.skipped_slots = 0
+        self.busy_slots = 0
+
+    # ----------------------------
+    # Schedule management
+    # ----------------------------
+    def interval_for(self, service: ApiProducerServiceModal) -> float:
+        interval = service.check_interval_seconds or self.default_interval_s
+        return float(max(interval, self.min_interval_s))
+
+    @staticmethod
+    def phase_offset(endpoint_id: str, interval_s: float) -> float:
+        """Deterministic offset in [0, interval_s) for an endpoint."""
+        return (zlib.crc32(endpoint_id.encode("utf-8")) % int(interval_s * 1000)) / 1000.0
+
+    def next_due(self, endpoint_id: str, interval_s: float, now: float) -> float:
+        """First slot strictly after `now` on this endpoint's phase grid."""
+        offset = self.phase_offset(endpoint_id, interval_s)
+        slots = (now - offset) // interval_s + 1
+        return slots * interval_s + offset
+
+    def schedule(self, service: ApiProducerServiceModal, now: Optional[float] = None):
+        """Add or replace an endpoint in the schedule."""
+        endpoint_id = str(service.id)
+        interval_s = self.interval_for(service)
+        current = self._entries.get(endpoint_id)
+        if current is not None and current.interval_s == interval_s:
+            # Same slot grid: keep the pending heap item, just refresh the definition
+            current.service = service
+            return
+
+        entry = _Entry(service, interval_s, next(self._generations))
+        self._entries[endpoint_id] = entry
+        due = self.next_due(endpoint_id, interval_s, now if now is not None else time.time())
+        self._push(due, endpoint_id, entry.generation)
+
+    def unschedule(self, endpoint_id: str):
+        """Drop an endpoint; its pending heap item is discarded lazily."""
+        self._entries.pop(str(endpoint_id), None)
+        self._compact()
+
+    def sync(self, services: Iterable[ApiProducerServiceModal]):
+        """Make the schedule match `services` exactly."""
+        seen = set()
+        for service in services:
+            seen.add(str(service.id))
+            self.schedule(service)
+        for endpoint_id in list(self._entries):
+            if endpoint_id not in seen:
+                self.unschedule(endpoint_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _push(self, due: float, endpoint_id: str, generation: int):
+        head = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (due, next(self._seq), endpoint_id, generation))
+        if head is None or due < head:
+            self._wakeup.set()
+
+    def _compact(self):
+        """Rebuild the heap when stale items dominate it."""
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [
+                item for item in self._heap
+                if (entry := self._entries.get(item[2])) is not None and entry.generation == item[3]
+            ]
+            heapq.heapify(self._heap)
+
+    # ----------------------------
+    # Run loop
+    # ----------------------------
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="check_scheduler")
+            logger.info(f"Check scheduler started with {len(self._entries)} endpoints.")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        tasks = list(self._in_flight.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Check scheduler stopped.")
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due, _, endpoint_id, generation = self._heap[0]
+            entry = self._entries.get(endpoint_id)
+            if entry is None or entry.generation != generation:
+                heapq.heappop(self._heap)
+                continue
+
+            delay = due - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            self._fire(endpoint_id, entry, due)
+
+            # Next slot on the same grid; if we fell behind, skip the slots we missed
+            next_due = due + entry.interval_s
+            now = time.time()
+            if next_due <= now:
+                missed = int((now - next_due) // entry.interval_s) + 1
+                self.skipped_slots += missed
+                next_due += missed * entry.interval_s
+            heapq.heappush(self._heap, (next_due, next(self._seq), endpoint_id, generation))
+
+    def _fire(self, endpoint_id: str, entry: _Entry, due: float):
+        if endpoint_id in self._in_flight:
+            self.busy_slots += 1
+            logger.debug(f"Skipping a slot of {entry.service.name}: its previous check is still running")
+            return
+        task = asyncio.create_task(self.dispatch(entry.service, due))
+        self._in_flight[endpoint_id] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(endpoint_id, None))
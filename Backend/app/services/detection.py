@@ -0,0 +1,198 @@
+import json
+import math
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+# Latency rules, named in incidents so that recovery is judged by the rule that opened them
+FIXED = "fixed"
+P95 = "p95"
+EWMA = "ewma"
+
+
+class DetectionPolicy:
+    """
+    Per-endpoint incident detection settings, parsed from the
+    monitored_endpoints.detection_policy JSON (missing keys take the
+    defaults, which reproduce the original "3 of the last 3" rules):
+
+        failure_n / failure_m      failure incident when n of the last m results failed
+        fixed_latency              whether the n of m rule below applies (on by default)
+        latency_n / latency_m      latency incident when n of the last m results
+                                   were slower than expected_latency_ms
+        p95_threshold_ms           latency incident when the p95 of the last
+        p95_window                 p95_window results exceeds the threshold (off when unset)
+        ewma_drift_ratio           latency incident when the fast EWMA of latency exceeds
+        ewma_alpha                 the slow (baseline) EWMA by this ratio (off when unset),
+        ewma_baseline_alpha        after at least ewma_min_samples results
+        ewma_min_samples
+    """
+
+    __slots__ = (
+        "failure_n", "failure_m", "fixed_latency", "latency_n", "latency_m", "p95_threshold_ms", "p95_window",
+        "ewma_drift_ratio", "ewma_alpha", "ewma_baseline_alpha", "ewma_min_samples",
+    )
+
+    DEFAULTS: Dict[str, Any] = {
+        "failure_n": 3, "failure_m": 3,
+        "fixed_latency": True, "latency_n": 3, "latency_m": 3,
+        "p95_threshold_ms": None, "p95_window": 20,
+        "ewma_drift_ratio": None, "ewma_alpha": 0.3, "ewma_baseline_alpha": 0.02, "ewma_min_samples": 20,
+    }
+
+    def __init__(self, **values):
+        for name, default in self.DEFAULTS.items():
+            value = values.get(name)
+            setattr(self, name, default if value is None else value)
+        self.failure_m = max(self.failure_m, 1)
+        self.failure_n = min(max(self.failure_n, 1), self.failure_m)
+        self.latency_m = max(self.latency_m, 1)
+        self.latency_n = min(max(self.latency_n, 1), self.latency_m)
+        self.p95_window = max(self.p95_window, 1)
+
+    @classmethod
+    def from_raw(cls, raw) -> "DetectionPolicy":
+        """Build from the column value (dict, JSON text or None); unknown keys are ignored."""
+        if isinstance(raw, str):
+            try:
+                raw = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring unparsable detection policy: {raw!r}")
+                raw = None
+        if not isinstance(raw, dict):
+            return cls()
+        return cls(**{key: value for key, value in raw.items() if key in cls.DEFAULTS})
+
+
+class RollingCount:
+    """Number of true flags among the last `size` added, updated in O(1)."""
+
+    __slots__ = ("flags", "count")
+
+    def __init__(self, size: int):
+        self.flags: Deque[bool] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, flag: bool):
+        if len(self.flags) == self.flags.maxlen:
+            self.count -= self.flags[0]
+        self.flags.append(flag)
+        self.count += flag
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+
+class EndpointDetector:
+    """
+    Streaming accumulators of one endpoint's results for its DetectionPolicy.
+
+    Each result updates a few counters in O(1) (deque append, running
+    counts, EWMAs); nothing is re-read from history. The rolling p95 test
+    needs no sorting either: the nearest-rank p95 of n samples exceeds a
+    threshold exactly when more than n - ceil(0.95 * n) of them do, so a
+    running count of samples above the threshold is enough. `key`
+    identifies the thresholds and policy the accumulators were built for.
+    """
+
+    __slots__ = ("policy", "key", "expected_latency_ms", "failures", "slow", "p95_above", "p95_latencies",
+                 "ewma", "baseline", "samples")
+
+    def __init__(self, policy: DetectionPolicy, expected_latency_ms: int, key: Tuple = ()):
+        self.policy = policy
+        self.key = key
+        self.expected_latency_ms = expected_latency_ms
+        self.failures = RollingCount(policy.failure_m)
+        self.slow = RollingCount(policy.latency_m)
+        self.p95_above = RollingCount(policy.p95_window)
+        self.p95_latencies: Deque[int] = deque(maxlen=policy.p95_window)
+        self.ewma: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.samples = 0
+
+    def update(self, response_time_ms: Optional[int], is_healthy: bool):
+        policy = self.policy
+        self.failures.add(not is_healthy)
+        self.slow.add((response_time_ms or 0) > self.expected_latency_ms)
+        if response_time_ms is None:
+            return
+        if policy.p95_threshold_ms is not None:
+            self.p95_above.add(response_time_ms > policy.p95_threshold_ms)
+            self.p95_latencies.append(response_time_ms)
+        if policy.ewma_drift_ratio is not None:
+            if self.ewma is None:
+                self.ewma = self.baseline = float(response_time_ms)
+            else:
+                self.ewma += policy.ewma_alpha * (response_time_ms - self.ewma)
+                self.baseline += policy.ewma_baseline_alpha * (response_time_ms - self.baseline)
+            self.samples += 1
+
+    def failure_alert(self) -> bool:
+        return self.failures.count >= self.policy.failure_n
+
+    def _fixed_alert(self) -> Optional[Tuple[str, int, float, str]]:
+        policy = self.policy
+        if policy.fixed_latency and self.slow.count >= policy.latency_n:
+            return (FIXED, policy.latency_m, self.expected_latency_ms,
+                    f"{self.slow.count} of the last {len(self.slow)} checks exceeded {self.expected_latency_ms} ms.")
+        return None
+
+    def _p95_alert(self) -> Optional[Tuple[str, int, float, str]]:
+        policy = self.policy
+        if policy.p95_threshold_ms is not None and len(self.p95_latencies) == policy.p95_window:
+            window = len(self.p95_latencies)
+            if self.p95_above.count > window - math.ceil(0.95 * window):
+                p95 = sorted(self.p95_latencies)[math.ceil(0.95 * window) - 1]
+                return (P95, policy.p95_window, policy.p95_threshold_ms,
+                        f"p95 of the last {window} checks is {p95} ms (threshold {policy.p95_threshold_ms} ms).")
+        return None
+
+    def _ewma_alert(self) -> Optional[Tuple[str, int, float, str]]:
+        policy = self.policy
+        if (policy.ewma_drift_ratio is not None and self.samples >= policy.ewma_min_samples
+                and self.ewma > self.baseline * policy.ewma_drift_ratio):
+            return (EWMA, policy.latency_m, self.baseline * policy.ewma_drift_ratio,
+                    f"Latency EWMA {self.ewma:.0f} ms drifted above {policy.ewma_drift_ratio}x "
+                    f"its baseline of {self.baseline:.0f} ms.")
+        return None
+
+    def latency_alert(self) -> Optional[Tuple[str, int, float, str]]:
+        """
+        The first latency rule currently breached, as (rule, lookback
+        results, latency limit in ms, description), or None.
+        """
+        return self._fixed_alert() or self._p95_alert() or self._ewma_alert()
+
+    def latency_ok(self, response_time_ms: Optional[int], rule: Optional[str] = None) -> bool:
+        """
+        Whether a result is good for latency. Without `rule` (no latency
+        incident open) that is the fixed threshold, if the policy uses it;
+        for an open latency incident it is the rule that opened it: the
+        fixed threshold per result, the rolling p95 or the EWMA drift no
+        longer breached.
+        """
+        if rule == P95:
+            return self._p95_alert() is None
+        if rule == EWMA:
+            return self._ewma_alert() is None
+        if rule is None and not self.policy.fixed_latency:
+            return True
+        return (response_time_ms or 0) <= self.expected_latency_ms
+
+    @staticmethod
+    def bad_records(records: List[dict], limit_ms: Optional[float] = None) -> List[dict]:
+        """Failed (or, with `limit_ms`, slow) records among `records`, order kept."""
+        if limit_ms is None:
+            return [record for record in records if not record["is_healthy"]]
+        return [record for record in records if (record["response_time_ms"] or 0) > limit_ms]
+
+
+def rule_of_description(text: str) -> str:
+    """The latency rule behind an incident's stored message (FIXED for older incidents)."""
+    if "p95 of the last" in text:
+        return P95
+    if "Latency EWMA" in text:
+        return EWMA
+    return FIXED
@@ -0,0 +1,137 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import Config
+from app.schemas.service import ApiProducerServiceModal
+from app.services.service import ApiService
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+api_service = ApiService()
+
+
+class EndpointRegistry:
+    """
+    In-memory copy of monitored_endpoints for the producer.
+
+    The table is loaded once; after that only changed rows are re-read.
+    Changes arrive from the service routers (invalidate/remove run in the same
+    process as the producer) and, as a safety net for writes made elsewhere,
+    from an optional updated_at high-water mark poll. With nothing pending,
+    refresh() touches neither the database nor model validation.
+    """
+
+    def __init__(self):
+        self._services: Dict[str, ApiProducerServiceModal] = {}
+        self._dirty: Set[str] = set()
+        self._removed: Set[str] = set()
+        self._loaded = False
+        self.high_water: Optional[datetime] = None
+        self.poll_interval_s = Config.ENDPOINT_REGISTRY_POLL_SECONDS
+        self.full_reload_interval_s = Config.ENDPOINT_REGISTRY_FULL_RELOAD_SECONDS
+        self._last_poll = 0.0
+        self._last_full_reload = 0.0
+
+    # ----------------------------
+    # Change notifications
+    # ----------------------------
+    def invalidate(self, endpoint_id):
+        """Mark an endpoint as created/updated; it is re-read on the next refresh."""
+        endpoint_id = str(endpoint_id)
+        self._removed.discard(endpoint_id)
+        self._dirty.add(endpoint_id)
+
+    def remove(self, endpoint_id):
+        """Mark an endpoint as deleted."""
+        endpoint_id = str(endpoint_id)
+        self._dirty.discard(endpoint_id)
+        self._removed.add(endpoint_id)
+
+    def reset(self):
+        """Force a full reload on the next refresh."""
+        self._loaded = False
+
+    # ----------------------------
+    # Reads
+    # ----------------------------
+    def services(self) -> List[ApiProducerServiceModal]:
+        return list(self._services.values())
+
+    def get(self, endpoint_id) -> Optional[ApiProducerServiceModal]:
+        return self._services.get(str(endpoint_id))
+
+    def __len__(self) -> int:
+        return len(self._services)
+
+    # ----------------------------
+    # Refresh
+    # ----------------------------
+    async def refresh(self, session: AsyncSession) -> Tuple[List[ApiProducerServiceModal], Set[str]]:
+        """
+        Apply pending changes.
+        Returns (upserted services, removed endpoint ids) so callers such as
+        the scheduler can update themselves incrementally.
+        """
+        now = time.monotonic()
+        if not self._loaded or (
+            self.full_reload_interval_s and now - self._last_full_reload >= self.full_reload_interval_s
+        ):
+            return await self._full_reload(session, now)
+
+        upserted: Dict[str, ApiProducerServiceModal] = {}
+        removed: Set[str] = set()
+
+        if self._dirty:
+            dirty = self._dirty
+            self._dirty = set()
+            try:
+                rows = await api_service.get_api_services_by_ids(session, dirty)
+            except Exception:
+                self._dirty |= dirty
+                raise
+            for service in rows:
+                upserted[str(service.id)] = service
+            # Invalidated but gone from the table: deleted by someone else
+            removed |= dirty - upserted.keys()
+
+        if self.poll_interval_s and self.high_water and now - self._last_poll >= self.poll_interval_s:
+            self._last_poll = now
+            for service in await api_service.get_api_services_updated_since(session, self.high_water):
+                upserted[str(service.id)] = service
+
+        removed |= self._removed
+        self._removed = set()
+
+        for endpoint_id, service in upserted.items():
+            self._services[endpoint_id] = service
+            self._advance_high_water(service)
+        for endpoint_id in removed:
+            self._services.pop(endpoint_id, None)
+
+        if upserted or removed:
+            logger.info(
+                f"Endpoint registry applied {len(upserted)} upserts and {len(removed)} removals "
+                f"({len(self._services)} endpoints)")
+        return list(upserted.values()), removed
+
+    async def _full_reload(self, session: AsyncSession, now: float):
+        services = await api_service.get_all_api_services(session=session)
+        previous = set(self._services)
+        self._services = {str(s.id): s for s in services}
+        self._dirty.clear()
+        self._removed.clear()
+        self.high_water = None
+        for service in services:
+            self._advance_high_water(service)
+        self._loaded = True
+        self._last_full_reload = self._last_poll = now
+        logger.info(f"Endpoint registry loaded {len(self._services)} endpoints from the database.")
+        return services, previous - self._services.keys()
+
+    def _advance_high_water(self, service: ApiProducerServiceModal):
+        if service.updated_at and (self.high_water is None or service.updated_at > self.high_water):
+            self.high_water = service.updated_at
+
+
+endpoint_registry = EndpointRegistry()
@@ -1,6 +1,16 @@
 import asyncio
-from app.infrastructure.kafka.consumer import KafkaConsumerClient
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+from app.infrastructure.transport.base import ResultConsumer
+from app.infrastructure.transport.factory import get_result_consumer, uses_in_process_consumer
 from app.services.service import ApiService
+from app.services.incident_state import IncidentTracker
+from app.services.result_window import EndpointWindow, ResultWindows
+from app.services.detection import DetectionPolicy, EndpointDetector
+from app.services.threshold_cache import ThresholdCache
+from app.schemas.service import ApiClientLogs
 from app.utils.connect import db
 from app.utils.loggers import get_logger
 from app.core.config import Config
@@ -8,8 +18,37 @@ from app.core.config import Config
 logger = get_logger()
 api_service = ApiService()
 
+# (records newest first, reason, detail, latency rule) of a confirmed incident detection
+IncidentRequest = Tuple[List[dict], str, Optional[str], Optional[str]]
+
+# Failures of the database connection rather than of a result; they never count as attempts
+TRANSIENT_ERRORS = (ConnectionError, OSError, asyncio.TimeoutError, OperationalError, InterfaceError, DisconnectionError)
+
 
 class HealthConsumer:
+    def __init__(self):
+        # endpoint_id -> results of an in-progress failure confirmation burst (oldest first)
+        self.confirmation_bursts: Dict[str, List[dict]] = {}
+        self.batch_mode = Config.HEALTH_CONSUMER_BATCH_MODE
+        # Single-writer mode: health_check_logs rows are written here, in the incident transaction
+        self.writes_logs = Config.HEALTH_LOG_WRITER == "consumer"
+        # Per-endpoint ring buffers of recent results; replaces reading health_check_logs per message
+        self.windows = ResultWindows()
+        # Endpoint thresholds, invalidated by NOTIFY from the update/delete routes
+        self.thresholds = ThresholdCache()
+        # Open incidents per endpoint; only state transitions write to the incidents table
+        self.incidents = IncidentTracker()
+        # (endpoint_id, checked_at) -> failed attempts of a result processed on its own
+        self.attempts: Dict[Tuple[str, str], int] = {}
+        self.max_attempts = Config.CONSUMER_MAX_ATTEMPTS
+        # endpoint_id -> error of its last failed attempt in the current batch
+        self.errors: Dict[str, BaseException] = {}
+        self.batch_stats = {
+            "batches": 0, "messages": 0, "endpoints": 0, "log_writes": 0, "incident_writes": 0, "last_batch_ms": 0.0,
+            "failed_batches": 0, "dead_lettered": 0,
+            "in_flight": 0,  # consumed but not yet committed messages
+        }
+
     async def get_db_session(self):
         """Obtain async DB session."""
         session_gen = db.get_db_session()
@@ -22,83 +61,454 @@ class HealthConsumer:
             await session_gen.aclose()
         return None
 
-    async def process_message(self, msg):
+    def history_needed(self, api_details) -> int:
+        """Results needed to seed an endpoint: its window, or its p95 window when that is longer."""
+        if api_details is None:
+            return self.windows.capacity
+        policy = DetectionPolicy.from_raw(getattr(api_details, "detection_policy", None))
+        if policy.p95_threshold_ms is None:
+            return self.windows.capacity
+        return max(self.windows.capacity, policy.p95_window)
+
+    async def warm_windows(self, session, endpoint_ids, partitions: Dict[str, object], details: Dict[str, object]):
+        """
+        Seed windows, detection accumulators and incident state for endpoints
+        seen for the first time (startup, rebalance, eviction). The rolling
+        p95 is seeded with its whole window from the DB, which can be longer
+        than the in-memory window, so it does not start over after a restart.
+        """
+        missing = self.windows.missing(endpoint_ids)
+        if not missing:
+            return
+        by_limit: Dict[int, List[str]] = {}
+        for endpoint_id in missing:
+            by_limit.setdefault(self.history_needed(details.get(endpoint_id)), []).append(endpoint_id)
+        history: Dict[str, List[dict]] = {}
+        for limit, ids in by_limit.items():
+            history.update(await api_service.get_recent_records_bulk(session, ids, limit=limit))
+        open_incidents = await api_service.get_open_incidents(session, missing)
+        for endpoint_id in missing:
+            records = history.get(endpoint_id, [])
+            partition = partitions.get(endpoint_id)
+            self.windows.warm(endpoint_id, records[:self.windows.capacity], partition)
+            if details.get(endpoint_id) is not None:
+                self.detector_for(self.windows.get(endpoint_id, partition), details[endpoint_id], records)
+            self.incidents.load(endpoint_id, open_incidents.get(endpoint_id), partition)
+
+    @staticmethod
+    def detector_for(window: EndpointWindow, api_details, history: Optional[List[dict]] = None) -> EndpointDetector:
+        """
+        The window's detection accumulators, (re)built when missing or when the
+        endpoint's thresholds or policy changed, from `history` (newest first)
+        or else the window's contents.
+        """
+        detector = window.detector
+        raw_policy = getattr(api_details, "detection_policy", None)
+        expected_latency = api_details.expected_latency_ms or 0
+        key = (expected_latency, raw_policy if isinstance(raw_policy, str) else repr(raw_policy))
+        if detector is None or detector.key != key:
+            detector = EndpointDetector(DetectionPolicy.from_raw(raw_policy), expected_latency, key)
+            records = history if history is not None else window.recent(window.size)
+            for record in reversed(records):
+                detector.update(record["response_time_ms"], bool(record["is_healthy"]))
+            window.detector = detector
+        return detector
+
+    def observe(self, endpoint_id: str, msg, api_details, partition=None) -> EndpointWindow:
+        """Add a result to its endpoint's window and detection accumulators; returns the window."""
+        window = self.windows.get(endpoint_id, partition)
+        detector = self.detector_for(window, api_details)
+        record = self.to_record(msg, self.result_is_healthy(msg, api_details))
+        # Redelivered results are already in the window and must not be counted twice
+        if window.add(record["checked_at"], record["response_time_ms"], record["status_code"], record["is_healthy"]):
+            detector.update(record["response_time_ms"], record["is_healthy"])
+        return window
+
+    def step(self, endpoint_id: str, msg, api_details, partition=None):
+        """Run one result through the window, detection and the incident state machine."""
+        if msg.get("skipped"):
+            # No request was made (open circuit): not evidence about the endpoint itself
+            return
+        window = self.observe(endpoint_id, msg, api_details, partition)
+        incident = self.evaluate(endpoint_id, msg, api_details, window)
+        record = self.to_record(msg, self.result_is_healthy(msg, api_details))
+        # An open latency incident recovers by the same rule that opened it
+        latency_ok = window.detector.latency_ok(record["response_time_ms"], self.incidents.latency_rule(endpoint_id))
+        self.incidents.observe(
+            endpoint_id, record["checked_at"], record["is_healthy"], latency_ok,
+            confirmed=incident, partition=partition)
+
+    async def write_incidents(self, session, endpoint_ids) -> int:
+        """Write the queued incident transitions of `endpoint_ids`; returns how many rows were written."""
+        inserts, closes = self.incidents.drain(endpoint_ids)
+        if inserts or closes:
+            await api_service.bulk_write_incidents(session, inserts, closes)
+        return len(inserts) + len(closes)
+
+    def forget(self, endpoint_ids):
+        """Drop in-memory state of endpoints whose results will be redelivered."""
+        endpoint_ids = list(endpoint_ids)
+        self.windows.forget(endpoint_ids)
+        self.incidents.forget(endpoint_ids)
+
+    def revoke(self, partitions):
+        self.windows.revoke(partitions)
+        self.incidents.revoke(partitions)
+        # Revoked results go to another consumer; counts for the rest simply restart
+        self.attempts.clear()
+
+    async def process_message(self, msg, partition=None) -> bool:
         """
         Main business logic after Kafka message received.
+        Returns False when the message must be redelivered (its DB effects did not commit).
         """
         endpoint_id = str(msg["id"])
         session = await self.get_db_session()
         if not session:
             logger.error("Failed to open DB session.")
-            return
+            self.errors[endpoint_id] = ConnectionError("no database session")
+            return False
 
         try:
             # --- Fetch data using service layer ---
-            api_details = await api_service.getConsumerServiceDetails(session, endpoint_id)
-            api_last_three_records = await api_service.getApiLastThreeRecords(session, endpoint_id)
+            api_details = await self.thresholds.get(session, endpoint_id)
 
             if not api_details:
                 logger.warning(f"No API details found for endpoint {endpoint_id}")
-                return
-
-            expected_status = api_details.expected_status_code
-            expected_latency = api_details.expected_latency_ms or 0
-            actual_status = msg["status_code"]
-            actual_latency = msg["response_time_ms"] or 0
-
-            # --- Status comparison ---
-            if actual_status == expected_status:
-                if actual_latency > expected_latency:
-                    await self.handle_latency_warning(session, endpoint_id, api_last_three_records, api_details)
-                else:
-                    logger.info(f"{api_details.name}: ✅ Healthy")
-            else:
-                await self.handle_failure(session, endpoint_id, api_last_three_records, api_details)
+                return True
+
+            await self.warm_windows(session, [endpoint_id], {endpoint_id: partition}, {endpoint_id: api_details})
+            self.step(endpoint_id, msg, api_details, partition)
+            logs = [self.to_log(msg, api_details)] if self.writes_logs else []
+            if logs:
+                await api_service.bulk_insert_api_logs(session, logs)
+            if await self.write_incidents(session, [endpoint_id]) or logs:
+                await session.commit()
+            return True
 
         except Exception as e:
             logger.error(f"Error processing message for endpoint {endpoint_id}: {e}", exc_info=True)
+            self.errors[endpoint_id] = e
+            await session.rollback()
+            self.forget([endpoint_id])
+            return False
         finally:
             await session.close()
 
-    async def handle_failure(self, session, endpoint_id: str, last_three_records, api_details):
-        """Triggered when API status mismatches expected."""
-        if len(last_three_records) < 3:
-            return
+    @staticmethod
+    def result_is_healthy(msg, api_details) -> bool:
+        # The producer's verdict also covers response_validation
+        is_healthy = msg.get("is_healthy")
+        if is_healthy is None:
+            is_healthy = msg["status_code"] == api_details.expected_status_code
+        return is_healthy
 
-        all_failed = all(not record["is_healthy"] for record in last_three_records)
-        if all_failed:
-            logger.warning(f"⚠️ {api_details.name} failed 3 consecutive checks.")
-            await api_service.createOrUpdateIncident(session, endpoint_id, last_three_records, reason="failure")
-        else:
-            logger.info(f"{api_details.name}: Some requests were healthy — skipping failure incident.")
+    def evaluate(self, endpoint_id: str, msg, api_details, window: EndpointWindow) -> Optional[IncidentRequest]:
+        """
+        Decide whether one result opens or extends an incident, using the
+        endpoint's detection policy; returns the incident to record, if any.
+        """
+        is_healthy = self.result_is_healthy(msg, api_details)
 
+        # --- Failure confirmation bursts: the rechecks themselves are the confirmation ---
+        confirmed_records = self.track_confirmation(endpoint_id, msg, is_healthy)
+        if confirmed_records:
+            rechecks = len(confirmed_records) - 1
+            logger.warning(f"⚠️ {api_details.name} failure confirmed by {rechecks} rechecks.")
+            return confirmed_records, "failure", f"A failed check was confirmed by {rechecks} failed rechecks.", None
+        if msg.get("confirm_attempt"):
+            return None
 
-    async def handle_latency_warning(self, session, endpoint_id: str, last_three_records, api_details):
-        """Triggered when latency > expected threshold."""
-        if len(last_three_records) < 3:
-            return
+        if is_healthy:
+            if window.detector.latency_alert():
+                return self.handle_latency_warning(endpoint_id, window, api_details, phases=msg.get("phases"))
+            logger.info(f"{api_details.name}: ✅ Healthy")
+            return None
+        return self.handle_failure(endpoint_id, window, api_details)
 
-        expected_latency = api_details.expected_latency_ms or 0
-        high_latency_count = sum(record["response_time_ms"] > expected_latency for record in last_three_records)
+    @staticmethod
+    def to_record(msg, is_healthy: bool) -> dict:
+        checked_at = msg["checked_at"]
+        return {
+            "checked_at": datetime.fromisoformat(checked_at) if isinstance(checked_at, str) else checked_at,
+            "is_healthy": is_healthy,
+            "response_time_ms": msg.get("response_time_ms"),
+            "status_code": msg.get("status_code"),
+        }
+
+    def to_log(self, msg, api_details) -> ApiClientLogs:
+        """The health_check_logs row of a result (HEALTH_LOG_WRITER=consumer)."""
+        return ApiClientLogs(
+            id=msg["id"],
+            checked_at=msg["checked_at"],
+            response_time_ms=msg.get("response_time_ms"),
+            status_code=msg.get("status_code"),
+            is_healthy=self.result_is_healthy(msg, api_details),
+            response_body=msg.get("response_body"),
+            error_message=msg.get("error_message"),
+            phases=msg.get("phases"),
+        )
+
+    async def process_bulk(self, batch) -> bool:
+        """
+        Batch mode: evaluate a whole poll with a fixed number of queries.
+
+        Thresholds come from the threshold cache and recent history from the
+        in-memory windows (only endpoints not seen recently are read from the
+        DB); open incidents are tracked in memory and only their transitions
+        are written. With HEALTH_LOG_WRITER=consumer the batch's log rows are
+        inserted in the same transaction.
+        Returns whether the batch's effects committed. Results are evaluated per endpoint in order and all incident
+        changes are written in bulk in a single transaction.
+        """
+        start = time.perf_counter()
+        by_endpoint: Dict[str, List[dict]] = {}
+        partitions: Dict[str, object] = {}
+        for partition, messages in batch.items():
+            for msg in messages:
+                endpoint_id = str(msg["id"])
+                by_endpoint.setdefault(endpoint_id, []).append(msg)
+                partitions[endpoint_id] = partition
+        message_count = sum(len(messages) for messages in by_endpoint.values())
+
+        session = await self.get_db_session()
+        if not session:
+            logger.error("Failed to open DB session.")
+            self.errors.update(dict.fromkeys(by_endpoint, ConnectionError("no database session")))
+            return False
+
+        try:
+            endpoint_ids = list(by_endpoint)
+            details = await self.thresholds.get_many(session, endpoint_ids)
+            await self.warm_windows(session, endpoint_ids, partitions, details)
+
+            logs: List[ApiClientLogs] = []
+            for endpoint_id, endpoint_messages in by_endpoint.items():
+                api_details = details.get(endpoint_id)
+                if not api_details:
+                    # Deleted endpoint: nothing to evaluate and no row to reference it
+                    logger.warning(f"No API details found for endpoint {endpoint_id}")
+                    continue
+                for msg in endpoint_messages:
+                    self.step(endpoint_id, msg, api_details, partitions[endpoint_id])
+                    if self.writes_logs:
+                        logs.append(self.to_log(msg, api_details))
+
+            if logs:
+                await api_service.bulk_insert_api_logs(session, logs)
+            incident_writes = await self.write_incidents(session, by_endpoint)
+            if incident_writes or logs:
+                await session.commit()
 
-        if high_latency_count == 3:
-            logger.warning(f"⚠️ {api_details.name} exceeded latency in last 3 checks.")
-            await api_service.createOrUpdateIncident(session, endpoint_id, last_three_records, reason="latency")
+            self.batch_stats["batches"] += 1
+            self.batch_stats["messages"] += message_count
+            self.batch_stats["endpoints"] += len(by_endpoint)
+            self.batch_stats["log_writes"] += len(logs)
+            self.batch_stats["incident_writes"] += incident_writes
+            self.batch_stats["last_batch_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            if self.batch_stats["batches"] % 100 == 0:
+                logger.info(
+                    f"Consumer stats: {self.batch_stats}, windows: {self.windows.memory_report()}, "
+                    f"thresholds: {self.thresholds.stats}, incidents: {self.incidents.counts()} {self.incidents.stats}")
+            return True
+        except Exception as e:
+            logger.error(f"Error processing batch of {message_count} messages: {e}", exc_info=True)
+            self.errors.update(dict.fromkeys(by_endpoint, e))
+            await session.rollback()
+            # The batch is redelivered; its results must not count twice in memory
+            self.forget(by_endpoint)
+            self.batch_stats["failed_batches"] += 1
+            return False
+        finally:
+            await session.close()
+
+    def track_confirmation(self, endpoint_id: str, msg, is_healthy: bool) -> Optional[List[dict]]:
+        """
+        Follow failure confirmation bursts sent by the producer.
+        A failed regular check opens a burst; each failed recheck joins it.
+        When the last recheck of the burst has failed too, returns the burst's
+        records (newest first, like the window); a healthy
+        result anywhere ends the burst without confirming it.
+        """
+        attempt = msg.get("confirm_attempt") or 0
+        total = msg.get("confirm_total") or 0
+        record = self.to_record(msg, is_healthy)
+
+        if attempt == 0:
+            if is_healthy:
+                self.confirmation_bursts.pop(endpoint_id, None)
+            else:
+                self.confirmation_bursts[endpoint_id] = [record]
+            return None
+
+        burst = self.confirmation_bursts.get(endpoint_id)
+        if burst is None or is_healthy:
+            self.confirmation_bursts.pop(endpoint_id, None)
+            return None
+
+        burst.append(record)
+        if attempt >= total:
+            del self.confirmation_bursts[endpoint_id]
+            return burst[::-1]
+        return None
+
+    def handle_failure(self, endpoint_id: str, window: EndpointWindow, api_details) -> Optional[IncidentRequest]:
+        """Triggered when API status mismatches expected; opens an incident on n failures of the last m."""
+        detector = window.detector
+        if detector.failure_alert():
+            policy = detector.policy
+            detail = f"{detector.failures.count} of the last {len(detector.failures)} checks failed."
+            logger.warning(f"⚠️ {api_details.name} failure incident. {detail}")
+            return detector.bad_records(window.recent(policy.failure_m)) or window.recent(1), "failure", detail, None
+        logger.info(f"{api_details.name}: Some requests were healthy — skipping failure incident.")
+        return None
+
+
+    @staticmethod
+    def slowest_phase(phases):
+        """Return (phase name, ms) of the largest phase timing in a result, or None."""
+        if not phases:
+            return None
+        timed = [(name.removesuffix("_ms"), ms) for name, ms in phases.items() if ms is not None]
+        return max(timed, key=lambda item: item[1]) if timed else None
+
+    def handle_latency_warning(self, endpoint_id: str, window: EndpointWindow, api_details,
+                               phases=None) -> Optional[IncidentRequest]:
+        """Triggered when a latency rule of the endpoint's policy (n of m, rolling p95, EWMA drift) is breached."""
+        alert = window.detector.latency_alert()
+        if alert:
+            rule, lookback, limit_ms, description = alert
+            slowest = self.slowest_phase(phases)
+            detail = f"{description} Slowest phase: {slowest[0]} ({slowest[1]} ms)." if slowest else description
+            logger.warning(f"⚠️ {api_details.name} latency incident. {detail}")
+            records = window.detector.bad_records(window.recent(lookback), limit_ms) or window.recent(1)
+            return records, "latency", detail, rule
+        logger.info(f"{api_details.name}: Latency spike not consistent — skipping latency incident.")
+        return None
+
+    @staticmethod
+    def message_key(msg) -> Tuple[str, str]:
+        return str(msg["id"]), str(msg["checked_at"])
+
+    async def attempt(self, msg, partition=None) -> bool:
+        """
+        Process one result on its own. A result that keeps failing by itself,
+        not because the database is unreachable, is dead-lettered after
+        `max_attempts` attempts so that its partition can move on.
+        Returns whether the partition may continue past this result.
+        """
+        if self.batch_mode:
+            ok = await self.process_bulk({partition: [msg]})
         else:
-            logger.info(f"{api_details.name}: Latency spike not consistent — skipping latency incident.")
+            ok = await self.process_message(msg, partition)
+        key = self.message_key(msg)
+        error = self.errors.pop(key[0], None)
+        if ok:
+            self.attempts.pop(key, None)
+            return True
+        if isinstance(error, TRANSIENT_ERRORS):
+            return False
+
+        attempts = self.attempts.get(key, 0) + 1
+        if attempts < self.max_attempts:
+            self.attempts[key] = attempts
+            return False
+        self.attempts.pop(key, None)
+        self.dead_letter(msg, partition, attempts, error)
+        return True
+
+    def dead_letter(self, msg, partition, attempts: int, error: Optional[BaseException]):
+        """Give up on a result: log it in full and skip it."""
+        self.batch_stats["dead_lettered"] += 1
+        logger.error(
+            f"Dead-lettering result of endpoint {msg['id']} checked at {msg['checked_at']} (partition {partition}) "
+            f"after {attempts} failed attempts, last error: {error!r}. Result: {msg}")
+
+    async def process_partition(self, partition, messages) -> bool:
+        """Process one partition's messages strictly in offset order, stopping at the first failure."""
+        for message in messages:
+            if not await self.attempt(message, partition):
+                return False
+        return True
+
+    async def process_partition_endpoints(self, partition, messages) -> bool:
+        """
+        Batch-mode fallback after a failed bulk attempt: each endpoint of the
+        partition is processed on its own, and a failing endpoint result by
+        result, so one bad endpoint only holds back itself. Returns whether
+        the whole partition is done.
+        """
+        by_endpoint: Dict[str, List[dict]] = {}
+        for msg in messages:
+            by_endpoint.setdefault(str(msg["id"]), []).append(msg)
+
+        done = True
+        for endpoint_messages in by_endpoint.values():
+            if await self.process_bulk({partition: endpoint_messages}):
+                continue
+            if isinstance(self.errors.get(str(endpoint_messages[0]["id"])), TRANSIENT_ERRORS):
+                return False
+            for msg in endpoint_messages:
+                if not await self.attempt(msg, partition):
+                    done = False
+                    break
+        return done
+
+    async def process_batch(self, batch) -> List[object]:
+        """
+        Process one poll: in batch mode all partitions together with set-based
+        queries (falling back to endpoint by endpoint when that fails),
+        otherwise partitions concurrently and each one sequentially.
+        Returns the partitions whose DB effects committed and can be acknowledged.
+        """
+        partitions = list(batch)
+        try:
+            if self.batch_mode:
+                if await self.process_bulk(batch):
+                    return partitions
+                if any(isinstance(error, TRANSIENT_ERRORS) for error in self.errors.values()):
+                    return []  # the database is unreachable: retrying piece by piece would not help
+                outcomes = await asyncio.gather(*(self.process_partition_endpoints(p, batch[p]) for p in partitions))
+            else:
+                outcomes = await asyncio.gather(*(self.process_partition(p, batch[p]) for p in partitions))
+            return [partition for partition, ok in zip(partitions, outcomes) if ok]
+        finally:
+            self.errors.clear()
+
+
+async def run_health_consumer(consumer: ResultConsumer):
+    """Pass batches from a result transport to the business logic until it stops."""
+    logic = HealthConsumer()
+    consumer.on_partitions_revoked(logic.revoke)
+    await logic.thresholds.start()
+    try:
+        async for batch in consumer.consume_partition_batches():
+            logic.batch_stats["in_flight"] = consumer.in_flight
+            committed = await logic.process_batch(batch)
+            # Offsets/acks only for partitions whose DB effects are durable; the rest is redelivered
+            await consumer.commit(committed)
+            logic.batch_stats["in_flight"] = consumer.in_flight
+            if len(committed) < len(batch):
+                logger.warning(
+                    f"{consumer.in_flight} messages in {len(batch) - len(committed)} partitions not committed; "
+                    f"redelivering in {Config.CONSUMER_RETRY_BACKOFF_S}s")
+                await asyncio.sleep(Config.CONSUMER_RETRY_BACKOFF_S)
+    finally:
+        await logic.thresholds.close()
+        await consumer.close()
 
 
 async def start_health_consumer():
-    """Run Kafka consumer and pass messages to business logic."""
+    """Run the standalone health consumer on the configured result transport."""
+    if uses_in_process_consumer():
+        logger.error("RESULT_TRANSPORT=memory runs the consumer inside the API process; nothing to do here.")
+        return
+
     # Initialize database connection
     await db.init_db()
     logger.info("Database connection initialized for consumer")
-    
-    kafka_consumer = KafkaConsumerClient()
-    logic = HealthConsumer()
 
-    async for message in kafka_consumer.consume_messages():
-        await logic.process_message(message)
+    await run_health_consumer(get_result_consumer())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from app.core.config import Config
+from app.services.detection import rule_of_description
+from app.services.service import INCIDENT_ERROR_MESSAGES, incident_reason
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+HEALTHY = "healthy"
+SUSPECT = "suspect"
+OPEN = "open"
+RECOVERING = "recovering"
+CLOSED = "closed"
+
+
+class EndpointIncident:
+    """Incident state of one endpoint that is not plain healthy."""
+
+    __slots__ = ("state", "reason", "rule", "start_time", "recovering_since", "recovery_count", "partition")
+
+    def __init__(self, state: str, partition: Optional[Hashable] = None):
+        self.state = state
+        self.reason: Optional[str] = None
+        self.rule: Optional[str] = None  # latency rule that opened a latency incident
+        self.start_time: Optional[datetime] = None
+        self.recovering_since: Optional[datetime] = None
+        self.recovery_count = 0
+        self.partition = partition
+
+
+class IncidentTracker:
+    """
+    Per-endpoint incident state machine held by the consumer:
+
+        healthy -> suspect     a bad result (unhealthy or slower than expected)
+        suspect -> healthy     a good result
+        suspect -> open        detection confirmed an incident  (INSERT, end_time NULL)
+        open -> recovering     a result that is good for the incident's reason
+                               (for latency: by the rule that opened it)
+        recovering -> open     a bad result again
+        recovering -> closed   `recovery_checks` good results in a row
+                               (UPDATE end_time = first good result), then healthy
+
+    A confirmed incident of the other reason while open closes the current
+    one and opens a new one. Only transitions into open and closed write;
+    the writes are queued here and taken per endpoint with drain(). Endpoints without an
+    entry are healthy. An endpoint's state is loaded from its open incident
+    (end_time IS NULL) the first time the consumer sees it.
+    """
+
+    def __init__(self, recovery_checks: Optional[int] = None):
+        self.recovery_checks = recovery_checks or Config.INCIDENT_RECOVERY_CHECKS
+        self._states: Dict[str, EndpointIncident] = {}
+        self._inserts: List[Dict[str, Any]] = []
+        self._closes: List[Dict[str, Any]] = []
+        self.stats: Dict[str, int] = {"opened": 0, "closed": 0, "suspected": 0}
+
+    def state_of(self, endpoint_id: str) -> str:
+        entry = self._states.get(endpoint_id)
+        return entry.state if entry else HEALTHY
+
+    def load(self, endpoint_id: str, open_incident: Optional[Dict[str, Any]], partition: Optional[Hashable] = None):
+        """Set an endpoint's state from its open incident row (or healthy when there is none)."""
+        self._states.pop(endpoint_id, None)
+        if open_incident is None:
+            return
+        entry = EndpointIncident(OPEN, partition)
+        entry.start_time = open_incident["start_time"]
+        error = open_incident.get("initial_error") or ""
+        entry.reason = "latency" if incident_reason(error) == "latency" else "failure"
+        if entry.reason == "latency":
+            entry.rule = rule_of_description(error)
+        self._states[endpoint_id] = entry
+
+    def latency_rule(self, endpoint_id: str) -> Optional[str]:
+        """The rule that opened the endpoint's latency incident, if one is open."""
+        entry = self._states.get(endpoint_id)
+        if entry is None or entry.reason != "latency" or entry.state not in (OPEN, RECOVERING):
+            return None
+        return entry.rule
+
+    def observe(self, endpoint_id: str, checked_at: datetime, is_healthy: bool, latency_ok: bool,
+                confirmed: Optional[Tuple[List[dict], str, Optional[str], Optional[str]]] = None,
+                partition: Optional[Hashable] = None):
+        """
+        Advance an endpoint's state with one result. `confirmed` is the
+        (records newest first, reason, detail, latency rule) of an incident
+        detection just confirmed, if any. For an open latency incident,
+        `latency_ok` must be judged by its latency_rule().
+        """
+        entry = self._states.get(endpoint_id)
+        state = entry.state if entry else HEALTHY
+
+        if confirmed:
+            records, reason, detail, rule = confirmed
+            if state in (OPEN, RECOVERING):
+                if entry.reason == reason:
+                    entry.state = OPEN
+                    entry.recovery_count = 0
+                    return
+                self._close(endpoint_id, entry, records[-1]["checked_at"])
+            self._open(endpoint_id, records[-1]["checked_at"], reason, detail, rule, partition)
+            return
+
+        if state in (HEALTHY, SUSPECT):
+            if is_healthy and latency_ok:
+                self._states.pop(endpoint_id, None)
+            elif state == HEALTHY:
+                self._states[endpoint_id] = EndpointIncident(SUSPECT, partition)
+                self.stats["suspected"] += 1
+            return
+
+        recovered = is_healthy and (latency_ok or entry.reason != "latency")
+        if not recovered:
+            entry.state = OPEN
+            entry.recovery_count = 0
+            return
+        if state == OPEN:
+            entry.state = RECOVERING
+            entry.recovering_since = checked_at
+            entry.recovery_count = 0
+        entry.recovery_count += 1
+        if entry.recovery_count >= self.recovery_checks:
+            self._close(endpoint_id, entry, entry.recovering_since)
+
+    def _open(self, endpoint_id: str, start_time: datetime, reason: str, detail: Optional[str],
+              rule: Optional[str], partition: Optional[Hashable]):
+        error_message = INCIDENT_ERROR_MESSAGES["failure" if reason == "failure" else "latency"]
+        entry = EndpointIncident(OPEN, partition)
+        entry.reason = reason
+        entry.rule = rule
+        entry.start_time = start_time
+        self._states[endpoint_id] = entry
+        self._inserts.append({
+            "endpoint_id": endpoint_id,
+            "start_time": start_time,
+            "initial_error": f"{error_message} {detail}" if detail else error_message,
+        })
+        self.stats["opened"] += 1
+        logger.warning(f"Incident opened for endpoint {endpoint_id} ({reason})")
+
+    def _close(self, endpoint_id: str, entry: EndpointIncident, end_time: datetime):
+        entry.state = CLOSED
+        self._closes.append({"endpoint_id": endpoint_id, "start_time": entry.start_time, "end_time": end_time})
+        self._states.pop(endpoint_id, None)
+        self.stats["closed"] += 1
+        logger.info(f"Incident closed for endpoint {endpoint_id} ({entry.reason}) at {end_time}")
+
+    def drain(self, endpoint_ids: Iterable[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Take the queued (inserts, closes) of `endpoint_ids` for writing.
+        Partitions are processed concurrently, so each caller only takes the
+        endpoints it stepped; another session's rollback must not lose them.
+        """
+        endpoint_ids = set(endpoint_ids)
+        inserts = [i for i in self._inserts if i["endpoint_id"] in endpoint_ids]
+        closes = [c for c in self._closes if c["endpoint_id"] in endpoint_ids]
+        if inserts:
+            self._inserts = [i for i in self._inserts if i["endpoint_id"] not in endpoint_ids]
+        if closes:
+            self._closes = [c for c in self._closes if c["endpoint_id"] not in endpoint_ids]
+        return inserts, closes
+
+    def forget(self, endpoint_ids: Iterable[str]):
+        """Drop states and queued writes that did not commit; they are reloaded on next sight."""
+        endpoint_ids = set(endpoint_ids)
+        for endpoint_id in endpoint_ids:
+            self._states.pop(endpoint_id, None)
+        self._inserts = [i for i in self._inserts if i["endpoint_id"] not in endpoint_ids]
+        self._closes = [c for c in self._closes if c["endpoint_id"] not in endpoint_ids]
+
+    def revoke(self, partitions: Iterable[Hashable]):
+        revoked = set(partitions)
+        for endpoint_id in [e for e, entry in self._states.items() if entry.partition in revoked]:
+            del self._states[endpoint_id]
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry in self._states.values():
+            counts[entry.state] = counts.get(entry.state, 0) + 1
+        return counts
@@ -0,0 +1,194 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import Config
+from app.utils.connect import db
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+PARENT_TABLE = "health_check_logs"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+_BOUNDS = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+
+def _parse_bound(value: str) -> datetime:
+    if value == "MINVALUE":
+        return datetime.min
+    if value == "MAXVALUE":
+        return datetime.max
+    return datetime.fromisoformat(value.strip("'"))
+
+
+class LogPartitionManager:
+    """
+    Maintenance of the range partitions of health_check_logs on checked_at.
+
+    One partition per day or week (LOG_PARTITION_INTERVAL), created
+    LOG_PARTITION_PREMAKE_DAYS ahead so inserts never wait for DDL; rows
+    outside every range land in the default partition. Retention
+    (LOG_RETENTION_DAYS) detaches and drops whole partitions once their
+    upper bound is older than the cutoff, instead of DELETEing rows. Does
+    nothing while the table is not partitioned (see the migrations).
+
+    Every partition is created or dropped in its own savepoint, so one
+    failure (logged as an ALERT and counted in stats) does not undo the
+    rest of the run.
+    """
+
+    def __init__(self, interval: Optional[str] = None, premake_days: Optional[int] = None,
+                 retention_days: Optional[int] = None):
+        self.interval = interval or Config.LOG_PARTITION_INTERVAL
+        self.step = timedelta(days=7 if self.interval == "week" else 1)
+        self.premake_days = Config.LOG_PARTITION_PREMAKE_DAYS if premake_days is None else premake_days
+        self.retention_days = Config.LOG_RETENTION_DAYS if retention_days is None else retention_days
+        self.stats: Dict[str, Any] = {"created": 0, "dropped": 0, "moved_rows": 0, "failed": 0, "last_run": None}
+
+    def period_start(self, day: date) -> date:
+        return day - timedelta(days=day.weekday()) if self.interval == "week" else day
+
+    @staticmethod
+    def partition_name(start: date) -> str:
+        return f"{PARENT_TABLE}_p{start:%Y%m%d}"
+
+    async def is_partitioned(self, session: AsyncSession) -> bool:
+        result = await session.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:parent);"),
+            {"parent": PARENT_TABLE},
+        )
+        return bool(result.scalar())
+
+    async def list_partitions(self, session: AsyncSession) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+        """
+        (name, lower bound, upper bound) of every partition; bounds are None
+        for the default partition, MINVALUE/MAXVALUE map to datetime.min/max.
+        """
+        result = await session.execute(text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:parent);
+        """), {"parent": PARENT_TABLE})
+        partitions = []
+        for name, bound in result.fetchall():
+            match = _BOUNDS.search(bound or "")
+            if match:
+                partitions.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+            else:
+                partitions.append((name, None, None))
+        return partitions
+
+    async def ensure_partitions(self, session: AsyncSession, now: datetime) -> List[str]:
+        """
+        Create the default partition and any missing partition from the
+        current period to the premake horizon. Each partition is created in
+        its own savepoint; one that fails is reported and skipped, and the
+        other ranges are still created.
+        """
+        existing = await self.list_partitions(session)
+        ranges = [(lower, upper) for _, lower, upper in existing if lower is not None]
+        if not any(lower is None for _, lower, _ in existing):
+            await session.execute(text(f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF {PARENT_TABLE} DEFAULT;'))
+
+        created = []
+        start = self.period_start(now.date())
+        horizon = now.date() + timedelta(days=self.premake_days)
+        while start <= horizon:
+            lower = datetime.combine(start, datetime.min.time())
+            upper = lower + self.step
+            # Skip ranges already covered (also after switching between day and week partitions)
+            if not any(lower < other_upper and other_lower < upper for other_lower, other_upper in ranges):
+                name = self.partition_name(start)
+                try:
+                    async with session.begin_nested():
+                        await self.create_partition(session, name, lower, upper)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.error(
+                        f"ALERT: could not create log partition {name} [{lower}, {upper}): {e}; "
+                        f"its rows keep landing in {DEFAULT_PARTITION}", exc_info=True)
+                else:
+                    ranges.append((lower, upper))
+                    created.append(name)
+            start += self.step
+        return created
+
+    async def create_partition(self, session: AsyncSession, name: str, lower: datetime, upper: datetime):
+        """
+        Create one range partition. Postgres refuses to create a range while
+        the default partition holds rows inside it (maintenance that fell
+        behind), so those rows are moved: the default partition is detached,
+        the range created, the rows moved into it and the default reattached.
+        """
+        bounds = {"lower": lower, "upper": upper}
+        stranded = await session.execute(text(
+            f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" '
+            f"WHERE checked_at >= :lower AND checked_at < :upper);"
+        ), bounds)
+        create = text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}');"
+        )
+        if not stranded.scalar():
+            await session.execute(create)
+            return
+
+        await session.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{DEFAULT_PARTITION}";'))
+        await session.execute(create)
+        moved = await session.execute(text(
+            f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+            f"WHERE checked_at >= :lower AND checked_at < :upper RETURNING *) "
+            f"INSERT INTO {PARENT_TABLE} SELECT * FROM moved;"
+        ), bounds)
+        await session.execute(text(f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT;'))
+        self.stats["moved_rows"] += moved.rowcount
+        logger.warning(f"Moved {moved.rowcount} rows from {DEFAULT_PARTITION} into the new partition {name}")
+
+    async def drop_expired_partitions(self, session: AsyncSession, now: datetime) -> List[str]:
+        """Detach and drop partitions that only hold rows older than the retention cutoff."""
+        if self.retention_days <= 0:
+            return []
+        cutoff = now - timedelta(days=self.retention_days)
+        dropped = []
+        for name, _, upper in await self.list_partitions(session):
+            if upper is not None and upper <= cutoff:
+                try:
+                    async with session.begin_nested():
+                        await session.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}";'))
+                        await session.execute(text(f'DROP TABLE "{name}";'))
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.error(f"ALERT: could not drop expired log partition {name}: {e}", exc_info=True)
+                else:
+                    dropped.append(name)
+        return dropped
+
+    async def maintain(self, session: AsyncSession, now: Optional[datetime] = None):
+        now = now or datetime.utcnow()
+        if not await self.is_partitioned(session):
+            logger.warning(f"{PARENT_TABLE} is not partitioned; skipping partition maintenance")
+            return
+        created = await self.ensure_partitions(session, now)
+        dropped = await self.drop_expired_partitions(session, now)
+        await session.commit()
+        self.stats["created"] += len(created)
+        self.stats["dropped"] += len(dropped)
+        self.stats["last_run"] = now.isoformat()
+        logger.info(f"Log partitions maintained: created {created or 'none'}, dropped {dropped or 'none'}")
+
+
+log_partitions = LogPartitionManager()
+
+
+async def maintain_log_partitions():
+    """Periodic job: create upcoming health_check_logs partitions and drop expired ones."""
+    if db.pg_session_factory is None:
+        raise RuntimeError("pg_session_factory is not initialized")
+    async with db.pg_session_factory() as session:
+        try:
+            await log_partitions.maintain(session)
+        except Exception as e:
+            logger.error(f"Log partition maintenance failed: {e}", exc_info=True)
+            await session.rollback()
@@ -0,0 +1,54 @@
+from typing import List
+from app.core.config import Config
+from app.schemas.service import ApiClientLogs
+from app.services.service import ApiService
+from app.utils.batcher import AsyncBatcher
+from app.utils.connect import db
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+api_service = ApiService()
+
+
+class HealthLogWriter:
+    """
+    Batches health_check_logs inserts.
+    Checks hand their ApiClientLogs to add(); rows are written with one
+    multi-row INSERT and one commit per batch instead of one per probe.
+    """
+
+    def __init__(self):
+        self.batcher: AsyncBatcher[ApiClientLogs] = AsyncBatcher(
+            "health_log_writer",
+            self._write_batch,
+            max_size=Config.HEALTH_LOG_BATCH_SIZE,
+            max_delay_s=Config.HEALTH_LOG_FLUSH_INTERVAL_S,
+        )
+
+    @property
+    def stats(self):
+        """Flush latency, batch size and failure counters."""
+        return self.batcher.stats
+
+    async def add(self, log: ApiClientLogs):
+        await self.batcher.add(log)
+
+    async def start(self):
+        await self.batcher.start()
+        logger.info(
+            f"Health log writer started (batch_size={self.batcher.max_size}, "
+            f"flush_interval={self.batcher.max_delay_s}s)")
+
+    async def close(self):
+        await self.batcher.close()
+        logger.info(f"Health log writer closed: {self.stats}")
+
+    async def _write_batch(self, logs: List[ApiClientLogs]):
+        if db.pg_session_factory is None:
+            raise RuntimeError("pg_session_factory is not initialized")
+        async with db.pg_session_factory() as session:
+            await api_service.bulk_insert_api_logs(session, logs)
+            await session.commit()
+
+
+health_log_writer = HealthLogWriter()
@@ -1,10 +1,19 @@
+import asyncio
+import time
+from datetime import datetime
 from app.utils.loggers import get_logger
-from typing import List
+from typing import Dict, Optional
+from app.core.config import Config
 from app.utils.connect import db
 from app.services.service import ApiService
+from app.services.check_scheduler import CheckScheduler
+from app.services.endpoint_registry import endpoint_registry
+from app.services.log_writer import health_log_writer
+from app.services.response_validation import ValidatorCache
 from app.infrastructure.clients.api_client import check_api_health
-from app.schemas.service import ApiProducerServiceModal, ProducerResultModal, ApiClientLogs
-from app.infrastructure.kafka.producer import producer_client
+from app.infrastructure.clients.host_guard import host_guard
+from app.schemas.service import ApiProducerServiceModal, ProducerResultModal, ApiClientLogs, ApiResponseModal
+from app.infrastructure.transport.factory import get_result_publisher
 
 logger = get_logger()
 api_service = ApiService()
@@ -12,7 +21,25 @@ api_service = ApiService()
 
 class Producer:
     def __init__(self):
-        pass  # no async in __init__
+        # no async in __init__
+        self.max_concurrency = Config.HEALTH_CHECK_MAX_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.scheduler = CheckScheduler(self.run_scheduled_check)
+        self.validators = ValidatorCache()
+        self.confirm_rechecks = Config.FAILURE_CONFIRM_RECHECKS
+        self.confirm_spacing_s = Config.FAILURE_CONFIRM_SPACING_S
+        self._recheck_semaphore = asyncio.Semaphore(Config.FAILURE_CONFIRM_MAX_CONCURRENCY)
+        self._confirming: Dict[str, asyncio.Task] = {}
+        # wall_time_ms covers the wait for a concurrency slot as well as the check itself
+        self.stats: Dict[str, int] = {
+            "checks": 0, "missed_slot": 0, "last_wall_time_ms": 0, "max_wall_time_ms": 0,
+            "max_concurrency": self.max_concurrency,
+        }
+        self._reported_missed = 0
+        # Kafka, in-process queue or Redis Streams, per RESULT_TRANSPORT
+        self.publisher = get_result_publisher()
+        # "consumer": results carry the log fields and the consumer is the only writer of health_check_logs
+        self.consumer_writes_logs = Config.HEALTH_LOG_WRITER == "consumer"
 
     async def get_db_session(self):
         """Obtain a single AsyncSession from a fresh generator."""
@@ -31,74 +58,231 @@ class Producer:
         return None
         
 
-    async def get_all_api(self) -> List[ApiProducerServiceModal]:
-        """Fetch all monitored endpoints safely using get_db_session."""
-        services_to_check: List[ApiProducerServiceModal] = []
+    async def refresh_registry(self):
+        """
+        Apply pending endpoint changes to the registry.
+        Returns (upserted, removed), or None if the registry could not be refreshed.
+        """
         session = await self.get_db_session()
         if not session:
-            return []
+            return None
 
         try:
-            services_to_check = await api_service.get_all_api_services(session=session)
-            logger.info(
-                f"Fetched {len(services_to_check)} services from the database.")
+            return await endpoint_registry.refresh(session)
         except Exception as e:
+            # Keep serving the last known endpoint set
             logger.error(
-                f"Failed to fetch services from database: {e}", exc_info=True)
-        return services_to_check
+                f"Failed to refresh endpoint registry: {e}", exc_info=True)
+            return None
+        finally:
+            await session.close()
+
+
+    async def close(self):
+        """Stop the scheduler and any confirmation bursts still running."""
+        await self.scheduler.stop()
+        tasks = list(self._confirming.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def refresh_schedule(self):
+        """Apply endpoint registry changes to the per-endpoint scheduler."""
+        changes = await self.refresh_registry()
+        if changes is None:
+            return
+
+        self.report_stats()
+        upserted, removed = changes
+        for service in upserted:
+            self.scheduler.schedule(service)
+        for endpoint_id in removed:
+            self.scheduler.unschedule(endpoint_id)
+            self.validators.discard(endpoint_id)
+        if upserted or removed:
+            logger.info(
+                f"Schedule updated: {len(self.scheduler)} endpoints, "
+                f"checks={self.stats['checks']}, missed_slot={self.stats['missed_slot']}, "
+                f"max_wall_time_ms={self.stats['max_wall_time_ms']}, "
+                f"skipped_slots={self.scheduler.skipped_slots}, busy_slots={self.scheduler.busy_slots}, "
+                f"open_circuits={host_guard.open_circuits()}")
 
+    async def run_scheduled_check(self, service: ApiProducerServiceModal, due_at: float):
+        """Dispatch target of the scheduler: one check that must finish before its next slot."""
+        interval_s = self.scheduler.interval_for(service)
+        start = time.perf_counter()
+        on_time = await self._run_check(service, due_at + interval_s)
+        wall_time_ms = int((time.perf_counter() - start) * 1000)
+        self.stats["checks"] += 1
+        self.stats["last_wall_time_ms"] = wall_time_ms
+        self.stats["max_wall_time_ms"] = max(self.stats["max_wall_time_ms"], wall_time_ms)
+        if not on_time:
+            self.stats["missed_slot"] += 1
 
-    async def run_all_health_checks(self):
-        """ 
-        Main function executed by the scheduler.
-        Fetches all active services, checks them concurrently, and logs the results.
+    def report_stats(self):
+        """Warn about checks that overran their slot since the last report."""
+        missed = self.stats["missed_slot"] - self._reported_missed
+        self._reported_missed = self.stats["missed_slot"]
+        if missed:
+            logger.warning(
+                f"{missed} checks finished after their next slot was due; consider raising "
+                f"HEALTH_CHECK_MAX_CONCURRENCY. Check stats: {self.stats}")
+
+    async def _run_check(self, service: ApiProducerServiceModal, deadline: float) -> bool:
+        """
+        Run one regular check.
+        Returns False if the check did not finish inside its slot (`deadline` is epoch seconds).
+        """
+        await self._guarded_check(service, self._semaphore)
+        return time.time() <= deadline
+
+    async def _guarded_check(self, service: ApiProducerServiceModal, slots: asyncio.Semaphore,
+                             attempt: int = 0) -> Optional[bool]:
+        """
+        Run one check under the per-host limit and the given concurrency slots.
+        The per-host slot is taken first, so checks queued behind a slow host
+        do not hold global slots. Checks against a host whose circuit is open
+        are short-circuited and recorded as skipped failures without touching the network;
+        a short-circuited recheck is not recorded at all. The circuit is checked
+        again once the host slot is held, since it may open while a check waits.
+        Returns the recorded health verdict, or None if the check crashed or was skipped.
         """
-        logger.info("--- Starting health check cycle ---")
-        raw_services = await self.get_all_api()
+        host = service.url.host or ""
+        breaker = host_guard.breaker(host)
+        if breaker.allow(claim=False):
+            async with host_guard.slot(host):
+                if breaker.allow():
+                    return await self._breaker_check(service, slots, attempt, breaker)
+
+        if attempt == 0:
+            await self.record_result(service, self._short_circuited(host), attempt)
+        return None
+
+    async def _breaker_check(self, service: ApiProducerServiceModal, slots: asyncio.Semaphore, attempt: int,
+                             breaker) -> Optional[bool]:
+        """Run the check and feed its outcome to the host's breaker."""
+        probe = breaker.state == breaker.HALF_OPEN
+        try:
+            async with slots:
+                health_data, is_healthy = await self.check_service(service, attempt)
+        except asyncio.CancelledError:
+            # A half-open probe without an outcome would leave the circuit stuck half-open
+            if probe:
+                breaker.release_probe()
+            raise
+
+        # Any HTTP response means the host is reachable; only connection-level failures count
+        if health_data is not None and health_data.status_code is not None:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        return is_healthy
 
-        if not raw_services:
-            logger.info("No active services to check in this cycle.")
+    def _start_confirmation(self, service: ApiProducerServiceModal):
+        """After a failed regular check, schedule a burst of prioritized rechecks."""
+        endpoint_id = str(service.id)
+        if not self.confirm_rechecks or endpoint_id in self._confirming:
             return
+        task = asyncio.create_task(self._confirm_failure(service))
+        self._confirming[endpoint_id] = task
+        task.add_done_callback(lambda _: self._confirming.pop(endpoint_id, None))
 
-        # Ensure all services are ApiProducerServiceModal objects
-        services_to_check = [
-            s if isinstance(s, ApiProducerServiceModal) else ApiProducerServiceModal(**s)
-            for s in raw_services
-        ]
-
-        for service in services_to_check:
-            try:
-                health_data = await check_api_health(service)
-                logger.info(f"Health check completed for {service.name}")
-                
-                result = ProducerResultModal(
-                    id=service.id,
-                    checked_at=health_data.checked_at,
-                    response_time_ms=health_data.response_time_ms,
-                    status_code=health_data.status_code,
-                )
-                
-                # Send to Kafka with error handling
-                success = await producer_client.send_result(result)
-                if not success:
-                    logger.warning(f"Failed to send monitoring result to Kafka for service {service.name}")
+    async def _confirm_failure(self, service: ApiProducerServiceModal):
+        """
+        Recheck a failing endpoint FAILURE_CONFIRM_RECHECKS times, FAILURE_CONFIRM_SPACING_S apart.
+        Rechecks use their own reserved slots, so they never queue behind regular work.
+        The burst ends early as soon as a recheck succeeds.
+        """
+        for attempt in range(1, self.confirm_rechecks + 1):
+            await asyncio.sleep(self.confirm_spacing_s)
+            service = endpoint_registry.get(service.id) or service
+            is_healthy = await self._guarded_check(service, self._recheck_semaphore, attempt)
+            if is_healthy is None:
+                logger.info(f"{service.name}: recheck {attempt}/{self.confirm_rechecks} could not run; "
+                            f"failure not confirmed")
+                return
+            if is_healthy:
+                logger.info(f"{service.name}: recheck {attempt}/{self.confirm_rechecks} did not confirm the failure")
+                return
+        logger.warning(f"{service.name}: failure confirmed by {self.confirm_rechecks} rechecks")
 
+    @staticmethod
+    def _short_circuited(host: str) -> ApiResponseModal:
+        # No request was made, so there is no latency to record (None keeps it out of the latency series)
+        return ApiResponseModal(
+            checked_at=datetime.utcnow(),
+            response_time_ms=None,
+            error_message=f"Check skipped: circuit open for host {host}",
+            skipped=True,
+        )
 
+    async def check_service(self, service: ApiProducerServiceModal, attempt: int = 0):
+        """
+        Probe a single service and record the result.
+        Returns (health data, is_healthy); both are None if the check itself crashed.
+        """
+        try:
+            health_data = await check_api_health(service, validator=self.validators.get(service))
+            logger.info(f"Health check completed for {service.name}")
+        except Exception as e:
+            logger.error(f"Error checking service {service.name} at {service.url}: {e}", exc_info=True)
+            return None, None
+
+        return health_data, await self.record_result(service, health_data, attempt)
 
+    async def record_result(self, service: ApiProducerServiceModal, health_data: ApiResponseModal,
+                            attempt: int = 0) -> Optional[bool]:
+        """
+        Publish a check result and, unless the consumer writes the logs, queue its log row.
+        A failed regular check (attempt 0) starts a confirmation burst, unless
+        it was skipped: with the circuit open there is nothing to recheck.
+        Returns the health verdict, or None if recording failed.
+        """
+        try:
+            is_healthy = (
+                health_data.status_code == service.expected_status_code
+                and not health_data.validation_errors
+            )
+            error_message = health_data.error_message
+            if health_data.validation_errors and not error_message:
+                error_message = "Response validation failed: " + "; ".join(health_data.validation_errors)
+
+            result = ProducerResultModal(
+                id=service.id,
+                checked_at=health_data.checked_at,
+                response_time_ms=health_data.response_time_ms,
+                status_code=health_data.status_code,
+                is_healthy=is_healthy,
+                phases=health_data.phases,
+                confirm_attempt=attempt,
+                confirm_total=self.confirm_rechecks if attempt else 0,
+                skipped=health_data.skipped,
+            )
+            if self.consumer_writes_logs:
+                result.response_body = str(health_data.response_body) if health_data.response_body else None
+                result.error_message = error_message
+
+            # Queued for batched delivery through the result transport
+            await self.publisher.publish(result)
+
+            if not self.consumer_writes_logs:
                 update_logs = ApiClientLogs(
                     id=service.id,
                     checked_at=health_data.checked_at,
                     response_time_ms=health_data.response_time_ms,
                     response_body=health_data.response_body,
-                    is_healthy= health_data.status_code==service.expected_status_code,
+                    is_healthy=is_healthy,
                     status_code=health_data.status_code,
-                    error_message=health_data.error_message 
+                    error_message=error_message,
+                    phases=health_data.phases,
                 )
-                session = await self.get_db_session()
-                if not session:
-                    return []
-                await api_service.update_api_logs(session, update_logs)
+                await health_log_writer.add(update_logs)
 
-            except Exception as e:
-                logger.error(f"Error checking service {service.name} at {service.url}: {e}", exc_info=True)
+            if not is_healthy and attempt == 0 and not health_data.skipped:
+                self._start_confirmation(service)
+            return is_healthy
 
+        except Exception as e:
+            logger.error(f"Error recording result for service {service.name}: {e}", exc_info=True)
+            return None
@@ -0,0 +1,42 @@
+"""
+Per-endpoint cache of compiled response_validation rules.
+
+The rule engine itself lives in app.utils.response_rules; this module
+keeps one compiled validator per endpoint version for the producer.
+"""
+import json
+from typing import Any, Dict, Tuple
+from app.schemas.service import ApiProducerServiceModal
+from app.utils.loggers import get_logger
+from app.utils.response_rules import compile_rules
+
+logger = get_logger()
+
+
+class ValidatorCache:
+    """One compiled validator per endpoint, recompiled only when the endpoint changes."""
+
+    def __init__(self):
+        self._cache: Dict[str, Tuple[Any, Any]] = {}
+
+    def get(self, service: ApiProducerServiceModal):
+        endpoint_id = str(service.id)
+        # updated_at is bumped on every edit; fall back to the rules themselves
+        version = service.updated_at or json.dumps(service.response_validation, sort_keys=True)
+        cached = self._cache.get(endpoint_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        try:
+            validator = compile_rules(service.response_validation)
+        except Exception as e:
+            # Rows stored before the API validated rules may not compile; a check
+            # must not fail for that (nor trip the host's breaker), so they are
+            # checked as if they had no rules.
+            logger.warning("Ignoring invalid response_validation rules of endpoint %s: %r", endpoint_id, e)
+            validator = None
+        self._cache[endpoint_id] = (version, validator)
+        return validator
+
+    def discard(self, endpoint_id):
+        self._cache.pop(str(endpoint_id), None)
@@ -0,0 +1,156 @@
+import sys
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+from app.core.config import Config
+
+_EPOCH = datetime(1970, 1, 1)
+_NONE = -1
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class EndpointWindow:
+    """
+    Fixed-size ring buffer of one endpoint's most recent results.
+
+    Columns live in typed arrays (checked_at in epoch microseconds, latency,
+    status code, healthy flag; -1 stands for None), so an endpoint costs a
+    few bytes per slot instead of a dict per result. The endpoint's
+    detection accumulators ride along in `detector`, so they are warmed,
+    evicted and revoked together with the window.
+    """
+
+    __slots__ = ("capacity", "checked_at", "latency_ms", "status_code", "healthy", "head", "size", "partition",
+                 "detector")
+
+    def __init__(self, capacity: int, partition: Optional[Hashable] = None):
+        self.capacity = capacity
+        self.checked_at = array("q", [0]) * capacity
+        self.latency_ms = array("i", [_NONE]) * capacity
+        self.status_code = array("h", [_NONE]) * capacity
+        self.healthy = array("b", [0]) * capacity
+        self.head = 0  # next slot to write
+        self.size = 0
+        self.partition = partition
+        self.detector = None
+
+    def newest_micros(self) -> Optional[int]:
+        return self.checked_at[(self.head - 1) % self.capacity] if self.size else None
+
+    def add(self, checked_at: datetime, response_time_ms: Optional[int], status_code: Optional[int],
+            is_healthy: bool) -> bool:
+        """Append a result; results not newer than the newest one (already seen, redelivered) are ignored."""
+        micros = _to_micros(checked_at)
+        newest = self.newest_micros()
+        if newest is not None and micros <= newest:
+            return False
+        slot = self.head
+        self.checked_at[slot] = micros
+        self.latency_ms[slot] = _NONE if response_time_ms is None else response_time_ms
+        self.status_code[slot] = _NONE if status_code is None else status_code
+        self.healthy[slot] = 1 if is_healthy else 0
+        self.head = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        """Up to `count` newest results, newest first, shaped like get_recent_records_bulk rows."""
+        records = []
+        for i in range(min(count, self.size)):
+            slot = (self.head - 1 - i) % self.capacity
+            latency = self.latency_ms[slot]
+            status = self.status_code[slot]
+            records.append({
+                "checked_at": _EPOCH + timedelta(microseconds=self.checked_at[slot]),
+                "response_time_ms": None if latency == _NONE else latency,
+                "status_code": None if status == _NONE else status,
+                "is_healthy": bool(self.healthy[slot]),
+            })
+        return records
+
+    def nbytes(self) -> int:
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.checked_at) + sys.getsizeof(self.latency_ms)
+            + sys.getsizeof(self.status_code) + sys.getsizeof(self.healthy)
+        )
+
+
+class ResultWindows:
+    """
+    Recent results of every endpoint the consumer handles, so steady-state
+    detection needs no reads from health_check_logs.
+
+    Windows are warmed from the DB the first time an endpoint shows up
+    (startup, or a partition gained in a rebalance) and dropped when its
+    partition is revoked. At most `max_endpoints` windows are kept; the
+    least recently used ones are evicted and simply warmed again if needed.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, max_endpoints: Optional[int] = None):
+        self.capacity = capacity or Config.CONSUMER_WINDOW_SIZE
+        self.max_endpoints = max_endpoints or Config.CONSUMER_WINDOW_MAX_ENDPOINTS
+        self._windows: "OrderedDict[str, EndpointWindow]" = OrderedDict()
+        self.stats: Dict[str, int] = {"warmed": 0, "evicted": 0, "revoked": 0}
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def __contains__(self, endpoint_id: str) -> bool:
+        return endpoint_id in self._windows
+
+    def missing(self, endpoint_ids: Iterable[str]) -> List[str]:
+        return [endpoint_id for endpoint_id in endpoint_ids if endpoint_id not in self._windows]
+
+    def get(self, endpoint_id: str, partition: Optional[Hashable] = None) -> EndpointWindow:
+        window = self._windows.get(endpoint_id)
+        if window is None:
+            window = EndpointWindow(self.capacity, partition)
+            self._windows[endpoint_id] = window
+            if len(self._windows) > self.max_endpoints:
+                self._windows.popitem(last=False)
+                self.stats["evicted"] += 1
+        else:
+            self._windows.move_to_end(endpoint_id)
+            if partition is not None:
+                window.partition = partition
+        return window
+
+    def warm(self, endpoint_id: str, records: List[Dict[str, Any]], partition: Optional[Hashable] = None):
+        """Seed a window from DB rows (newest first, as get_recent_records_bulk returns them)."""
+        window = self.get(endpoint_id, partition)
+        for record in reversed(records):
+            window.add(record["checked_at"], record["response_time_ms"], record["status_code"],
+                       bool(record["is_healthy"]))
+        self.stats["warmed"] += 1
+
+    def forget(self, endpoint_ids: Iterable[str]):
+        """Drop windows whose contents can no longer be trusted (e.g. a batch that will be redelivered)."""
+        for endpoint_id in endpoint_ids:
+            self._windows.pop(endpoint_id, None)
+
+    def revoke(self, partitions: Iterable[Hashable]):
+        """Drop windows of partitions this consumer no longer owns; they'd go stale."""
+        revoked = set(partitions)
+        stale = [endpoint_id for endpoint_id, window in self._windows.items() if window.partition in revoked]
+        for endpoint_id in stale:
+            del self._windows[endpoint_id]
+        self.stats["revoked"] += len(stale)
+
+    def memory_report(self) -> Dict[str, Any]:
+        total = sum(window.nbytes() for window in self._windows.values())
+        return {
+            "endpoints": len(self._windows),
+            "max_endpoints": self.max_endpoints,
+            "window_size": self.capacity,
+            "bytes_total": total,
+            "bytes_per_endpoint": round(total / len(self._windows), 1) if self._windows else 0,
+            **self.stats,
+        }
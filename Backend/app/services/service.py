@@ -1,13 +1,49 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
 import json
+from ..core.config import Config
 from ..utils.loggers import get_logger
-from ..schemas.service import ApiServiceModal,ApiProducerServiceModal, ApiClientLogs, ConsumerMonitoringData
+from ..schemas.service import ApiServiceModal,ApiProducerServiceModal, ApiClientLogs, ConsumerMonitoringData, PhaseTimingsModal
 
 logger = get_logger("app")
 
+# NOTIFY channel for endpoint edits; payload is "<update|delete>:<endpoint id>"
+ENDPOINT_CHANGES_CHANNEL = "monitored_endpoints_changed"
+
+# Leading text of each reason's incident message; stored incidents are classified by it,
+# including those written before the messages stopped naming a fixed number of checks
+INCIDENT_REASON_PREFIXES = {
+    "failure": "The API failed to respond successfully",
+    "latency": "The API response time exceeded the expected performance threshold",
+    "baseline": "The API response time rose well above its usual level",
+}
+# The detection rule that fired (e.g. "3 of the last 5 checks failed.") follows as the detail
+INCIDENT_ERROR_MESSAGES = {
+    "failure": f"{INCIDENT_REASON_PREFIXES['failure']}, indicating a possible outage or functional issue.",
+    "latency": f"{INCIDENT_REASON_PREFIXES['latency']}, suggesting performance degradation or server slowdown.",
+    "baseline": f"{INCIDENT_REASON_PREFIXES['baseline']} for this time of day, suggesting a regression.",
+}
+
+
+def incident_reason(initial_error: Optional[str]) -> Optional[str]:
+    """The reason ("failure", "latency", "baseline") of a stored incident message, or None."""
+    for reason, prefix in INCIDENT_REASON_PREFIXES.items():
+        if (initial_error or "").startswith(prefix):
+            return reason
+    return None
+
+
+def hot_logs_since() -> datetime:
+    """
+    Lower checked_at bound for hot-path reads, so they only scan recent
+    health_check_logs partitions. Dashboard reads fall back to older rows
+    when an endpoint has none inside the bound.
+    """
+    return datetime.utcnow() - timedelta(hours=Config.LOG_HOT_WINDOW_HOURS)
+
 
 class ApiService:
     """Service class for managing API services."""
@@ -18,15 +54,23 @@ class ApiService:
             SELECT me.id,me.name, me.http_method, hcl.is_healthy, hcl.response_time_ms
             FROM monitored_endpoints me
             LEFT JOIN LATERAL (
-                SELECT *
-                FROM health_check_logs h
-                WHERE h.endpoint_id = me.id
-                ORDER BY h.checked_at DESC
+                -- The older partitions are only read when the hot window has no row
+                (SELECT h.is_healthy, h.response_time_ms
+                 FROM health_check_logs h
+                 WHERE h.endpoint_id = me.id AND h.checked_at >= :since
+                 ORDER BY h.checked_at DESC
+                 LIMIT 1)
+                UNION ALL
+                (SELECT h.is_healthy, h.response_time_ms
+                 FROM health_check_logs h
+                 WHERE h.endpoint_id = me.id AND h.checked_at < :since
+                 ORDER BY h.checked_at DESC
+                 LIMIT 1)
                 LIMIT 1
             ) hcl ON TRUE
             WHERE me.owner_user_id = :user_uid;
         """)
-        result = await session.execute(query, {"user_uid": user_uid})
+        result = await session.execute(query, {"user_uid": user_uid, "since": hot_logs_since()})
         rows = result.fetchall()
         services = [dict(row._mapping) for row in rows]
         return services
@@ -35,22 +79,29 @@ class ApiService:
         """Fetch a single monitored endpoint by ID for a user."""
         query = text("""
             SELECT name, http_method, url, request_headers, request_body,
-                periodic_summary_report, expected_status_code, response_validation,expected_latency_ms 
+                periodic_summary_report, expected_status_code, response_validation,expected_latency_ms,
+                connection_mode, detection_policy
             FROM monitored_endpoints
             WHERE id = :service_id AND owner_user_id = :user_uid;
         """)
         result = await session.execute(query, {"service_id": service_id, "user_uid": user_uid})
         row_data = result.fetchone()
-        return row_data
+        if row_data is None or not isinstance(row_data.detection_policy, str):
+            return row_data
+        data = dict(row_data._mapping)
+        data["detection_policy"] = json.loads(data["detection_policy"])
+        return data
 
     async def create_service(self, user_uid: str, api_service_data, session: AsyncSession):
         """Create a new monitored endpoint."""
         query = text("""
             INSERT INTO monitored_endpoints
             (name, http_method, url, request_headers, request_body, periodic_summary_report,
-             expected_status_code, response_validation, owner_user_id,expected_latency_ms)
+             expected_status_code, response_validation, owner_user_id,expected_latency_ms, connection_mode,
+             detection_policy)
             VALUES (:name, :http_method, :url, :request_headers, :request_body,
-                    :periodic_summary_report, :expected_status_code, :response_validation, :owner_user_id, :expected_latency_ms)
+                    :periodic_summary_report, :expected_status_code, :response_validation, :owner_user_id, :expected_latency_ms,
+                    :connection_mode, :detection_policy)
             RETURNING id;
         """)
         values = {
@@ -63,7 +114,9 @@ class ApiService:
             "expected_status_code": api_service_data.expected_status_code or 200,
             "response_validation": json.dumps(api_service_data.response_validation) if api_service_data.response_validation else None,
             "owner_user_id": user_uid,
-            "expected_latency_ms" : api_service_data.expected_latency_ms or 200
+            "expected_latency_ms" : api_service_data.expected_latency_ms or 200,
+            "connection_mode": api_service_data.connection_mode or "warm",
+            "detection_policy": self._detection_policy_json(api_service_data),
         }
         result = await session.execute(query, values)
         await session.commit()
@@ -78,7 +131,7 @@ class ApiService:
             service_query = text("""
                 SELECT id, name, http_method, url, request_headers, request_body,
                        periodic_summary_report, expected_status_code, response_validation,
-                       expected_latency_ms 
+                       expected_latency_ms, connection_mode
                 FROM monitored_endpoints
                 WHERE id = :service_id AND owner_user_id = :user_uid;
             """)
@@ -91,16 +144,25 @@ class ApiService:
 
             data = dict(service_row._mapping)
 
-            # --- Latest health check ---
-            health_query = text("""
-                SELECT is_healthy, checked_at, response_time_ms, status_code
-                FROM health_check_logs
-                WHERE endpoint_id = :service_id
-                ORDER BY checked_at DESC
-                LIMIT 1;
+            # --- Last 20 health checks, newest first; the first is the latest status ---
+            # Older partitions are only read when the hot window has fewer than 20 rows
+            recent_query = text("""
+                (SELECT is_healthy, checked_at, response_time_ms, status_code
+                 FROM health_check_logs
+                 WHERE endpoint_id = :service_id AND checked_at >= :since
+                 ORDER BY checked_at DESC
+                 LIMIT 20)
+                UNION ALL
+                (SELECT is_healthy, checked_at, response_time_ms, status_code
+                 FROM health_check_logs
+                 WHERE endpoint_id = :service_id AND checked_at < :since
+                 ORDER BY checked_at DESC
+                 LIMIT 20)
+                LIMIT 20;
             """)
-            health_result = await session.execute(health_query, {"service_id": service_id})
-            health_row = health_result.fetchone()
+            recent_result = await session.execute(recent_query, {"service_id": service_id, "since": hot_logs_since()})
+            latencies_rows = sorted(recent_result.fetchall(), key=lambda row: row.checked_at, reverse=True)
+            health_row = latencies_rows[0] if latencies_rows else None
 
             if health_row:
                 data.update({
@@ -117,17 +179,6 @@ class ApiService:
                     "status_code": None,
                 })
 
-            # --- Last 20 latency records ---
-            latencies_query = text("""
-                SELECT checked_at, response_time_ms
-                FROM health_check_logs
-                WHERE endpoint_id = :service_id
-                ORDER BY checked_at DESC
-                LIMIT 20;
-            """)
-            latencies_result = await session.execute(latencies_query, {"service_id": service_id})
-            latencies_rows = latencies_result.fetchall()
-
             logger.info(
                 "Fetched %d latency records for service %s",
                 len(latencies_rows),
@@ -161,7 +212,9 @@ class ApiService:
                 expected_status_code = :expected_status_code,
                 response_validation = :response_validation,
                 updated_at = NOW(),
-                expected_latency_ms  = :expected_latency_ms 
+                expected_latency_ms  = :expected_latency_ms,
+                connection_mode = :connection_mode,
+                detection_policy = :detection_policy
             WHERE id = :service_id AND owner_user_id = :user_uid
             RETURNING id;
         """)
@@ -176,6 +229,8 @@ class ApiService:
             "expected_status_code": api_service_data.expected_status_code or 200,
             "response_validation": json.dumps(api_service_data.response_validation) if api_service_data.response_validation else None,
             "expected_latency_ms": api_service_data.expected_latency_ms,
+            "connection_mode": api_service_data.connection_mode or "warm",
+            "detection_policy": self._detection_policy_json(api_service_data),
             "service_id": service_id,
             "user_uid": user_uid
         }
@@ -188,11 +243,30 @@ class ApiService:
                 "Update failed: Service %s not found or not owned by user %s", service_id, user_uid)
             raise ValueError("Service not found or not owned by user")
 
+        await self.notify_endpoint_changed(session, service_id, "update")
         await session.commit()
         logger.info("User %s updated service %s", user_uid, service_id)
 
         return {"service_id": str(updated_row[0])}
 
+    @staticmethod
+    def _detection_policy_json(api_service_data):
+        policy = getattr(api_service_data, "detection_policy", None)
+        if policy is None:
+            return None
+        values = policy.model_dump(exclude_none=True)
+        return json.dumps(values) if values else None
+
+    async def notify_endpoint_changed(self, session: AsyncSession, service_id: str, action: str):
+        """
+        Queue a NOTIFY for endpoint listeners (the consumer's threshold cache).
+        Postgres delivers it only when the surrounding transaction commits.
+        """
+        await session.execute(
+            text("SELECT pg_notify(:channel, :payload);"),
+            {"channel": ENDPOINT_CHANGES_CHANNEL, "payload": f"{action}:{service_id}"},
+        )
+
     async def delete_service(self, user_uid: str, service_id: str, session: AsyncSession):
         """Delete a monitored endpoint."""
         query = text("""
@@ -206,6 +280,7 @@ class ApiService:
             logger.warning(
                 "Delete failed: Service %s not found or not owned by user %s", service_id, user_uid)
             raise ValueError("Service not found or not owned by user")
+        await self.notify_endpoint_changed(session, service_id, "delete")
         await session.commit()
         logger.info("User %s deleted service %s", user_uid, service_id)
         return deleted_row
@@ -214,7 +289,8 @@ class ApiService:
         """Fetch all health check logs for a service."""
         query = text("""
             SELECT hcl.id, hcl.is_healthy, hcl.checked_at, hcl.response_time_ms, hcl.status_code,
-                   hcl.response_body, hcl.error_message
+                   hcl.response_body, hcl.error_message,
+                   hcl.dns_ms, hcl.connect_ms, hcl.tls_ms, hcl.ttfb_ms, hcl.download_ms
             FROM health_check_logs hcl
             JOIN monitored_endpoints me ON hcl.endpoint_id = me.id
             WHERE me.id = :service_id AND me.owner_user_id = :user_uid
@@ -235,16 +311,14 @@ class ApiService:
         result = await session.execute(query, {"service_id": service_id, "user_uid": user_uid})
         return [dict(row._mapping) for row in result.fetchall()]
 
-    async def get_all_api_services(self, session: AsyncSession):
-        """Fetch all monitored endpoints."""
-        query = text("""
-            SELECT  id, name, http_method, url, request_headers, request_body,
-                   periodic_summary_report, expected_status_code, response_validation
-            FROM monitored_endpoints;
-        """)
-        result = await session.execute(query)
-        rows = result.fetchall()
+    PRODUCER_SERVICE_COLUMNS = """
+        id, name, http_method, url, request_headers, request_body,
+        periodic_summary_report, expected_status_code, response_validation, connection_mode,
+        check_interval_seconds, updated_at
+    """
 
+    def _to_producer_services(self, rows):
+        """Decode JSON columns and build ApiProducerServiceModal objects."""
         services = []
         for row in rows:
             data = dict(row._mapping)
@@ -260,64 +334,221 @@ class ApiService:
 
         return services
 
-    async def update_api_logs(self, session: AsyncSession, data: ApiClientLogs):
+    async def get_all_api_services(self, session: AsyncSession):
+        """Fetch all monitored endpoints."""
+        query = text(f"""
+            SELECT {self.PRODUCER_SERVICE_COLUMNS}
+            FROM monitored_endpoints;
+        """)
+        result = await session.execute(query)
+        return self._to_producer_services(result.fetchall())
+
+    async def get_api_services_by_ids(self, session: AsyncSession, service_ids):
+        """Fetch specific monitored endpoints (used for incremental registry reloads)."""
+        query = text(f"""
+            SELECT {self.PRODUCER_SERVICE_COLUMNS}
+            FROM monitored_endpoints
+            WHERE id = ANY(CAST(:service_ids AS uuid[]));
+        """)
+        result = await session.execute(query, {"service_ids": [str(i) for i in service_ids]})
+        return self._to_producer_services(result.fetchall())
+
+    async def get_api_services_updated_since(self, session: AsyncSession, since: datetime):
+        """Fetch monitored endpoints modified after a high-water mark."""
+        query = text(f"""
+            SELECT {self.PRODUCER_SERVICE_COLUMNS}
+            FROM monitored_endpoints
+            WHERE updated_at > :since
+            ORDER BY updated_at;
+        """)
+        result = await session.execute(query, {"since": since})
+        return self._to_producer_services(result.fetchall())
+
+    async def bulk_insert_api_logs(self, session: AsyncSession, logs: List[ApiClientLogs]):
         """
-        Inserts a new health check log into the database.
+        Insert many health check logs with a single multi-row INSERT.
+        Rows are passed as parallel arrays and expanded with unnest(), so the
+        batch costs one round trip regardless of its size. Rows already
+        present (a redelivered batch) are skipped. Does not commit.
         """
+        if not logs:
+            return
+
         query = text("""
             INSERT INTO health_check_logs
-                (endpoint_id, checked_at, is_healthy, response_time_ms, status_code, response_body, error_message)
-            VALUES
-                (:endpoint_id, :checked_at, :is_healthy, :response_time_ms, :status_code, :response_body, :error_message)
+                (endpoint_id, checked_at, is_healthy, response_time_ms, status_code, response_body, error_message,
+                 dns_ms, connect_ms, tls_ms, ttfb_ms, download_ms)
+            SELECT * FROM unnest(
+                CAST(:endpoint_ids AS uuid[]),
+                CAST(:checked_ats AS timestamp[]),
+                CAST(:is_healthy AS boolean[]),
+                CAST(:response_times AS integer[]),
+                CAST(:status_codes AS integer[]),
+                CAST(:response_bodies AS text[]),
+                CAST(:error_messages AS text[]),
+                CAST(:dns_ms AS integer[]),
+                CAST(:connect_ms AS integer[]),
+                CAST(:tls_ms AS integer[]),
+                CAST(:ttfb_ms AS integer[]),
+                CAST(:download_ms AS integer[])
+            )
+            ON CONFLICT DO NOTHING
         """)
 
+        phases = [log.phases or PhaseTimingsModal() for log in logs]
+
         await session.execute(query, {
-            "endpoint_id": data.id,            # or data.endpoint_id if your schema has it
-            "checked_at": data.checked_at,
-            "is_healthy": data.is_healthy,
-            "response_time_ms": data.response_time_ms,
-            "status_code": data.status_code,
-            "response_body": str(data.response_body) if data.response_body else None,
-            "error_message": str(data.error_message) if data.error_message else None
+            "endpoint_ids": [str(log.id) for log in logs],
+            "checked_ats": [log.checked_at for log in logs],
+            "is_healthy": [log.is_healthy for log in logs],
+            "response_times": [log.response_time_ms for log in logs],
+            "status_codes": [log.status_code for log in logs],
+            "response_bodies": [str(log.response_body) if log.response_body else None for log in logs],
+            "error_messages": [str(log.error_message) if log.error_message else None for log in logs],
+            "dns_ms": [p.dns_ms for p in phases],
+            "connect_ms": [p.connect_ms for p in phases],
+            "tls_ms": [p.tls_ms for p in phases],
+            "ttfb_ms": [p.ttfb_ms for p in phases],
+            "download_ms": [p.download_ms for p in phases],
         })
 
-        await session.commit()
-
-    async def getConsumerServiceDetails(self, session: AsyncSession, service_id: str):
-        """Fetch a single monitored endpoint by ID for a user."""
+    async def get_consumer_details_bulk(self, session: AsyncSession, service_ids) -> Dict[str, object]:
+        """Detection settings of many monitored endpoints in one query, keyed by endpoint id."""
         query = text("""
             SELECT id, name, http_method,
-                 expected_status_code, expected_latency_ms 
+                 expected_status_code, expected_latency_ms, detection_policy
             FROM monitored_endpoints
-            WHERE id = :service_id;
+            WHERE id = ANY(CAST(:service_ids AS uuid[]));
         """)
-        result = await session.execute(query, {"service_id": service_id})
-        row_data = result.fetchone()
-        return row_data
+        result = await session.execute(query, {"service_ids": [str(i) for i in service_ids]})
+        return {str(row.id): row for row in result.fetchall()}
 
-    async def getApiLastThreeRecords(self, session: AsyncSession, service_id: str):
-        """Fetch the last 3 health check logs for a given service."""
+    async def get_recent_records_bulk(self, session: AsyncSession, service_ids, limit: int = 3) -> Dict[str, List[dict]]:
+        """
+        The latest `limit` health check logs of many endpoints in one query,
+        newest first per endpoint.
+        A LATERAL ... LIMIT per endpoint stays an index scan on
+        (endpoint_id, checked_at) instead of ranking each endpoint's full history,
+        and the checked_at bound keeps it to the recent partitions. Checks
+        skipped by an open circuit (no latency) are not results to detect on.
+        """
         query = text("""
-            SELECT id, checked_at, response_time_ms, status_code, is_healthy
-            FROM health_check_logs 
-            WHERE endpoint_id = :service_id
-            ORDER BY checked_at DESC 
-            LIMIT 3;
+            SELECT ids.endpoint_id, recent.id, recent.checked_at, recent.response_time_ms,
+                   recent.status_code, recent.is_healthy
+            FROM unnest(CAST(:service_ids AS uuid[])) AS ids(endpoint_id)
+            CROSS JOIN LATERAL (
+                SELECT id, checked_at, response_time_ms, status_code, is_healthy
+                FROM health_check_logs
+                WHERE endpoint_id = ids.endpoint_id AND checked_at >= :since
+                  AND response_time_ms IS NOT NULL
+                ORDER BY checked_at DESC
+                LIMIT :limit
+            ) AS recent
+            ORDER BY ids.endpoint_id, recent.checked_at DESC;
         """)
-        result = await session.execute(query, {"service_id": service_id})
-        rows = result.fetchall()
-        return [dict(row._mapping) for row in rows]
+        result = await session.execute(query, {
+            "service_ids": [str(i) for i in service_ids], "limit": limit, "since": hot_logs_since(),
+        })
+        records: Dict[str, List[dict]] = {}
+        for row in result.fetchall():
+            data = dict(row._mapping)
+            records.setdefault(str(data.pop("endpoint_id")), []).append(data)
+        return records
+
+    async def get_hourly_latency_medians(self, session: AsyncSession, since: datetime, until: datetime):
+        """Median response time per endpoint and hour in [since, until), for the latency baselines."""
+        query = text("""
+            SELECT endpoint_id, date_trunc('hour', checked_at) AS hour,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY response_time_ms) AS median_ms
+            FROM health_check_logs
+            WHERE checked_at >= :since AND checked_at < :until AND response_time_ms IS NOT NULL
+            GROUP BY endpoint_id, date_trunc('hour', checked_at);
+        """)
+        result = await session.execute(query, {"since": since, "until": until})
+        return result.fetchall()
+
+    async def get_recent_latency_medians(self, session: AsyncSession, since: datetime):
+        """Median response time, sample count and time range per endpoint of healthy checks since `since`."""
+        query = text("""
+            SELECT endpoint_id,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY response_time_ms) AS median_ms,
+                   count(*) AS samples, min(checked_at) AS first_at, max(checked_at) AS last_at
+            FROM health_check_logs
+            WHERE checked_at >= :since AND is_healthy AND response_time_ms IS NOT NULL
+            GROUP BY endpoint_id;
+        """)
+        result = await session.execute(query, {"since": since})
+        return result.fetchall()
+
+    async def get_open_incidents(self, session: AsyncSession, endpoint_ids) -> Dict[str, dict]:
+        """Open incidents (end_time IS NULL) of the given endpoints, latest per endpoint."""
+        query = text("""
+            SELECT DISTINCT ON (endpoint_id) id, endpoint_id, start_time, initial_error
+            FROM incidents
+            WHERE endpoint_id = ANY(CAST(:endpoint_ids AS uuid[])) AND end_time IS NULL
+            ORDER BY endpoint_id, start_time DESC;
+        """)
+        result = await session.execute(query, {"endpoint_ids": [str(i) for i in endpoint_ids]})
+        return {str(row.endpoint_id): dict(row._mapping) for row in result.fetchall()}
 
-    async def createOrUpdateIncident(self, session: AsyncSession, endpoint_id: str, last_three_records, reason: str):
-        """Create or update incident record for failure or latency, using initial_error to determine type."""
+    async def bulk_write_incidents(self, session: AsyncSession, inserts: List[dict], closes: List[dict]):
+        """
+        Write incident transitions queued by the consumer's IncidentTracker (the caller commits):
+        `inserts` open incidents (end_time NULL), `closes` set end_time on open ones.
+        Both are idempotent so a redelivered batch cannot duplicate incidents:
+        an incident is identified by (endpoint_id, start_time) and only an
+        open incident is closed.
+        """
+        if inserts:
+            await session.execute(text("""
+                INSERT INTO incidents (endpoint_id, start_time, end_time, initial_error)
+                SELECT v.endpoint_id, v.start_time, NULL, v.initial_error
+                FROM unnest(
+                    CAST(:endpoint_ids AS uuid[]),
+                    CAST(:start_times AS timestamp[]),
+                    CAST(:initial_errors AS text[])
+                ) AS v(endpoint_id, start_time, initial_error)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM incidents e
+                    WHERE e.endpoint_id = v.endpoint_id AND e.start_time = v.start_time
+                );
+            """), {
+                "endpoint_ids": [i["endpoint_id"] for i in inserts],
+                "start_times": [i["start_time"] for i in inserts],
+                "initial_errors": [i["initial_error"] for i in inserts],
+            })
+
+        # After the inserts, so an incident opened and closed in one batch is closed too
+        if closes:
+            await session.execute(text("""
+                UPDATE incidents AS i
+                SET end_time = v.end_time
+                FROM unnest(
+                    CAST(:endpoint_ids AS uuid[]),
+                    CAST(:start_times AS timestamp[]),
+                    CAST(:end_times AS timestamp[])
+                ) AS v(endpoint_id, start_time, end_time)
+                WHERE i.endpoint_id = v.endpoint_id AND i.start_time = v.start_time AND i.end_time IS NULL;
+            """), {
+                "endpoint_ids": [c["endpoint_id"] for c in closes],
+                "start_times": [c["start_time"] for c in closes],
+                "end_times": [c["end_time"] for c in closes],
+            })
+        logger.info(f"Incident transitions written: {len(inserts)} opened, {len(closes)} closed")
+
+    async def createOrUpdateIncident(self, session: AsyncSession, endpoint_id: str, last_three_records, reason: str,
+                                     detail: Optional[str] = None):
+        """
+        Create or update incident record for failure or latency, using initial_error to determine type.
+        `detail` (e.g. the slowest latency phase) is appended to the error of a newly created incident.
+        """
         try:
             # Error text mapping
-            error_message = (
-                "The API failed to respond successfully for three consecutive checks, indicating a possible outage or functional issue."
-                if reason == "failure"
-                else
-                "The API response time exceeded the expected performance threshold for three consecutive checks, suggesting performance degradation or server slowdown."
-            )
+            if reason not in INCIDENT_ERROR_MESSAGES:
+                reason = "latency"
+            error_message = INCIDENT_ERROR_MESSAGES[reason]
+
+            initial_error = f"{error_message} {detail}" if detail else error_message
 
             # Start & end times from last 3 checks
             start_time = last_three_records[-1]["checked_at"]
@@ -336,19 +567,20 @@ class ApiService:
 
             if last_incident:
                 last_end = last_incident.end_time
-                last_error = last_incident.initial_error or ""
 
                 # Only merge if last incident type matches current reason
-                if last_error == error_message and (last_end is None or start_time <= last_end):
+                same_reason = incident_reason(last_incident.initial_error) == reason
+                if same_reason and last_end is None:
+                    # Still open (the consumer closes it on recovery)
+                    logger.info(f"Incident for endpoint {endpoint_id} ({reason}) is still open")
+                elif same_reason and start_time <= last_end:
                     update_query = text("""
                         UPDATE incidents
-                        SET end_time = :new_end_time,
-                            initial_error = :initial_error
+                        SET end_time = GREATEST(end_time, :new_end_time)
                         WHERE id = :id;
                     """)
                     await session.execute(update_query, {
                         "new_end_time": end_time,
-                        "initial_error": error_message,
                         "id": last_incident.id
                     })
                     logger.info(f"Incident updated for endpoint {endpoint_id} ({reason})")
@@ -356,26 +588,36 @@ class ApiService:
                     # Different type or ended → create new incident
                     insert_query = text("""
                         INSERT INTO incidents (endpoint_id, start_time, end_time, initial_error)
-                        VALUES (:endpoint_id, :start_time, :end_time, :initial_error);
+                        SELECT CAST(:endpoint_id AS uuid), CAST(:start_time AS timestamp),
+                               CAST(:end_time AS timestamp), CAST(:initial_error AS text)
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM incidents
+                            WHERE endpoint_id = :endpoint_id AND start_time = :start_time
+                        );
                     """)
                     await session.execute(insert_query, {
                         "endpoint_id": endpoint_id,
                         "start_time": start_time,
                         "end_time": end_time,
-                        "initial_error": error_message
+                        "initial_error": initial_error
                     })
                     logger.info(f"New incident created for endpoint {endpoint_id} ({reason})")
             else:
                 # No incident ever → create first one
                 insert_query = text("""
                     INSERT INTO incidents (endpoint_id, start_time, end_time, initial_error)
-                    VALUES (:endpoint_id, :start_time, :end_time, :initial_error);
+                    SELECT CAST(:endpoint_id AS uuid), CAST(:start_time AS timestamp),
+                           CAST(:end_time AS timestamp), CAST(:initial_error AS text)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM incidents
+                        WHERE endpoint_id = :endpoint_id AND start_time = :start_time
+                    );
                 """)
                 await session.execute(insert_query, {
                     "endpoint_id": endpoint_id,
                     "start_time": start_time,
                     "end_time": end_time,
-                    "initial_error": error_message
+                    "initial_error": initial_error
                 })
                 logger.info(f"First incident created for endpoint {endpoint_id} ({reason})")
 
@@ -384,6 +626,8 @@ class ApiService:
         except Exception as e:
             logger.error(f"Error creating/updating incident: {e}", exc_info=True)
             await session.rollback()
+            # Let the consumer leave the message uncommitted so it is redelivered
+            raise
  
     async def get_monitored_apis(self, session: AsyncSession):
         """Fetch all monitored APIs with user info."""
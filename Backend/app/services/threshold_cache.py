@@ -0,0 +1,149 @@
+import asyncio
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import Config
+from app.services.service import ApiService, ENDPOINT_CHANGES_CHANNEL
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+api_service = ApiService()
+
+
+class ThresholdCache:
+    """
+    Consumer-side cache of endpoint thresholds (expected status and latency).
+
+    Entries live for `ttl_s`; edits and deletions made through the API are
+    pushed by Postgres NOTIFY (see ApiService.notify_endpoint_changed) and
+    evict the entry right away, so the hot path only reads
+    monitored_endpoints for endpoints it has not seen recently. Unknown
+    endpoints are cached as misses too. While the LISTEN connection is down
+    the TTL is the only bound on staleness, and the cache is cleared when
+    it reconnects since notifications may have been missed.
+
+    A notification can arrive while a load is waiting on the database, so
+    every invalidation bumps a generation counter. A load notes the
+    generation before querying and does not cache rows of endpoints
+    invalidated (or of a clear) after that point; the next lookup reloads
+    them.
+    """
+
+    def __init__(self, ttl_s: Optional[float] = None):
+        self.ttl_s = ttl_s or Config.THRESHOLD_CACHE_TTL_S
+        self.retry_s = Config.THRESHOLD_LISTEN_RETRY_S
+        self._entries: Dict[str, Tuple[float, Any]] = {}  # endpoint_id -> (expires_at, row or None)
+        self._generation = 0  # bumped by every invalidation and clear
+        self._cleared_at = 0
+        self._invalidated_at: Dict[str, int] = {}  # endpoint_id -> generation, kept while loads are in flight
+        self._loads = 0
+        self._task: Optional[asyncio.Task] = None
+        self.listening = False
+        self.stats: Dict[str, int] = {
+            "hits": 0, "misses": 0, "invalidations": 0, "stale_loads": 0, "listen_connects": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_many(self, session: AsyncSession, endpoint_ids: Iterable[str]) -> Dict[str, Any]:
+        """Thresholds for the given endpoints, loading missing or expired ones in one query."""
+        now = time.monotonic()
+        found: Dict[str, Any] = {}
+        missing = []
+        for endpoint_id in endpoint_ids:
+            entry = self._entries.get(endpoint_id)
+            if entry is not None and entry[0] > now:
+                self.stats["hits"] += 1
+                if entry[1] is not None:
+                    found[endpoint_id] = entry[1]
+            else:
+                missing.append(endpoint_id)
+
+        if missing:
+            self.stats["misses"] += len(missing)
+            generation = self._generation
+            self._loads += 1
+            try:
+                rows = await api_service.get_consumer_details_bulk(session, missing)
+            finally:
+                self._loads -= 1
+            expires_at = now + self.ttl_s
+            for endpoint_id in missing:
+                row = rows.get(endpoint_id)
+                if row is not None:
+                    found[endpoint_id] = row
+                if self._cleared_at > generation or self._invalidated_at.get(endpoint_id, 0) > generation:
+                    # Changed while we were reading it: serve it this once, don't cache it
+                    self.stats["stale_loads"] += 1
+                    continue
+                self._entries[endpoint_id] = (expires_at, row)
+            if not self._loads:
+                self._invalidated_at.clear()
+        return found
+
+    async def get(self, session: AsyncSession, endpoint_id: str):
+        return (await self.get_many(session, [endpoint_id])).get(endpoint_id)
+
+    def invalidate(self, endpoint_id: str):
+        self._generation += 1
+        if self._loads:
+            self._invalidated_at[endpoint_id] = self._generation
+        if self._entries.pop(endpoint_id, None) is not None:
+            self.stats["invalidations"] += 1
+
+    def clear(self):
+        self._generation += 1
+        self._cleared_at = self._generation
+        self._entries.clear()
+
+    # ----------------------------
+    # LISTEN / NOTIFY
+    # ----------------------------
+    def _on_notify(self, connection, pid, channel, payload: str):
+        _, _, endpoint_id = payload.partition(":")
+        self.invalidate(endpoint_id or payload)
+
+    async def start(self):
+        """Start listening for endpoint change notifications (no-op without Postgres settings)."""
+        if not all([Config.PGHOST, Config.PGDATABASE, Config.PGUSER, Config.PGPASSWORD, Config.PGPORT]):
+            logger.warning("Postgres not configured; threshold cache relies on its TTL only")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen_loop(), name="threshold_cache_listener")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen_loop(self):
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    host=Config.PGHOST, port=Config.PGPORT, user=Config.PGUSER,
+                    password=Config.PGPASSWORD, database=Config.PGDATABASE,
+                )
+                await connection.add_listener(ENDPOINT_CHANGES_CHANNEL, self._on_notify)
+                # Anything changed while we were not listening is unknown
+                self.clear()
+                self.listening = True
+                self.stats["listen_connects"] += 1
+                logger.info(f"Threshold cache listening on '{ENDPOINT_CHANGES_CHANNEL}'")
+                while not connection.is_closed():
+                    await asyncio.sleep(self.retry_s)
+                logger.warning("Threshold cache LISTEN connection closed; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Threshold cache LISTEN failed: {e}")
+            finally:
+                self.listening = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.retry_s)
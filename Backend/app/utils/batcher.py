@@ -0,0 +1,115 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
+from app.utils.loggers import get_logger
+
+logger = get_logger()
+
+T = TypeVar("T")
+
+
+class AsyncBatcher(Generic[T]):
+    """
+    Buffers items and hands them to `flush_fn` in batches.
+
+    A batch is flushed when it reaches `max_size` items, and a background
+    loop flushes whatever is buffered every `max_delay_s`, so no item waits
+    much longer than that. Flushes are serialized. If a flush raises, its
+    items go back to the front of the buffer as long as no more than
+    `max_pending` items would be held; anything beyond that is dropped and
+    counted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush_fn: Callable[[List[T]], Awaitable[Any]],
+        max_size: int,
+        max_delay_s: float,
+        max_pending: Optional[int] = None,
+    ):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.max_delay_s = max_delay_s
+        self.max_pending = max_pending or max_size * 10
+        self._buffer: List[T] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._retry_at = 0.0  # after a failed flush, leave retries to the timer until then
+        self.stats: Dict[str, Any] = {
+            "flushes": 0,
+            "items": 0,
+            "failed_flushes": 0,
+            "dropped": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    async def add(self, item: T):
+        """Buffer one item, flushing inline when the batch is full (back-pressure)."""
+        if len(self._buffer) >= self.max_pending:
+            self.stats["dropped"] += 1
+            return
+        self._buffer.append(item)
+        if len(self._buffer) >= self.max_size and time.monotonic() >= self._retry_at:
+            await self.flush()
+
+    async def flush(self):
+        """Flush everything buffered right now, in batches of at most max_size."""
+        async with self._lock:
+            while self._buffer:
+                batch = self._buffer[:self.max_size]
+                del self._buffer[:self.max_size]
+                if not await self._flush_batch(batch):
+                    break
+
+    async def _flush_batch(self, batch: List[T]) -> bool:
+        start = time.perf_counter()
+        try:
+            await self.flush_fn(batch)
+        except Exception as e:
+            self.stats["failed_flushes"] += 1
+            self._retry_at = time.monotonic() + self.max_delay_s
+            room = max(self.max_pending - len(self._buffer), 0)
+            kept = batch[:room]
+            self.stats["dropped"] += len(batch) - len(kept)
+            self._buffer[:0] = kept
+            logger.error(
+                f"{self.name}: flush of {len(batch)} items failed ({len(kept)} re-queued): {e}", exc_info=True)
+            return False
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats["flushes"] += 1
+        self.stats["items"] += len(batch)
+        self.stats["last_batch_size"] = len(batch)
+        self.stats["last_flush_ms"] = round(elapsed_ms, 2)
+        self.stats["max_flush_ms"] = round(max(self.stats["max_flush_ms"], elapsed_ms), 2)
+        logger.debug(f"{self.name}: flushed {len(batch)} items in {elapsed_ms:.1f} ms")
+        return True
+
+    async def start(self):
+        """Start the time-based flush loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}_flusher")
+
+    async def close(self):
+        """Stop the flush loop and flush whatever is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.max_delay_s)
+            if self._buffer:
+                await self.flush()
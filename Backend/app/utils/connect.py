@@ -3,6 +3,16 @@ import redis.asyncio as redis
 from app.core.config import Config
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def database_url() -> str:
+    """asyncpg URL of the configured Postgres database (also used by the migrations)."""
+    return (
+        f"postgresql+asyncpg://{Config.PGUSER}:{Config.PGPASSWORD}"
+        f"@{Config.PGHOST}:{Config.PGPORT}/{Config.PGDATABASE}"
+    )
+
+
 class DB:
     def __init__(self):
         self.redis_client = None
@@ -23,11 +33,7 @@ class DB:
 
         # Postgres connection
         if all([Config.PGHOST, Config.PGDATABASE, Config.PGUSER, Config.PGPASSWORD, Config.PGPORT]):
-            db_url = (
-                f"postgresql+asyncpg://{Config.PGUSER}:{Config.PGPASSWORD}"
-                f"@{Config.PGHOST}:{Config.PGPORT}/{Config.PGDATABASE}"
-            )
-            self.pg_engine = create_async_engine(db_url, pool_pre_ping=True)
+            self.pg_engine = create_async_engine(database_url(), pool_pre_ping=True)
 
             # Use async_sessionmaker instead of sessionmaker for AsyncSession
             self.pg_session_factory = async_sessionmaker(
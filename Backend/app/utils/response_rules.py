@@ -0,0 +1,376 @@
+"""
+Compiled response_validation rules.
+
+An endpoint's response_validation column holds a JSON document such as:
+
+    {
+        "json_path": [
+            {"path": "$.status", "equals": "ok"},
+            {"path": "data.items[0].id", "exists": true},
+            {"path": "data.count", "min": 1}
+        ],
+        "body_regex": ["\\"healthy\\":\\s*true", {"pattern": "error", "negate": true}],
+        "headers": {"content-type": {"regex": "^application/json"}, "x-served-by": "edge"},
+        "schema": {"type": "object", "required": ["status"],
+                   "properties": {"status": {"enum": ["ok", "degraded"]}}}
+    }
+
+compile_rules() turns it into a CompiledValidator made of pre-parsed paths,
+pre-compiled regexes and closure-based schema checks, so evaluating a
+response is a handful of dict lookups and regex matches. The engine only
+depends on the rules and the response, so the HTTP client can evaluate it
+without reaching into the services layer; app.services.response_validation
+caches one compiled validator per endpoint version.
+"""
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from app.core.exceptions import ValidationRuleError
+
+_MISSING = object()
+# Passed as body_json when the body was not captured in full or is not JSON
+NO_JSON = _MISSING
+_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+
+# A check returns an error string, or None when it passes
+Check = Callable[[Any], Optional[str]]
+_KIND_NAMES = {list: "a list", dict: "an object", int: "an integer", (int, float): "a number"}
+
+
+def _expect(value: Any, kind: type, what: str) -> Any:
+    """Return `value` if it is a `kind`, else raise ValidationRuleError naming `what`."""
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise ValidationRuleError(f"{what} must be {_KIND_NAMES[kind]}, got {value!r}")
+    return value
+
+
+def _number(value: Any, what: str) -> Union[int, float]:
+    return _expect(value, (int, float), what)
+
+
+# ----------------------------
+# JSON path assertions
+# ----------------------------
+def _parse_path(path: str) -> Tuple[Union[str, int], ...]:
+    """'$.data.items[0].id' / 'data.items.0.id' -> ('data', 'items', 0, 'id')."""
+    if not isinstance(path, str) or not path:
+        raise ValidationRuleError(f"json_path entry has an invalid path: {path!r}")
+    if path.startswith("$"):
+        path = path[1:].lstrip(".")
+    keys: List[Union[str, int]] = []
+    for name, index in _PATH_TOKEN.findall(path):
+        if index:
+            keys.append(int(index))
+        elif name.isdigit():
+            keys.append(int(name))
+        else:
+            keys.append(name)
+    return tuple(keys)
+
+
+def _resolve(document: Any, keys: Tuple[Union[str, int], ...]) -> Any:
+    value = document
+    for key in keys:
+        if isinstance(key, int):
+            if not isinstance(value, list) or key >= len(value):
+                return _MISSING
+            value = value[key]
+        else:
+            if not isinstance(value, dict) or key not in value:
+                return _MISSING
+            value = value[key]
+    return value
+
+
+def _compile_assertion(rule: Dict[str, Any]) -> Check:
+    if not isinstance(rule, dict) or "path" not in rule:
+        raise ValidationRuleError(f"json_path entries must be objects with a 'path': {rule!r}")
+    path = rule["path"]
+    keys = _parse_path(path)
+    tests: List[Callable[[Any], Optional[str]]] = []
+
+    if "exists" in rule:
+        should_exist = bool(rule["exists"])
+    else:
+        should_exist = True
+
+    if "equals" in rule:
+        expected = rule["equals"]
+        tests.append(lambda v: None if v == expected else f"{path} is {v!r}, expected {expected!r}")
+    if "not_equals" in rule:
+        unexpected = rule["not_equals"]
+        tests.append(lambda v: None if v != unexpected else f"{path} must not be {unexpected!r}")
+    if "in" in rule:
+        allowed = _expect(rule["in"], list, f"'in' of {path}")
+        tests.append(lambda v: None if v in allowed else f"{path} is {v!r}, expected one of {allowed!r}")
+    if "regex" in rule:
+        try:
+            pattern = re.compile(rule["regex"])
+        except (re.error, TypeError) as e:
+            raise ValidationRuleError(f"Invalid regex for {path}: {e}") from e
+        tests.append(
+            lambda v: None if isinstance(v, str) and pattern.search(v) else f"{path} does not match {pattern.pattern!r}")
+    if "min" in rule:
+        low = _number(rule["min"], f"'min' of {path}")
+        tests.append(
+            lambda v: None if isinstance(v, (int, float)) and not isinstance(v, bool) and v >= low
+            else f"{path} is {v!r}, expected >= {low}")
+    if "max" in rule:
+        high = _number(rule["max"], f"'max' of {path}")
+        tests.append(
+            lambda v: None if isinstance(v, (int, float)) and not isinstance(v, bool) and v <= high
+            else f"{path} is {v!r}, expected <= {high}")
+    if "type" in rule:
+        type_check = _type_check(rule["type"])
+        tests.append(lambda v: None if type_check(v) else f"{path} is not of type {rule['type']!r}")
+
+    def check(document: Any) -> Optional[str]:
+        value = _resolve(document, keys)
+        if value is _MISSING:
+            return f"{path} is missing" if should_exist else None
+        if not should_exist:
+            return f"{path} should not exist"
+        for test in tests:
+            error = test(value)
+            if error:
+                return error
+        return None
+
+    return check
+
+
+# ----------------------------
+# Schema subset (type/enum/required/properties/items/bounds)
+# ----------------------------
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _type_check(type_spec: Union[str, Sequence[str]]) -> Callable[[Any], bool]:
+    names = [type_spec] if isinstance(type_spec, str) else _expect(type_spec, list, "type")
+    unknown = [name for name in names if not isinstance(name, str) or name not in _TYPES]
+    if unknown or not names:
+        raise ValidationRuleError(f"Unknown schema type: {(unknown or names)!r}")
+    checks = [_TYPES[name] for name in names]
+    if len(checks) == 1:
+        return checks[0]
+    return lambda v: any(check(v) for check in checks)
+
+
+def _compile_schema(schema: Dict[str, Any], where: str = "$") -> Check:
+    if not isinstance(schema, dict):
+        raise ValidationRuleError(f"Schema at {where} must be an object")
+    checks: List[Check] = []
+
+    if "type" in schema:
+        type_check = _type_check(schema["type"])
+        type_name = schema["type"]
+        checks.append(lambda v: None if type_check(v) else f"{where} is not of type {type_name!r}")
+    if "enum" in schema:
+        allowed = _expect(schema["enum"], list, f"enum of {where}")
+        checks.append(lambda v: None if v in allowed else f"{where} is {v!r}, expected one of {allowed!r}")
+    if "minimum" in schema:
+        low = _number(schema["minimum"], f"minimum of {where}")
+        checks.append(lambda v: None if not _TYPES["number"](v) or v >= low else f"{where} is below {low}")
+    if "maximum" in schema:
+        high = _number(schema["maximum"], f"maximum of {where}")
+        checks.append(lambda v: None if not _TYPES["number"](v) or v <= high else f"{where} is above {high}")
+    if "minLength" in schema:
+        min_len = _expect(schema["minLength"], int, f"minLength of {where}")
+        checks.append(lambda v: None if not isinstance(v, str) or len(v) >= min_len else f"{where} is shorter than {min_len}")
+    if "maxLength" in schema:
+        max_len = _expect(schema["maxLength"], int, f"maxLength of {where}")
+        checks.append(lambda v: None if not isinstance(v, str) or len(v) <= max_len else f"{where} is longer than {max_len}")
+    if "minItems" in schema:
+        min_items = _expect(schema["minItems"], int, f"minItems of {where}")
+        checks.append(lambda v: None if not isinstance(v, list) or len(v) >= min_items else f"{where} has fewer than {min_items} items")
+    if "required" in schema:
+        required = _expect(schema["required"], list, f"required of {where}")
+        if not all(isinstance(key, str) for key in required):
+            raise ValidationRuleError(f"required of {where} must list property names, got {required!r}")
+        checks.append(lambda v: next(
+            (f"{where}.{key} is required" for key in required if not isinstance(v, dict) or key not in v), None))
+    if "properties" in schema:
+        properties = {
+            key: _compile_schema(sub_schema, f"{where}.{key}")
+            for key, sub_schema in _expect(schema["properties"], dict, f"properties of {where}").items()
+        }
+
+        def check_properties(v: Any) -> Optional[str]:
+            if not isinstance(v, dict):
+                return None
+            for key, sub_check in properties.items():
+                if key in v:
+                    error = sub_check(v[key])
+                    if error:
+                        return error
+            return None
+
+        checks.append(check_properties)
+    if "items" in schema:
+        item_check = _compile_schema(schema["items"], f"{where}[]")
+
+        def check_items(v: Any) -> Optional[str]:
+            if not isinstance(v, list):
+                return None
+            for item in v:
+                error = item_check(item)
+                if error:
+                    return error
+            return None
+
+        checks.append(check_items)
+
+    def check(value: Any) -> Optional[str]:
+        for sub_check in checks:
+            error = sub_check(value)
+            if error:
+                return error
+        return None
+
+    return check
+
+
+# ----------------------------
+# Body regex and header checks
+# ----------------------------
+def _compile_body_regex(rule: Union[str, Dict[str, Any]]) -> Callable[[str], Optional[str]]:
+    if isinstance(rule, str):
+        rule = {"pattern": rule}
+    if not isinstance(rule, dict) or "pattern" not in rule:
+        raise ValidationRuleError(f"body_regex entries must be strings or objects with a 'pattern': {rule!r}")
+    try:
+        pattern = re.compile(rule["pattern"])
+    except (re.error, TypeError) as e:
+        raise ValidationRuleError(f"Invalid body_regex {rule['pattern']!r}: {e}") from e
+    negate = bool(rule.get("negate", False))
+
+    def check(text: str) -> Optional[str]:
+        found = pattern.search(text) is not None
+        if found == negate:
+            return f"body {'matches' if negate else 'does not match'} {pattern.pattern!r}"
+        return None
+
+    return check
+
+
+def _compile_header(name: str, rule: Any) -> Callable[[Dict[str, str]], Optional[str]]:
+    header = name.lower()
+    if isinstance(rule, dict):
+        if "regex" in rule:
+            try:
+                pattern = re.compile(rule["regex"])
+            except (re.error, TypeError) as e:
+                raise ValidationRuleError(f"Invalid regex for header {name}: {e}") from e
+            test = lambda v: pattern.search(v) is not None
+            expectation = f"to match {pattern.pattern!r}"
+        elif rule.get("exists") is False:
+            return lambda headers: f"header {name} should not be present" if header in headers else None
+        else:
+            test = lambda v: True
+            expectation = "to be present"
+    else:
+        expected = str(rule)
+        test = lambda v: v == expected
+        expectation = f"to equal {expected!r}"
+
+    def check(headers: Dict[str, str]) -> Optional[str]:
+        value = headers.get(header)
+        if value is None or not test(value):
+            return f"expected header {name} {expectation}, got {value!r}"
+        return None
+
+    return check
+
+
+class CompiledValidator:
+    """Pre-compiled response_validation rules for one endpoint version."""
+
+    __slots__ = ("json_checks", "body_checks", "header_checks", "schema_check")
+
+    def __init__(self, json_checks, body_checks, header_checks, schema_check):
+        self.json_checks: List[Check] = json_checks
+        self.body_checks: List[Callable[[str], Optional[str]]] = body_checks
+        self.header_checks: List[Callable[[Dict[str, str]], Optional[str]]] = header_checks
+        self.schema_check: Optional[Check] = schema_check
+
+    @property
+    def needs_json(self) -> bool:
+        return bool(self.json_checks) or self.schema_check is not None
+
+    @property
+    def needs_text(self) -> bool:
+        return bool(self.body_checks)
+
+    def validate(
+        self,
+        headers: Dict[str, str],
+        body_json: Any = _MISSING,
+        body_text: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Evaluate all rules. `headers` is a case-insensitive mapping such as
+        httpx.Headers, or a dict with lower-case names.
+        Returns the list of failures; an empty list means the response passed.
+        """
+        errors: List[str] = []
+        for check in self.header_checks:
+            error = check(headers)
+            if error:
+                errors.append(error)
+        if self.needs_json:
+            if body_json is _MISSING:
+                errors.append("response body is not valid JSON (or exceeded the capture limit)")
+            else:
+                for check in self.json_checks:
+                    error = check(body_json)
+                    if error:
+                        errors.append(error)
+                if self.schema_check is not None:
+                    error = self.schema_check(body_json)
+                    if error:
+                        errors.append(f"schema: {error}")
+        if self.body_checks:
+            text = body_text or ""
+            for check in self.body_checks:
+                error = check(text)
+                if error:
+                    errors.append(error)
+        return errors
+
+
+def compile_rules(spec: Optional[Dict[str, Any]]) -> Optional[CompiledValidator]:
+    """Compile a response_validation document; returns None when there is nothing to check."""
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        try:
+            spec = json.loads(spec)
+        except ValueError as e:
+            raise ValidationRuleError(f"response_validation is not valid JSON: {e}") from e
+    if not isinstance(spec, dict):
+        raise ValidationRuleError("response_validation must be an object")
+
+    unknown = set(spec) - {"json_path", "body_regex", "headers", "schema"}
+    if unknown:
+        raise ValidationRuleError(f"Unknown response_validation keys: {sorted(unknown)}")
+
+    body_regex = spec.get("body_regex") or []
+    if isinstance(body_regex, str):
+        body_regex = [body_regex]
+    json_checks = [_compile_assertion(rule) for rule in _expect(spec.get("json_path") or [], list, "json_path")]
+    body_checks = [_compile_body_regex(rule) for rule in _expect(body_regex, list, "body_regex")]
+    header_checks = [_compile_header(name, rule)
+                     for name, rule in _expect(spec.get("headers") or {}, dict, "headers").items()]
+    schema_check = _compile_schema(spec["schema"]) if spec.get("schema") else None
+
+    if not (json_checks or body_checks or header_checks or schema_check):
+        return None
+    return CompiledValidator(json_checks, body_checks, header_checks, schema_check)
@@ -0,0 +1,57 @@
+"""
+Micro-benchmark: latency baseline anomaly detection.
+
+Usage (from the Backend directory):
+    python -m scripts.bench_baseline [--endpoints 50000]
+
+Fills a week of hourly medians with a daily pattern for every endpoint,
+then times one detection pass over recent medians in which one endpoint
+in a thousand regressed.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import numpy as np
+from app.services.baseline import LatencyBaselines, _hour_number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    now = datetime.utcnow().replace(minute=5, second=0, microsecond=0)
+    baselines = LatencyBaselines()
+    span = baselines.missing_span(now)
+    baselines.ingest(span, [])
+    for endpoint in range(args.endpoints):
+        baselines._row(f"endpoint-{endpoint}")
+
+    hours = [span[0] + timedelta(hours=i) for i in range(baselines.hours)]
+    columns = np.array([_hour_number(hour) % baselines.hours for hour in hours])
+    daily = 1 + 0.5 * np.sin(np.array([hour.hour for hour in hours]) / 24 * 2 * np.pi)
+    typical = rng.uniform(50, 800, args.endpoints)
+    noise = rng.uniform(0.9, 1.1, (args.endpoints, baselines.hours))
+    baselines.medians[:args.endpoints][:, columns] = (typical[:, None] * daily[None, :] * noise).astype(np.float32)
+
+    current = 1 + 0.5 * np.sin(now.hour / 24 * 2 * np.pi)
+    recent = [
+        SimpleNamespace(
+            endpoint_id=f"endpoint-{endpoint}",
+            median_ms=typical[endpoint] * current * (3 if endpoint % 1000 == 0 else 1),
+            samples=15, first_at=now, last_at=now,
+        )
+        for endpoint in range(args.endpoints)
+    ]
+
+    start = time.perf_counter()
+    anomalies = baselines.detect(recent, now)
+    elapsed = time.perf_counter() - start
+    print(f"{args.endpoints} endpoints x {baselines.hours} h: {elapsed * 1000:.0f} ms, "
+          f"{len(anomalies)} anomalies (expected {len(range(0, args.endpoints, 1000))})")
+
+
+if __name__ == "__main__":
+    main()
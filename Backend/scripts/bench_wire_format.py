@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: JSON vs binary wire format for monitoring results.
+
+Usage (from the Backend directory):
+    python -m scripts.bench_wire_format [--count 100000]
+
+Reports bytes per message and per-message encode/decode cost for the legacy
+JSON path (model_dump_json + json.loads) and the binary codec.
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from app.infrastructure.kafka.codec import decode_result, encode_result, encode_result_json
+from app.schemas.service import PhaseTimingsModal, ProducerResultModal
+
+
+def make_results(count: int):
+    now = datetime.utcnow()
+    results = []
+    for i in range(count):
+        results.append(ProducerResultModal(
+            id=uuid.uuid4(),
+            checked_at=now - timedelta(seconds=i),
+            response_time_ms=random.randint(5, 2000),
+            status_code=random.choice([200, 200, 200, 500, None]),
+            is_healthy=random.random() > 0.1,
+            phases=PhaseTimingsModal(
+                dns_ms=random.randint(0, 20), connect_ms=random.randint(1, 50), tls_ms=random.randint(5, 80),
+                ttfb_ms=random.randint(5, 1500), download_ms=random.randint(0, 200),
+            ),
+        ))
+    return results
+
+
+def bench(name, encode, decode, results):
+    start = time.perf_counter()
+    payloads = [encode(result) for result in results]
+    encode_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in payloads:
+        decode(payload)
+    decode_s = time.perf_counter() - start
+
+    count = len(results)
+    size = sum(len(p) for p in payloads) / count
+    print(f"{name:<8} {size:>8.1f} B/msg {encode_s / count * 1e6:>9.2f} us encode {decode_s / count * 1e6:>9.2f} us decode")
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    results = make_results(args.count)
+    json_size = bench("json", encode_result_json, lambda p: json.loads(p.decode("utf-8")), results)
+    binary_size = bench("binary", encode_result, decode_result, results)
+    print(f"binary is {json_size / binary_size:.1f}x smaller than json")
+
+
+if __name__ == "__main__":
+    main()
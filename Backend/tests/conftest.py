@@ -0,0 +1,59 @@
+"""
+Shared fixtures.
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q                     # from Backend/
+
+Tests that need a broker or a database skip themselves unless one is
+configured: REDIS_HOST for Redis Streams, KAFKA_BROKER_URL for Kafka, and
+PGHOST/PGDATABASE/PGUSER/PGPASSWORD for PostgreSQL.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from uuid import UUID, uuid4
+import pytest
+from app.core.config import Config
+from app.schemas.service import ProducerResultModal
+from app.utils.connect import db
+
+BASE_TIME = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def make_result() -> Callable[..., ProducerResultModal]:
+    """
+    make_result(endpoint_id, seq) builds the seq-th result of an endpoint:
+    checked_at is seq seconds after BASE_TIME and response_time_ms is seq,
+    so the order a result was published in can be read back from either.
+    """
+    def build(endpoint_id: Optional[UUID] = None, seq: int = 0, **fields) -> ProducerResultModal:
+        values = {
+            "id": endpoint_id or uuid4(),
+            "checked_at": BASE_TIME + timedelta(seconds=seq),
+            "response_time_ms": seq,
+            "status_code": 200,
+            "is_healthy": True,
+        }
+        values.update(fields)
+        return ProducerResultModal(**values)
+
+    return build
+
+
+@pytest.fixture
+async def pg_session():
+    """
+    A session on the configured, migrated database. Everything the test
+    does is rolled back, so it must not commit.
+    """
+    if not all([Config.PGHOST, Config.PGDATABASE, Config.PGUSER, Config.PGPASSWORD]):
+        pytest.skip("PostgreSQL is not configured (PGHOST, PGDATABASE, PGUSER, PGPASSWORD)")
+    await db.init_db()
+    try:
+        async with db.pg_session_factory() as session:
+            try:
+                yield session
+            finally:
+                await session.rollback()
+    finally:
+        await db.close_db()
@@ -0,0 +1,50 @@
+from datetime import datetime
+from app.services import baseline
+from app.utils.connect import db
+
+
+class AbortingSession:
+    """Like a Postgres transaction: after one failed statement every later one fails until rollback."""
+
+    def __init__(self):
+        self.aborted = False
+        self.rollbacks = 0
+
+    async def rollback(self):
+        self.aborted = False
+        self.rollbacks += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def test_a_failed_anomaly_does_not_abort_the_rest(monkeypatch):
+    session = AbortingSession()
+    monkeypatch.setattr(db, "pg_session_factory", lambda: session)
+    monkeypatch.setattr(baseline.baselines, "missing_span", lambda now: None)
+    anomalies = [{"endpoint_id": endpoint_id, "recent_ms": 900.0, "baseline_ms": 100.0, "z": 8.0,
+                  "seasonal": True, "first_at": datetime(2026, 1, 1), "last_at": datetime(2026, 1, 1, 0, 5)}
+                 for endpoint_id in ("a", "b", "c")]
+    monkeypatch.setattr(baseline.baselines, "detect", lambda recent, now: anomalies)
+
+    async def recent_medians(session, since):
+        return []
+
+    recorded = []
+
+    async def record(session, endpoint_id, records, reason, detail=None):
+        if session.aborted or endpoint_id == "a":
+            session.aborted = True
+            raise RuntimeError("current transaction is aborted")
+        recorded.append(endpoint_id)
+
+    monkeypatch.setattr(baseline.api_service, "get_recent_latency_medians", recent_medians)
+    monkeypatch.setattr(baseline.api_service, "createOrUpdateIncident", record)
+
+    await baseline.run_baseline_job()
+
+    assert recorded == ["b", "c"]
+    assert session.rollbacks == 1
@@ -0,0 +1,64 @@
+import asyncio
+from app.utils.batcher import AsyncBatcher
+
+
+class Sink:
+    def __init__(self, failures: int = 0):
+        self.batches = []
+        self.failures = failures
+
+    async def __call__(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("downstream unavailable")
+        self.batches.append(list(batch))
+
+
+async def test_full_batches_are_flushed_inline():
+    sink = Sink()
+    batcher = AsyncBatcher("test", sink, max_size=3, max_delay_s=60)
+    for item in range(7):
+        await batcher.add(item)
+    assert sink.batches == [[0, 1, 2], [3, 4, 5]]
+    assert len(batcher) == 1
+
+
+async def test_the_timer_flushes_partial_batches():
+    sink = Sink()
+    batcher = AsyncBatcher("test", sink, max_size=100, max_delay_s=0.01)
+    await batcher.start()
+    await batcher.add("a")
+    await asyncio.sleep(0.1)
+    assert sink.batches == [["a"]]
+    await batcher.close()
+
+
+async def test_close_flushes_what_is_left():
+    sink = Sink()
+    batcher = AsyncBatcher("test", sink, max_size=2, max_delay_s=60)
+    await batcher.start()
+    for item in range(5):
+        await batcher.add(item)
+    await batcher.close()
+    assert sink.batches == [[0, 1], [2, 3], [4]]
+    assert batcher.stats["items"] == 5
+
+
+async def test_a_failed_batch_is_retried_first_and_in_order():
+    sink = Sink(failures=1)
+    batcher = AsyncBatcher("test", sink, max_size=2, max_delay_s=60)
+    await batcher.add(0)
+    await batcher.add(1)  # full: flush fails, both go back to the front
+    await batcher.add(2)
+    assert batcher.stats["failed_flushes"] == 1
+    await batcher.flush()
+    assert sink.batches == [[0, 1], [2]]
+
+
+async def test_items_beyond_max_pending_are_dropped_and_counted():
+    sink = Sink(failures=100)
+    batcher = AsyncBatcher("test", sink, max_size=2, max_delay_s=60, max_pending=3)
+    for item in range(6):
+        await batcher.add(item)
+    assert len(batcher) == 3
+    assert batcher.stats["dropped"] == 3
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from uuid import uuid4
+import pytest
+from app.core.config import Config
+from app.schemas.service import ApiProducerServiceModal
+from app.services.check_scheduler import CheckScheduler
+
+
+def service(interval=60, endpoint_id=None):
+    return ApiProducerServiceModal(
+        id=endpoint_id or uuid4(), name="api", url="https://example.com/health", check_interval_seconds=interval)
+
+
+async def no_dispatch(service, due_at):
+    pass
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(Config, "HEALTH_CHECK_MIN_INTERVAL_SECONDS", 10)
+    monkeypatch.setattr(Config, "HEALTH_CHECK_INTERVAL_SECONDS", 60)
+    return CheckScheduler(no_dispatch)
+
+
+def test_phase_offset_is_stable_and_inside_the_interval():
+    endpoint_id = str(uuid4())
+    offset = CheckScheduler.phase_offset(endpoint_id, 30)
+    assert 0 <= offset < 30
+    assert CheckScheduler.phase_offset(endpoint_id, 30) == offset
+
+
+def test_next_due_is_the_first_slot_on_the_endpoint_grid_after_now(scheduler):
+    endpoint_id = str(uuid4())
+    offset = scheduler.phase_offset(endpoint_id, 60)
+    for now in (1_000_000.0, 1_000_000.0 + offset, 1_000_059.9):
+        due = scheduler.next_due(endpoint_id, 60, now)
+        assert now < due <= now + 60
+        assert (due - offset) % 60 == pytest.approx(0, abs=1e-6)
+
+
+def test_interval_falls_back_to_the_default_and_is_floored(scheduler):
+    assert scheduler.interval_for(service(interval=None)) == 60
+    assert scheduler.interval_for(service(interval=1)) == 10
+    assert scheduler.interval_for(service(interval=300)) == 300
+
+
+def test_rescheduling_with_the_same_interval_keeps_the_pending_slot(scheduler):
+    endpoint = service(interval=60)
+    scheduler.schedule(endpoint, now=1_000_000.0)
+    scheduler.schedule(endpoint.model_copy(update={"name": "renamed"}), now=1_000_030.0)
+    assert len(scheduler._heap) == 1
+    assert scheduler._entries[str(endpoint.id)].service.name == "renamed"
+
+    scheduler.schedule(endpoint.model_copy(update={"check_interval_seconds": 120}), now=1_000_030.0)
+    assert len(scheduler._heap) == 2  # the old item is discarded lazily
+    assert scheduler._entries[str(endpoint.id)].interval_s == 120
+
+
+def test_sync_drops_endpoints_that_are_gone(scheduler):
+    kept, removed = service(), service()
+    scheduler.sync([kept, removed])
+    scheduler.sync([kept])
+    assert len(scheduler) == 1
+    assert str(kept.id) in scheduler._entries
+
+
+async def test_due_checks_are_dispatched_and_missed_slots_skipped(monkeypatch):
+    monkeypatch.setattr(Config, "HEALTH_CHECK_MIN_INTERVAL_SECONDS", 10)
+    fired = []
+    dispatched = asyncio.Event()
+
+    async def dispatch(endpoint, due_at):
+        fired.append((endpoint.id, due_at))
+        dispatched.set()
+
+    scheduler = CheckScheduler(dispatch)
+    endpoint = service(interval=10)
+    # Scheduled as if the process had been asleep for ~5 intervals
+    scheduler.schedule(endpoint, now=time.time() - 50)
+    await scheduler.start()
+    try:
+        await asyncio.wait_for(dispatched.wait(), 5)
+    finally:
+        await scheduler.stop()
+
+    assert fired[0][0] == endpoint.id
+    assert len(fired) == 1
+    assert scheduler.skipped_slots >= 3
+    next_due = scheduler._heap[0][0]
+    assert next_due > time.time()
+
+
+async def test_a_slot_is_skipped_while_the_previous_check_is_still_running(scheduler):
+    release = asyncio.Event()
+    started = []
+
+    async def slow_dispatch(endpoint, due_at):
+        started.append(due_at)
+        await release.wait()
+
+    scheduler.dispatch = slow_dispatch
+    endpoint = service(interval=10)
+    scheduler.schedule(endpoint)
+    entry = scheduler._entries[str(endpoint.id)]
+
+    scheduler._fire(str(endpoint.id), entry, 1.0)
+    await asyncio.sleep(0)
+    scheduler._fire(str(endpoint.id), entry, 11.0)
+    assert started == [1.0]
+    assert scheduler.busy_slots == 1
+
+    release.set()
+    await scheduler._in_flight[str(endpoint.id)]
+    await asyncio.sleep(0)  # done callbacks run on the next loop iteration
+    assert not scheduler._in_flight
+    scheduler._fire(str(endpoint.id), entry, 21.0)
+    await asyncio.sleep(0)
+    assert started == [1.0, 21.0]
+    await scheduler.stop()
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import pytest
+from app.infrastructure.kafka.codec import (
+    WIRE_VERSION, WIRE_VERSION_LOGS, decode_result, encode_result, encode_result_json,
+)
+from app.schemas.service import PhaseTimingsModal
+
+
+def test_results_without_log_fields_use_the_fixed_v1_record(make_result):
+    result = make_result(seq=5, phases=PhaseTimingsModal(dns_ms=1, connect_ms=2, tls_ms=None, ttfb_ms=4, download_ms=0),
+                         confirm_attempt=1, confirm_total=3)
+    payload = encode_result(result)
+    assert len(payload) == 54
+    assert payload[0] == WIRE_VERSION
+
+    decoded = decode_result(payload)
+    assert decoded["id"] == str(result.id)
+    assert decoded["checked_at"] == result.checked_at
+    assert decoded["response_time_ms"] == 5
+    assert decoded["status_code"] == 200
+    assert decoded["is_healthy"] is True
+    assert decoded["phases"] == {"dns_ms": 1, "connect_ms": 2, "tls_ms": None, "ttfb_ms": 4, "download_ms": 0}
+    assert (decoded["confirm_attempt"], decoded["confirm_total"]) == (1, 3)
+    assert decoded["error_message"] is None and decoded["response_body"] is None
+
+
+def test_missing_values_round_trip_as_none(make_result):
+    decoded = decode_result(encode_result(make_result(response_time_ms=None, status_code=None, is_healthy=None)))
+    assert decoded["response_time_ms"] is None
+    assert decoded["status_code"] is None
+    assert decoded["is_healthy"] is None
+    assert decoded["phases"] is None
+
+
+def test_log_fields_switch_to_v2(make_result):
+    result = make_result(is_healthy=False, error_message="timeout ⏱", response_body='{"ok": false}')
+    payload = encode_result(result)
+    assert payload[0] == WIRE_VERSION_LOGS
+
+    decoded = decode_result(payload)
+    assert decoded["is_healthy"] is False
+    assert decoded["error_message"] == "timeout ⏱"
+    assert decoded["response_body"] == '{"ok": false}'
+
+
+def test_aware_timestamps_are_stored_as_naive_utc(make_result):
+    local = datetime(2026, 3, 1, 12, 30, tzinfo=timezone(timedelta(hours=2)))
+    decoded = decode_result(encode_result(make_result(checked_at=local)))
+    assert decoded["checked_at"] == datetime(2026, 3, 1, 10, 30)
+
+
+def test_legacy_json_messages_still_decode(make_result):
+    result = make_result(seq=7)
+    decoded = decode_result(encode_result_json(result))
+    assert decoded["id"] == str(result.id)
+    assert decoded["response_time_ms"] == 7
+
+
+@pytest.mark.parametrize("payload", [b"", bytes([9]) + bytes(53)])
+def test_unreadable_payloads_are_rejected(payload):
+    with pytest.raises(ValueError):
+        decode_result(payload)
+
+
+def test_endpoint_ids_survive_the_round_trip(make_result):
+    endpoint_id = uuid4()
+    assert decode_result(encode_result(make_result(endpoint_id)))["id"] == str(endpoint_id)
+
+
+def test_the_skipped_flag_round_trips(make_result):
+    assert decode_result(encode_result(make_result(is_healthy=False, skipped=True)))["skipped"] is True
+    assert decode_result(encode_result(make_result()))["skipped"] is False
@@ -0,0 +1,109 @@
+import pytest
+from app.services.detection import DetectionPolicy, EndpointDetector, RollingCount
+
+
+def detector(expected_latency_ms=100, **policy):
+    return EndpointDetector(DetectionPolicy(**policy), expected_latency_ms)
+
+
+def test_policy_defaults_and_bounds():
+    policy = DetectionPolicy(failure_n=5, failure_m=3, latency_m=0)
+    assert (policy.failure_n, policy.failure_m) == (3, 3)
+    assert (policy.latency_n, policy.latency_m) == (1, 1)
+    assert policy.p95_threshold_ms is None
+
+
+@pytest.mark.parametrize("raw, failure_n", [
+    (None, 3),
+    ('{"failure_n": 2, "failure_m": 5}', 2),
+    ({"failure_n": 2, "failure_m": 5, "unknown": 1}, 2),
+    ("{broken", 3),
+])
+def test_policy_from_the_column_value(raw, failure_n):
+    assert DetectionPolicy.from_raw(raw).failure_n == failure_n
+
+
+def test_rolling_count_forgets_old_flags():
+    count = RollingCount(3)
+    for flag in (True, True, False, False):
+        count.add(flag)
+    assert (count.count, len(count)) == (1, 3)
+
+
+def test_failure_alert_on_n_of_the_last_m():
+    d = detector(failure_n=2, failure_m=3)
+    d.update(50, False)
+    d.update(50, True)
+    assert not d.failure_alert()
+    d.update(50, False)
+    assert d.failure_alert()
+    d.update(50, True)
+    assert not d.failure_alert()
+
+
+def test_latency_alert_on_n_of_the_last_m_slow_results():
+    d = detector(expected_latency_ms=100)
+    for latency in (150, 200):
+        d.update(latency, True)
+    assert d.latency_alert() is None
+    d.update(None, False)  # no latency: not counted as slow
+    assert d.latency_alert() is None
+    for latency in (150, 150, 150):
+        d.update(latency, True)
+    rule, lookback, limit, _ = d.latency_alert()
+    assert (rule, lookback, limit) == ("fixed", 3, 100)
+
+
+def test_p95_alert_needs_more_than_the_tail_above_the_threshold():
+    d = detector(expected_latency_ms=10_000, p95_threshold_ms=500, p95_window=20)
+    for _ in range(19):
+        d.update(100, True)
+    d.update(900, True)
+    assert d.latency_alert() is None  # 1 of 20 above: the p95 itself is still 100
+    d.update(900, True)
+    rule, lookback, limit, description = d.latency_alert()
+    assert (rule, lookback, limit) == ("p95", 20, 500)
+    assert "p95 of the last 20 checks is 900 ms" in description
+
+
+def test_ewma_drift_waits_for_enough_samples():
+    d = detector(expected_latency_ms=10_000, ewma_drift_ratio=1.5, ewma_min_samples=10, ewma_alpha=0.5)
+    for _ in range(8):
+        d.update(100, True)
+    d.update(400, True)
+    assert d.latency_alert() is None  # 9 samples
+    d.update(400, True)
+    rule, _, limit, description = d.latency_alert()
+    assert rule == "ewma"
+    assert limit == pytest.approx(d.baseline * 1.5)
+    assert "drifted above 1.5x" in description
+
+
+def test_bad_records_keep_their_order():
+    records = [
+        {"is_healthy": False, "response_time_ms": 50},
+        {"is_healthy": True, "response_time_ms": 300},
+        {"is_healthy": True, "response_time_ms": None},
+    ]
+    assert EndpointDetector.bad_records(records) == [records[0]]
+    assert EndpointDetector.bad_records(records, limit_ms=100) == [records[1]]
+
+
+def test_the_fixed_latency_rule_can_be_turned_off():
+    d = detector(expected_latency_ms=100, fixed_latency=False)
+    for _ in range(3):
+        d.update(150, True)
+    assert d.latency_alert() is None
+    assert d.latency_ok(150)
+
+
+def test_latency_recovery_follows_the_rule_that_opened_the_incident():
+    d = detector(expected_latency_ms=100, fixed_latency=False, p95_threshold_ms=500, p95_window=4)
+    for latency in (900, 900, 900, 900):
+        d.update(latency, True)
+    assert d.latency_alert()[0] == "p95"
+    # Above the fixed threshold but the p95 is back under its own threshold
+    for latency in (200, 200, 200, 200):
+        d.update(latency, True)
+    assert d.latency_ok(200, "p95")
+    assert not d.latency_ok(200, "fixed")
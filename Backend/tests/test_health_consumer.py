@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from app.core.config import Config
+from app.services.healthConsumer import HealthConsumer
+from app.services.service import INCIDENT_ERROR_MESSAGES
+
+T0 = datetime(2026, 1, 1)
+
+
+def msg(endpoint_id: str, seq: int):
+    return {"id": endpoint_id, "checked_at": T0 + timedelta(seconds=seq)}
+
+
+class FakeProcessing:
+    """Replaces the DB-backed processing: results of `bad` endpoints fail with `error`."""
+
+    def __init__(self, logic: HealthConsumer, bad=(), error=ValueError("bad row")):
+        self.logic = logic
+        self.bad = set(bad)
+        self.error = error
+        self.processed = []
+
+    def _fail(self, endpoint_ids):
+        self.logic.errors.update(dict.fromkeys(endpoint_ids, self.error))
+        return False
+
+    async def bulk(self, batch):
+        messages = [m for messages in batch.values() for m in messages]
+        failing = {m["id"] for m in messages if m["id"] in self.bad}
+        if failing:
+            return self._fail({m["id"] for m in messages})
+        self.processed.extend((m["id"], m["checked_at"].second) for m in messages)
+        return True
+
+    async def one(self, message, partition=None):
+        return await self.bulk({partition: [message]})
+
+
+@pytest.fixture
+def consumer(monkeypatch):
+    monkeypatch.setattr(Config, "CONSUMER_MAX_ATTEMPTS", 3)
+
+    def build(batch_mode=True, **fake):
+        monkeypatch.setattr(Config, "HEALTH_CONSUMER_BATCH_MODE", batch_mode)
+        logic = HealthConsumer()
+        processing = FakeProcessing(logic, **fake)
+        logic.process_bulk = processing.bulk
+        logic.process_message = processing.one
+        return logic, processing
+
+    return build
+
+
+BATCH = {0: [msg("good-a", 1), msg("bad", 1), msg("good-a", 2)], 1: [msg("good-b", 1)]}
+
+
+async def test_a_bad_endpoint_does_not_hold_back_other_endpoints(consumer):
+    logic, processing = consumer(bad={"bad"})
+    committed = await logic.process_batch(BATCH)
+    assert committed == [1]
+    assert ("good-a", 1) in processing.processed and ("good-a", 2) in processing.processed
+    assert ("good-b", 1) in processing.processed
+    assert logic.attempts == {("bad", str(T0 + timedelta(seconds=1))): 1}
+
+
+@pytest.mark.parametrize("batch_mode", [True, False])
+async def test_a_result_that_keeps_failing_is_dead_lettered(consumer, batch_mode):
+    logic, processing = consumer(batch_mode=batch_mode, bad={"bad"})
+    outcomes = [await logic.process_batch(BATCH) for _ in range(3)]
+    assert outcomes[0] == outcomes[1] == [1]
+    assert outcomes[2] == [0, 1]
+    assert logic.batch_stats["dead_lettered"] == 1
+    assert not logic.attempts and not logic.errors
+
+
+@pytest.mark.parametrize("batch_mode", [True, False])
+async def test_database_outages_never_dead_letter(consumer, batch_mode):
+    logic, processing = consumer(batch_mode=batch_mode, bad={"bad"}, error=ConnectionError("refused"))
+    for _ in range(5):
+        assert 0 not in await logic.process_batch(BATCH)
+    assert logic.batch_stats["dead_lettered"] == 0
+    assert not logic.attempts
+
+
+async def test_revocation_resets_attempt_counts(consumer):
+    logic, _ = consumer(bad={"bad"})
+    await logic.process_batch(BATCH)
+    logic.revoke([0])
+    assert not logic.attempts
+
+
+def details(**fields):
+    values = {"name": "api", "expected_status_code": 200, "expected_latency_ms": 100, "detection_policy": None}
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def failed(endpoint_id: str, seq: int, **fields):
+    return {**msg(endpoint_id, seq), "status_code": None, "response_time_ms": 50, "is_healthy": False, **fields}
+
+
+def test_checks_skipped_by_an_open_circuit_never_open_incidents(consumer):
+    logic, _ = consumer()
+    for seq in range(5):
+        logic.step("down", failed("down", seq, response_time_ms=None, skipped=True), details())
+    assert "down" not in logic.windows
+    assert logic.incidents.drain(["down"]) == ([], [])
+
+    for seq in range(5, 8):
+        logic.step("down", failed("down", seq), details())
+    inserts, _ = logic.incidents.drain(["down"])
+    assert len(inserts) == 1
+
+
+def test_an_incident_message_names_the_rule_that_opened_it(consumer):
+    logic, _ = consumer()
+    policy = {"failure_n": 2, "failure_m": 4}
+    for seq in range(3):
+        result = failed("flaky", seq) if seq != 1 else {**msg("flaky", seq), "status_code": 200, "response_time_ms": 50}
+        logic.step("flaky", result, details(detection_policy=policy))
+    [insert], _ = logic.incidents.drain(["flaky"])
+    assert insert["initial_error"] == f"{INCIDENT_ERROR_MESSAGES['failure']} 2 of the last 3 checks failed."
+
+
+async def test_the_p95_window_is_seeded_beyond_the_in_memory_window(consumer, monkeypatch):
+    import app.services.healthConsumer as module
+    limits = []
+
+    async def recent_records(session, ids, limit=3):
+        limits.append(limit)
+        return {i: [{"checked_at": T0 - timedelta(seconds=n), "response_time_ms": 900, "status_code": 200,
+                     "is_healthy": True} for n in range(limit)] for i in ids}
+
+    async def open_incidents(session, ids):
+        return {}
+
+    monkeypatch.setattr(module.api_service, "get_recent_records_bulk", recent_records)
+    monkeypatch.setattr(module.api_service, "get_open_incidents", open_incidents)
+    logic, _ = consumer()
+    policy = {"fixed_latency": False, "p95_threshold_ms": 500, "p95_window": 100}
+    await logic.warm_windows(None, ["slow"], {}, {"slow": details(detection_policy=policy)})
+
+    assert limits == [100]
+    window = logic.windows.get("slow")
+    assert window.size == logic.windows.capacity
+    assert len(window.detector.p95_latencies) == 100
+    assert window.detector.latency_alert()[0] == "p95"
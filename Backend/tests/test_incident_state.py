@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+import pytest
+from app.services.incident_state import HEALTHY, OPEN, RECOVERING, SUSPECT, IncidentTracker
+from app.services.service import INCIDENT_ERROR_MESSAGES
+
+T0 = datetime(2026, 1, 1)
+
+
+def at(seconds: int) -> datetime:
+    return T0 + timedelta(seconds=seconds)
+
+
+def confirmed(reason: str, *seconds: int, detail=None, rule=None):
+    # Records come newest first; the incident starts at the oldest one
+    return [{"checked_at": at(s)} for s in sorted(seconds, reverse=True)], reason, detail, rule
+
+
+@pytest.fixture
+def tracker():
+    return IncidentTracker(recovery_checks=2)
+
+
+def test_a_bad_result_makes_an_endpoint_suspect_and_a_good_one_clears_it(tracker):
+    tracker.observe("a", at(0), is_healthy=False, latency_ok=True)
+    assert tracker.state_of("a") == SUSPECT
+    tracker.observe("a", at(1), is_healthy=True, latency_ok=True)
+    assert tracker.state_of("a") == HEALTHY
+    assert tracker.drain(["a"]) == ([], [])
+
+
+def test_an_incident_opens_then_closes_after_enough_good_results(tracker):
+    tracker.observe("a", at(2), False, True, confirmed=confirmed("failure", 0, 1, 2, detail="HTTP 500"))
+    assert tracker.state_of("a") == OPEN
+    inserts, closes = tracker.drain(["a"])
+    assert inserts == [{"endpoint_id": "a", "start_time": at(0),
+                        "initial_error": f"{INCIDENT_ERROR_MESSAGES['failure']} HTTP 500"}]
+
+    tracker.observe("a", at(3), True, True)
+    assert tracker.state_of("a") == RECOVERING
+    tracker.observe("a", at(4), True, True)
+    assert tracker.state_of("a") == HEALTHY
+    assert tracker.drain(["a"]) == ([], [{"endpoint_id": "a", "start_time": at(0), "end_time": at(3)}])
+
+
+def test_a_bad_result_while_recovering_reopens(tracker):
+    tracker.observe("a", at(2), False, True, confirmed=confirmed("failure", 0, 1, 2))
+    tracker.observe("a", at(3), True, True)
+    tracker.observe("a", at(4), False, True)
+    assert tracker.state_of("a") == OPEN
+    tracker.observe("a", at(5), True, True)
+    tracker.observe("a", at(6), True, True)
+    assert tracker.drain(["a"])[1] == [{"endpoint_id": "a", "start_time": at(0), "end_time": at(5)}]
+
+
+def test_a_latency_incident_only_recovers_on_fast_results(tracker):
+    tracker.observe("a", at(2), True, False, confirmed=confirmed("latency", 0, 1, 2))
+    tracker.observe("a", at(3), is_healthy=True, latency_ok=False)
+    assert tracker.state_of("a") == OPEN
+    # A failure incident ignores latency when recovering
+    tracker.load("b", {"start_time": at(0), "initial_error": INCIDENT_ERROR_MESSAGES["failure"]})
+    tracker.observe("b", at(3), is_healthy=True, latency_ok=False)
+    assert tracker.state_of("b") == RECOVERING
+
+
+def test_an_incident_of_the_other_reason_replaces_the_open_one(tracker):
+    tracker.observe("a", at(2), False, True, confirmed=confirmed("failure", 0, 1, 2))
+    tracker.observe("a", at(5), True, False, confirmed=confirmed("latency", 3, 4, 5))
+    inserts, closes = tracker.drain(["a"])
+    assert [i["start_time"] for i in inserts] == [at(0), at(3)]
+    assert closes == [{"endpoint_id": "a", "start_time": at(0), "end_time": at(3)}]
+    assert tracker.state_of("a") == OPEN
+
+
+def test_state_is_loaded_from_the_open_incident(tracker):
+    tracker.load("a", {"start_time": at(0), "initial_error": f"{INCIDENT_ERROR_MESSAGES['latency']} 3 of 3"})
+    assert tracker.state_of("a") == OPEN
+    assert tracker._states["a"].reason == "latency"
+    assert tracker.latency_rule("a") == "fixed"
+    tracker.load("a", {"start_time": at(0),
+                       "initial_error": f"{INCIDENT_ERROR_MESSAGES['latency']} p95 of the last 20 checks is 900 ms"})
+    assert tracker.latency_rule("a") == "p95"
+    tracker.load("a", None)
+    assert tracker.state_of("a") == HEALTHY
+
+
+def test_incidents_stored_with_the_old_fixed_count_messages_keep_their_reason(tracker):
+    tracker.load("a", {"start_time": at(0), "initial_error": (
+        "The API response time exceeded the expected performance threshold for three consecutive checks, "
+        "suggesting performance degradation or server slowdown.")})
+    assert tracker._states["a"].reason == "latency"
+    assert tracker.latency_rule("a") == "fixed"
+    tracker.load("b", {"start_time": at(0), "initial_error": (
+        "The API failed to respond successfully for three consecutive checks, "
+        "indicating a possible outage or functional issue.")})
+    assert tracker._states["b"].reason == "failure"
+
+
+def test_drain_only_takes_the_given_endpoints(tracker):
+    tracker.observe("a", at(2), False, True, confirmed=confirmed("failure", 0, 1, 2), partition=0)
+    tracker.observe("b", at(2), False, True, confirmed=confirmed("failure", 0, 1, 2), partition=1)
+    assert [i["endpoint_id"] for i in tracker.drain(["a"])[0]] == ["a"]
+    # Another partition's session rolling back must not lose b's incident
+    tracker.forget(["a"])
+    assert [i["endpoint_id"] for i in tracker.drain(["b"])[0]] == ["b"]
+    assert tracker.drain(["a", "b"]) == ([], [])
+
+
+def test_forget_and_revoke_drop_state_and_queued_writes(tracker):
+    tracker.observe("a", at(2), False, True, confirmed=confirmed("failure", 0, 1, 2), partition=0)
+    tracker.observe("b", at(2), False, True, confirmed=confirmed("failure", 0, 1, 2), partition=1)
+    tracker.observe("c", at(0), False, True, partition=1)
+    tracker.forget(["a"])
+    assert tracker.state_of("a") == HEALTHY
+    assert [i["endpoint_id"] for i in tracker.drain(["a", "b"])[0]] == ["b"]
+
+    tracker.revoke([1])
+    assert tracker.counts() == {}
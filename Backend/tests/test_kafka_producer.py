@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timezone
+from uuid import uuid4
+import pytest
+from aiokafka.errors import KafkaConnectionError, MessageSizeTooLargeError
+from app.core.config import Config
+from app.infrastructure.kafka.producer import KafkaProducerClient
+from app.schemas.service import ProducerResultModal
+
+
+class DeadBrokerProducer:
+    """aiokafka stand-in whose deliveries fail as if the broker went away."""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, topic, value, key=None):
+        self.sent += 1
+        future = asyncio.get_running_loop().create_future()
+        future.set_exception(KafkaConnectionError("broker gone"))
+        return future
+
+
+class OversizedRecordProducer:
+    """aiokafka stand-in that rejects records with a `too_big` key for good and delivers the rest."""
+
+    def __init__(self, too_big: bytes):
+        self.too_big = too_big
+        self.delivered = []
+
+    async def send(self, topic, value, key=None):
+        future = asyncio.get_running_loop().create_future()
+        if key == self.too_big:
+            future.set_exception(MessageSizeTooLargeError("record too large"))
+        else:
+            self.delivered.append(key)
+            future.set_result(None)
+        return future
+
+
+@pytest.fixture
+async def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "KAFKA_SPILL_DIR", str(tmp_path))
+    client = KafkaProducerClient()
+    client.producer = DeadBrokerProducer()
+    client.is_connected = True
+    yield client
+    await asyncio.to_thread(client.spill.close)
+
+
+def result():
+    return ProducerResultModal(id=uuid4(), checked_at=datetime.now(timezone.utc), is_healthy=True)
+
+
+async def test_a_lost_broker_hands_over_to_the_spill_log(client):
+    service = result()
+    await client._publish_batch([service, service.model_copy(), result()])
+    assert not client.is_connected  # the replay loop reconnects from here
+    assert client.spill.stats["backlog_records"] == 3
+    assert client.producer.sent == 2  # the repeated key was not sent after its first record failed
+
+    await client._publish_batch([result()])
+    assert client.producer.sent == 2  # later batches go straight to disk
+    assert client.spill.stats["backlog_records"] == 4
+
+
+async def test_a_record_kafka_never_takes_does_not_block_the_spill_log(client):
+    bad, good = result(), result()
+    client.spill.open()
+    for service in (bad, good, bad.model_copy()):
+        await client.spill.append(*client._to_record(service))
+    client.producer = OversizedRecordProducer(str(bad.id).encode())
+
+    assert await client.replay_spill() == 1
+    assert not client.spill.has_backlog
+    assert client.producer.delivered == [str(good.id).encode()]
+    assert client.publish_stats["rejected"] == 2
+
+    # New results go to Kafka again instead of queuing behind the rejected ones on disk
+    await client._publish_batch([bad.model_copy(), result()])
+    assert len(client.producer.delivered) == 2
+    assert client.publish_stats["rejected"] == 3
+    assert not client.spill.has_backlog
@@ -0,0 +1,79 @@
+import uuid
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import text
+from app.services.log_partitions import DEFAULT_PARTITION, LogPartitionManager, _parse_bound
+
+
+def test_week_partitions_start_on_monday():
+    manager = LogPartitionManager(interval="week", premake_days=7, retention_days=0)
+    assert manager.period_start(date(2026, 10, 16)) == date(2026, 10, 12)
+    assert manager.partition_name(date(2026, 10, 12)) == "health_check_logs_p20261012"
+
+
+def test_bounds_parse_open_ends():
+    assert _parse_bound("MINVALUE") == datetime.min
+    assert _parse_bound("MAXVALUE") == datetime.max
+    assert _parse_bound("'2026-10-16 00:00:00'") == datetime(2026, 10, 16)
+
+
+async def _endpoint(session) -> str:
+    user_id = (await session.execute(text(
+        "INSERT INTO users (full_name, email, password) VALUES ('Partition test', :email, 'x') RETURNING id;"
+    ), {"email": f"partition-test-{uuid.uuid4()}@example.invalid"})).scalar()
+    return (await session.execute(text(
+        "INSERT INTO monitored_endpoints (name, url, expected_status_code, owner_user_id) "
+        "VALUES ('partition-test', 'https://example.invalid/', 200, :user_id) RETURNING id;"
+    ), {"user_id": user_id})).scalar()
+
+
+async def _manager(session) -> LogPartitionManager:
+    manager = LogPartitionManager(interval="day", premake_days=1, retention_days=0)
+    if not await manager.is_partitioned(session):
+        pytest.skip("health_check_logs is not partitioned; run the migrations")
+    return manager
+
+
+async def test_rows_stranded_in_the_default_partition_are_moved(pg_session):
+    manager = await _manager(pg_session)
+    # Far enough ahead that no partition exists yet, so the rows land in the default partition
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=4000)
+    endpoint_id = await _endpoint(pg_session)
+    await pg_session.execute(text(
+        "INSERT INTO health_check_logs (endpoint_id, checked_at, is_healthy, response_time_ms, status_code) "
+        "SELECT :endpoint_id, CAST(:day AS timestamp) + g * interval '1 hour', true, 100, 200 "
+        "FROM generate_series(0, 2) g;"
+    ), {"endpoint_id": endpoint_id, "day": day})
+
+    created = await manager.ensure_partitions(pg_session, day)
+
+    name = manager.partition_name(day.date())
+    assert name in created
+    assert manager.stats["moved_rows"] == 3
+    homes = (await pg_session.execute(text(
+        "SELECT DISTINCT tableoid::regclass::text FROM health_check_logs WHERE endpoint_id = :endpoint_id;"
+    ), {"endpoint_id": endpoint_id})).scalars().all()
+    assert homes == [name]
+    default = (await pg_session.execute(text(
+        "SELECT count(*) FROM pg_inherits WHERE inhrelid = to_regclass(:default);"
+    ), {"default": DEFAULT_PARTITION})).scalar()
+    assert default == 1  # reattached
+
+
+async def test_one_failing_partition_does_not_stop_the_others(pg_session, monkeypatch):
+    manager = await _manager(pg_session)
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=5000)
+    failing = manager.partition_name(day.date())
+    create_partition = manager.create_partition
+
+    async def create_or_fail(session, name, lower, upper):
+        if name == failing:
+            await session.execute(text("SELECT 1 / 0;"))
+        await create_partition(session, name, lower, upper)
+
+    monkeypatch.setattr(manager, "create_partition", create_or_fail)
+    created = await manager.ensure_partitions(pg_session, day)
+
+    assert failing not in created
+    assert manager.partition_name((day + timedelta(days=1)).date()) in created
+    assert manager.stats["failed"] == 1
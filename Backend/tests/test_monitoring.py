@@ -0,0 +1,91 @@
+import asyncio
+from uuid import uuid4
+import pytest
+from app.infrastructure.clients.host_guard import CircuitBreaker, host_guard
+from app.schemas.service import ApiProducerServiceModal
+from app.services.monitoring import Producer
+
+
+class RecordingPublisher:
+    def __init__(self):
+        self.results = []
+
+    async def publish(self, result):
+        self.results.append(result)
+
+
+@pytest.fixture
+def producer():
+    producer = Producer()
+    producer.publisher = RecordingPublisher()
+    producer.consumer_writes_logs = True  # keep log rows out of the batched DB writer
+    return producer
+
+
+@pytest.fixture
+def open_circuit():
+    host = f"{uuid4().hex}.example.com"
+    breaker = host_guard.breaker(host)
+    breaker.state = CircuitBreaker.OPEN
+    breaker.opened_at = float("inf")
+    return host
+
+
+async def test_a_short_circuited_check_is_skipped_without_a_confirmation_burst(producer, open_circuit):
+    service = ApiProducerServiceModal(id=uuid4(), name="api", url=f"https://{open_circuit}/health")
+    assert await producer._guarded_check(service, producer._semaphore) is None
+
+    [result] = producer.publisher.results
+    assert result.skipped and result.is_healthy is False and result.response_time_ms is None
+    assert not producer._confirming
+
+    # A recheck that hits the open circuit is neither recorded nor counted as a confirmation
+    assert await producer._guarded_check(service, producer._recheck_semaphore, attempt=1) is None
+    assert len(producer.publisher.results) == 1
+
+
+async def test_checks_queued_behind_a_host_short_circuit_once_its_circuit_opens(producer, monkeypatch):
+    host = f"{uuid4().hex}.example.com"
+    monkeypatch.setattr(host_guard, "max_per_host", 1)
+    breaker = host_guard.breaker(host)
+    release = asyncio.Event()
+    calls = []
+
+    async def check_service(service, attempt=0):
+        calls.append(service.id)
+        await release.wait()
+        return None, None  # connection-level failure
+
+    monkeypatch.setattr(producer, "check_service", check_service)
+    monkeypatch.setattr(breaker, "failure_threshold", 1)
+    services = [ApiProducerServiceModal(id=uuid4(), name="api", url=f"https://{host}/health") for _ in range(3)]
+    checks = [asyncio.create_task(producer._guarded_check(service, producer._semaphore)) for service in services]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*checks)
+
+    assert calls == [services[0].id]  # the failure opened the circuit before the others got the host slot
+    assert [result.id for result in producer.publisher.results] == [services[1].id, services[2].id]
+    assert all(result.skipped for result in producer.publisher.results)
+
+
+async def test_a_cancelled_probe_does_not_leave_the_circuit_half_open(producer, open_circuit, monkeypatch):
+    breaker = host_guard.breaker(open_circuit)
+    breaker.opened_at = 0.0  # the probe is due
+    started = asyncio.Event()
+
+    async def check_service(service, attempt=0):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(producer, "check_service", check_service)
+    service = ApiProducerServiceModal(id=uuid4(), name="api", url=f"https://{open_circuit}/health")
+    probe = asyncio.create_task(producer._guarded_check(service, producer._semaphore))
+    await started.wait()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow()  # the next check probes right away
@@ -0,0 +1,136 @@
+"""
+Query-plan regression check for the hot health_check_logs and incidents reads.
+
+Needs a migrated PostgreSQL database (PG* settings); skipped otherwise.
+Seeds a user, endpoints, a day of checks per endpoint and a history of
+incidents, then runs the ApiService queries that sit on the hot path. Each
+statement is EXPLAINed before it runs, and the test fails if any plan
+reads a populated health_check_logs partition or incidents with a
+sequential scan instead of an index. Everything is rolled back.
+"""
+import json
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app.services.log_partitions import log_partitions
+from app.services.service import ApiService
+
+HOT_TABLES = ("health_check_logs", "incidents")
+ENDPOINTS = 200
+CHECKS = 288  # per endpoint over the last day
+INCIDENTS = 20  # per endpoint
+
+
+class PlanRecorder:
+    """Session stand-in that EXPLAINs every statement before running it; commit and rollback are left to the test."""
+
+    def __init__(self, session):
+        self.session = session
+        self.label = None
+        self.plans = []
+
+    async def execute(self, statement, params=None):
+        explain = text("EXPLAIN (FORMAT JSON) " + statement.text)
+        plan = (await self.session.execute(explain, params)).scalar()
+        self.plans.append((self.label, statement.text, json.loads(plan) if isinstance(plan, str) else plan))
+        return await self.session.execute(statement, params)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def scans(node):
+    """Yield (node type, relation) for every scan node of an EXPLAIN JSON plan."""
+    if "Relation Name" in node:
+        yield node["Node Type"], node["Relation Name"]
+    for child in node.get("Plans", []):
+        yield from scans(child)
+
+
+async def seed(session, now):
+    user_id = (await session.execute(text("""
+        INSERT INTO users (full_name, email, password)
+        VALUES ('Plan check', :email, 'x')
+        RETURNING id;
+    """), {"email": f"plan-check-{uuid.uuid4()}@example.invalid"})).scalar()
+
+    await session.execute(text("""
+        INSERT INTO monitored_endpoints (name, url, expected_status_code, owner_user_id)
+        SELECT 'plan-check-' || g, 'https://example.invalid/' || g, 200, :user_id
+        FROM generate_series(1, :endpoints) g;
+    """), {"user_id": user_id, "endpoints": ENDPOINTS})
+
+    await session.execute(text("""
+        INSERT INTO health_check_logs (endpoint_id, checked_at, is_healthy, response_time_ms, status_code)
+        SELECT me.id, CAST(:now AS timestamp) - g * CAST(:spacing AS integer) * interval '1 second',
+               random() > 0.05, (50 + random() * 500)::int, 200
+        FROM monitored_endpoints me, generate_series(0, :checks - 1) g
+        WHERE me.owner_user_id = :user_id;
+    """), {"now": now, "spacing": 86400 // CHECKS, "checks": CHECKS, "user_id": user_id})
+
+    await session.execute(text("""
+        INSERT INTO incidents (endpoint_id, start_time, end_time, initial_error)
+        SELECT me.id, CAST(:now AS timestamp) - g * interval '1 hour',
+               CAST(:now AS timestamp) - g * interval '1 hour' + interval '5 minutes', 'API is not working'
+        FROM monitored_endpoints me, generate_series(1, :incidents) g
+        WHERE me.owner_user_id = :user_id;
+    """), {"now": now, "incidents": INCIDENTS, "user_id": user_id})
+
+    for table in ("monitored_endpoints", "health_check_logs", "incidents"):
+        await session.execute(text(f"ANALYZE {table};"))
+
+    endpoint_ids = (await session.execute(
+        text("SELECT id FROM monitored_endpoints WHERE owner_user_id = :user_id;"), {"user_id": user_id}
+    )).scalars().all()
+    populated = (await session.execute(
+        text("SELECT DISTINCT tableoid::regclass::text FROM health_check_logs;")
+    )).scalars().all()
+    return str(user_id), [str(i) for i in endpoint_ids], set(populated) | {"incidents"}
+
+
+async def run_queries(recorder, user_id, endpoint_ids, now):
+    service = ApiService()
+    endpoint_id = endpoint_ids[0]
+    calls = [
+        ("get_services", lambda: service.get_services(user_id, recorder)),
+        ("get_service_detail_by_id", lambda: service.get_service_detail_by_id(user_id, endpoint_id, recorder)),
+        ("get_logs", lambda: service.get_logs(user_id, endpoint_id, recorder)),
+        ("get_incidents_logs", lambda: service.get_incidents_logs(user_id, endpoint_id, recorder)),
+        ("get_recent_records_bulk", lambda: service.get_recent_records_bulk(recorder, endpoint_ids)),
+        ("get_open_incidents", lambda: service.get_open_incidents(recorder, endpoint_ids)),
+        ("get_incidents_since", lambda: service.get_incidents_since(recorder, endpoint_id, now - timedelta(hours=1))),
+        ("createOrUpdateIncident", lambda: service.createOrUpdateIncident(
+            recorder, endpoint_id,
+            [{"checked_at": now - timedelta(minutes=minutes)} for minutes in (0, 1, 2)],
+            "failure",
+        )),
+    ]
+    for label, call in calls:
+        recorder.label = label
+        await call()
+
+
+async def test_hot_path_statements_use_index_scans(pg_session):
+    now = datetime.utcnow().replace(microsecond=0)
+    if await log_partitions.is_partitioned(pg_session):
+        await log_partitions.ensure_partitions(pg_session, now)
+    user_id, endpoint_ids, populated = await seed(pg_session, now)
+    recorder = PlanRecorder(pg_session)
+    await run_queries(recorder, user_id, endpoint_ids, now)
+
+    checked = set()
+    failures = []
+    for label, statement, plan in recorder.plans:
+        hot = [(node, relation) for node, relation in scans(plan[0]["Plan"]) if relation.startswith(HOT_TABLES)]
+        if not hot:
+            continue
+        checked.add(label)
+        seq = [relation for node, relation in hot if node == "Seq Scan" and relation in populated]
+        if seq:
+            failures.append(f"{label} scans {', '.join(seq)} sequentially:\n{statement.strip()}")
+
+    assert checked, "no hot-path statement touched health_check_logs or incidents"
+    assert not failures, "\n\n".join(failures)
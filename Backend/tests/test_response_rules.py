@@ -0,0 +1,133 @@
+import pytest
+from app.core.exceptions import ValidationRuleError
+from app.utils.response_rules import NO_JSON, compile_rules
+
+BODY = {"status": "ok", "data": {"count": 3, "items": [{"id": 7, "name": "a"}]}}
+
+
+@pytest.mark.parametrize("spec", [None, {}, {"json_path": []}, '{"headers": {}}'])
+def test_nothing_to_check_compiles_to_none(spec):
+    assert compile_rules(spec) is None
+
+
+@pytest.mark.parametrize("spec", [
+    "not json",
+    ["json_path"],
+    {"unknown": []},
+    {"json_path": [{"equals": 1}]},
+    {"json_path": [{"path": "a", "regex": "("}]},
+    {"body_regex": [{"negate": True}]},
+    {"headers": {"x": {"regex": "["}}},
+    {"schema": {"type": "decimal"}},
+    {"headers": ["x"]},
+    {"json_path": {"path": "a"}},
+    {"json_path": [{"path": "a", "in": 5}]},
+    {"json_path": [{"path": "a", "min": "1"}]},
+    {"body_regex": {"pattern": "ok"}},
+    {"schema": {"type": 5}},
+    {"schema": {"type": ["string", ["null"]]}},
+    {"schema": {"required": "status"}},
+    {"schema": {"required": [1]}},
+    {"schema": {"enum": "ok"}},
+    {"schema": {"properties": ["status"]}},
+    {"schema": {"properties": {"status": "string"}}},
+    {"schema": {"minLength": "3"}},
+])
+def test_invalid_rules_are_rejected(spec):
+    with pytest.raises(ValidationRuleError):
+        compile_rules(spec)
+
+
+def test_json_path_assertions():
+    validator = compile_rules({"json_path": [
+        {"path": "$.status", "equals": "ok"},
+        {"path": "data.items[0].id", "in": [7, 8]},
+        {"path": "data.items.0.name", "regex": "^a$"},
+        {"path": "data.count", "min": 1, "max": 5},
+        {"path": "data.error", "exists": False},
+    ]})
+    assert validator.needs_json and not validator.needs_text
+    assert validator.validate({}, BODY) == []
+
+    failing = {"status": "down", "data": {"count": 9, "items": [], "error": "boom"}}
+    assert validator.validate({}, failing) == [
+        "$.status is 'down', expected 'ok'",
+        "data.items[0].id is missing",
+        "data.items.0.name is missing",
+        "data.count is 9, expected <= 5",
+        "data.error should not exist",
+    ]
+
+
+def test_json_rules_fail_when_the_body_is_not_json():
+    validator = compile_rules({"json_path": [{"path": "status"}]})
+    assert validator.validate({}, NO_JSON) == ["response body is not valid JSON (or exceeded the capture limit)"]
+
+
+def test_schema_subset():
+    validator = compile_rules({"schema": {
+        "type": "object",
+        "required": ["status"],
+        "properties": {
+            "status": {"enum": ["ok", "degraded"]},
+            "data": {"type": "object", "properties": {
+                "items": {"type": "array", "minItems": 1, "items": {"type": "object", "required": ["id"]}},
+            }},
+        },
+    }})
+    assert validator.validate({}, BODY) == []
+    assert validator.validate({}, {"status": "gone"}) == ["schema: $.status is 'gone', expected one of ['ok', 'degraded']"]
+    assert validator.validate({}, {"status": "ok", "data": {"items": [{}]}}) == ["schema: $.data.items[].id is required"]
+    assert validator.validate({}, []) == ["schema: $ is not of type 'object'"]
+
+
+def test_body_regex_and_negation():
+    validator = compile_rules({"body_regex": ['"healthy":\\s*true', {"pattern": "error", "negate": True}]})
+    assert validator.needs_text and not validator.needs_json
+    assert validator.validate({}, body_text='{"healthy": true}') == []
+    assert validator.validate({}, body_text='{"healthy": false, "error": 1}') == [
+        "body does not match '\"healthy\":\\\\s*true'",
+        "body matches 'error'",
+    ]
+
+
+def test_a_single_body_regex_string_is_one_pattern():
+    validator = compile_rules({"body_regex": "ok"})
+    assert len(validator.body_checks) == 1
+    assert validator.validate({}, body_text="all ok") == []
+    assert validator.validate({}, body_text="o k") == ["body does not match 'ok'"]
+
+
+def test_header_rules():
+    validator = compile_rules({"headers": {
+        "Content-Type": {"regex": "^application/json"},
+        "X-Served-By": "edge",
+        "X-Debug": {"exists": False},
+        "ETag": {},
+    }})
+    headers = {"content-type": "application/json; charset=utf-8", "x-served-by": "edge", "etag": "1"}
+    assert validator.validate(headers) == []
+    assert validator.validate({"content-type": "text/html", "x-debug": "1"}) == [
+        "expected header Content-Type to match '^application/json', got 'text/html'",
+        "expected header X-Served-By to equal 'edge', got None",
+        "header X-Debug should not be present",
+        "expected header ETag to be present, got None",
+    ]
+
+
+@pytest.mark.parametrize("rules", [{"expect": "ok"}, {"headers": ["x"]}])
+def test_stored_rules_that_do_not_compile_are_ignored(rules, monkeypatch):
+    from uuid import uuid4
+    from app.schemas.service import ApiProducerServiceModal
+    from app.services import response_validation
+
+    service = ApiProducerServiceModal(id=uuid4(), name="legacy", url="https://example.com",
+                                      response_validation=rules)
+    assert response_validation.ValidatorCache().get(service) is None
+
+    def broken(spec):
+        raise AttributeError("'list' object has no attribute 'items'")
+
+    # Whatever compiling a stored row raises, the check goes ahead without rules
+    monkeypatch.setattr(response_validation, "compile_rules", broken)
+    assert response_validation.ValidatorCache().get(service) is None
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from app.services.result_window import EndpointWindow, ResultWindows
+
+T0 = datetime(2026, 1, 1)
+
+
+def at(seconds: int) -> datetime:
+    return T0 + timedelta(seconds=seconds)
+
+
+def test_the_window_keeps_the_newest_results_newest_first():
+    window = EndpointWindow(capacity=3)
+    for n in range(5):
+        assert window.add(at(n), n * 10, 200, True)
+    assert window.size == 3
+    assert [record["response_time_ms"] for record in window.recent(10)] == [40, 30, 20]
+    assert window.recent(1)[0]["checked_at"] == at(4)
+
+
+def test_missing_values_read_back_as_none():
+    window = EndpointWindow(capacity=2)
+    window.add(at(0), None, None, False)
+    assert window.recent(1) == [{"checked_at": at(0), "response_time_ms": None, "status_code": None,
+                                 "is_healthy": False}]
+
+
+def test_results_that_are_not_newer_are_ignored():
+    window = EndpointWindow(capacity=3)
+    window.add(at(5), 1, 200, True)
+    assert not window.add(at(5), 2, 200, True)
+    assert not window.add(at(4), 3, 200, True)
+    assert [record["response_time_ms"] for record in window.recent(3)] == [1]
+
+
+def test_least_recently_used_windows_are_evicted():
+    windows = ResultWindows(capacity=2, max_endpoints=2)
+    windows.get("a")
+    windows.get("b")
+    windows.get("a")
+    windows.get("c")
+    assert "b" not in windows
+    assert windows.missing(["a", "b", "c"]) == ["b"]
+    assert windows.stats["evicted"] == 1
+
+
+def test_warm_seeds_from_rows_newest_first():
+    windows = ResultWindows(capacity=5, max_endpoints=10)
+    rows = [{"checked_at": at(n), "response_time_ms": n, "status_code": 200, "is_healthy": 1} for n in (3, 2, 1)]
+    windows.warm("a", rows, partition=0)
+    assert [record["response_time_ms"] for record in windows.get("a").recent(5)] == [3, 2, 1]
+
+
+def test_revoke_drops_the_windows_of_revoked_partitions_only():
+    windows = ResultWindows(capacity=2, max_endpoints=10)
+    windows.get("a", partition=0)
+    windows.get("b", partition=1)
+    windows.get("c", partition=1)
+    windows.revoke([1])
+    assert len(windows) == 1 and "a" in windows
+    assert windows.stats["revoked"] == 2
+
+    windows.forget(["a"])
+    assert len(windows) == 0
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from app.core.config import Config
+from app.infrastructure.kafka.spill import SpillLog
+
+RECORD_BYTES = 10 + 2 + 8  # header + key + value of the records below
+
+
+def record(n: int):
+    return b"k%d" % (n % 10), b"value%03d" % n
+
+
+@pytest.fixture
+def spill_config(monkeypatch):
+    monkeypatch.setattr(Config, "KAFKA_SPILL_SEGMENT_BYTES", RECORD_BYTES * 4)
+    monkeypatch.setattr(Config, "KAFKA_SPILL_MAX_BYTES", RECORD_BYTES * 1000)
+    monkeypatch.setattr(Config, "KAFKA_SPILL_FSYNC_EVERY", 3)
+
+
+@pytest.fixture
+async def spill(tmp_path, spill_config):
+    log = SpillLog(str(tmp_path))
+    yield log
+    await asyncio.to_thread(log.close)
+
+
+async def test_records_replay_in_append_order_across_segments(spill):
+    for n in range(10):
+        await spill.append(*record(n))
+    assert spill.stats["backlog_records"] == 10
+    assert spill.stats["backlog_bytes"] == 10 * RECORD_BYTES
+    assert len(spill._segments()) == 3
+
+    records, position = await spill.read_batch(100)
+    assert records == [record(n) for n in range(10)]
+    await spill.commit(position)
+    assert not spill.has_backlog
+    assert spill.stats["replayed"] == 10
+    assert len(spill._segments()) == 1  # replayed segments are deleted
+
+
+async def test_uncommitted_reads_are_read_again(spill):
+    for n in range(6):
+        await spill.append(*record(n))
+    first, _ = await spill.read_batch(4)
+    again, position = await spill.read_batch(4)
+    assert first == again == [record(n) for n in range(4)]
+
+    await spill.commit(position)
+    rest, _ = await spill.read_batch(4)
+    assert rest == [record(4), record(5)]
+    assert spill.stats["backlog_records"] == 2
+
+
+async def test_the_cursor_survives_a_restart(tmp_path, spill_config):
+    log = SpillLog(str(tmp_path))
+    for n in range(6):
+        await log.append(*record(n))
+    _, position = await log.read_batch(3)
+    await log.commit(position)
+    await asyncio.to_thread(log.close)
+
+    reopened = SpillLog(str(tmp_path))
+    await asyncio.to_thread(reopened.open)
+    try:
+        assert reopened.stats["backlog_records"] == 3
+        records, _ = await reopened.read_batch(100)
+        assert records == [record(n) for n in range(3, 6)]
+    finally:
+        await asyncio.to_thread(reopened.close)
+
+
+async def test_a_torn_tail_write_is_ignored(tmp_path, spill_config):
+    log = SpillLog(str(tmp_path))
+    await log.append(*record(0))
+    await log.append(*record(1))
+    await asyncio.to_thread(log.close)
+    segment = log._segment_path(log._active_seq)
+    segment.write_bytes(segment.read_bytes()[:-3])
+
+    reopened = SpillLog(str(tmp_path))
+    try:
+        records, _ = await reopened.read_batch(100)
+        assert records == [record(0)]
+    finally:
+        await asyncio.to_thread(reopened.close)
+
+
+async def test_oldest_segments_are_dropped_over_the_size_limit(tmp_path, monkeypatch, spill_config):
+    monkeypatch.setattr(Config, "KAFKA_SPILL_MAX_BYTES", RECORD_BYTES * 6)
+    log = SpillLog(str(tmp_path))
+    try:
+        for n in range(12):
+            await log.append(*record(n))
+        assert log.stats["backlog_bytes"] <= RECORD_BYTES * 6
+        assert log.stats["dropped"] == 8
+
+        records, _ = await log.read_batch(100)
+        assert records == [record(n) for n in range(8, 12)]
+    finally:
+        await asyncio.to_thread(log.close)
+
+
+async def test_appends_after_a_corrupt_tail_are_replayed(tmp_path, spill_config):
+    log = SpillLog(str(tmp_path))
+    await log.append(*record(0))
+    await asyncio.to_thread(log.close)
+    segment = log._segment_path(log._active_seq)
+    segment.write_bytes(segment.read_bytes() + b"\x05\x00")
+
+    reopened = SpillLog(str(tmp_path))
+    try:
+        await asyncio.to_thread(reopened.open)
+        assert reopened.stats["backlog_bytes"] == RECORD_BYTES
+        await reopened.append(*record(1))
+        records, _ = await reopened.read_batch(100)
+        assert records == [record(0), record(1)]
+    finally:
+        await asyncio.to_thread(reopened.close)
@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from app.services import threshold_cache
+from app.services.threshold_cache import ThresholdCache
+
+
+class SlowDetails:
+    """Stands in for get_consumer_details_bulk; each call waits until released."""
+
+    def __init__(self):
+        self.version = 1
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, session, endpoint_ids):
+        self.calls += 1
+        version = self.version
+        self.started.set()
+        await self.release.wait()
+        return {endpoint_id: {"version": version} for endpoint_id in endpoint_ids if endpoint_id != "gone"}
+
+
+@pytest.fixture
+def details(monkeypatch):
+    details = SlowDetails()
+    monkeypatch.setattr(threshold_cache.api_service, "get_consumer_details_bulk", details)
+    return details
+
+
+async def test_rows_and_misses_are_cached(details):
+    cache = ThresholdCache(ttl_s=60)
+    details.release.set()
+    assert await cache.get_many(None, ["a", "gone"]) == {"a": {"version": 1}}
+    assert await cache.get_many(None, ["a", "gone"]) == {"a": {"version": 1}}
+    assert details.calls == 1
+    assert cache.stats["hits"] == 2
+
+
+@pytest.mark.parametrize("change", ["invalidate", "clear"])
+async def test_a_change_during_the_load_is_not_cached(details, change):
+    cache = ThresholdCache(ttl_s=60)
+    loading = asyncio.create_task(cache.get_many(None, ["a", "b"]))
+    await details.started.wait()
+
+    # The endpoint is edited (NOTIFY) while the query is still running
+    details.version = 2
+    if change == "invalidate":
+        cache.invalidate("a")
+    else:
+        cache.clear()
+    details.release.set()
+    assert (await loading)["a"] == {"version": 1}
+
+    assert (await cache.get(None, "a")) == {"version": 2}
+    assert details.calls == 2
+    assert cache.stats["stale_loads"] == (1 if change == "invalidate" else 2)
+    assert not cache._invalidated_at
+
+
+async def test_invalidations_before_the_load_do_not_block_caching(details):
+    cache = ThresholdCache(ttl_s=60)
+    cache.invalidate("a")
+    details.release.set()
+    await cache.get_many(None, ["a"])
+    await cache.get_many(None, ["a"])
+    assert details.calls == 1
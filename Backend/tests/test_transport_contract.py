@@ -0,0 +1,339 @@
+"""
+Delivery contract every result transport provides (see
+app.infrastructure.transport.base), run against each backend.
+
+The in-memory transport always runs. Redis Streams and Kafka run when a
+server is configured and reachable, on stream/topic names of their own
+that are removed afterwards:
+
+    REDIS_HOST=localhost python -m pytest tests/test_transport_contract.py
+    KAFKA_BROKER_URL=localhost:9092 python -m pytest tests/test_transport_contract.py
+"""
+import asyncio
+import os
+import socket
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+from uuid import uuid4
+import pytest
+from app.core.config import Config
+from app.infrastructure.transport.base import ResultConsumer, ResultPublisher
+
+PARTITIONS = 4
+MAX_RECORDS = 40  # per consumed batch, so a backlog takes several batches
+PUBLISH_BATCH = 10
+MEMORY_MAX_PENDING = 32
+TIMEOUT_S = 30.0
+
+
+def _reachable(host: str, port: int) -> bool:
+    try:
+        socket.create_connection((host, port), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+def _skip_unless_reachable(variable: str, default_port: int) -> str:
+    address = os.environ.get(variable)
+    if not address:
+        pytest.skip(f"{variable} is not set")
+    host, _, port = address.split(",")[0].partition(":")
+    if not _reachable(host, int(port or default_port)):
+        pytest.skip(f"{address} is not reachable")
+    return address
+
+
+class MemoryHarness:
+    """Publisher and consumer are the same in-process transport."""
+
+    can_revoke = False
+
+    def __init__(self, monkeypatch, tmp_path):
+        from app.infrastructure.transport.memory import MemoryTransport
+        monkeypatch.setattr(Config, "TRANSPORT_PARTITIONS", PARTITIONS)
+        monkeypatch.setattr(Config, "KAFKA_CONSUMER_MAX_RECORDS", MAX_RECORDS)
+        monkeypatch.setattr(Config, "MEMORY_TRANSPORT_MAX_PENDING", MEMORY_MAX_PENDING)
+        self.transport = MemoryTransport()
+        self.max_buffered = MEMORY_MAX_PENDING
+
+    async def publisher(self) -> ResultPublisher:
+        await self.transport.connect()
+        return self.transport
+
+    async def consumer(self) -> ResultConsumer:
+        return self.transport
+
+    def buffered(self, publisher) -> int:
+        return publisher.pending
+
+    async def close(self):
+        await self.transport.close()
+
+
+class RedisHarness:
+    """Every publisher and consumer is its own client and group member."""
+
+    can_revoke = True
+
+    def __init__(self, monkeypatch, tmp_path):
+        from app.infrastructure.transport.redis_streams import RedisStreamsTransport
+        _skip_unless_reachable("REDIS_HOST", 6379)
+        self.stream = f"test-results-{uuid4().hex}"
+        monkeypatch.setattr(Config, "REDIS_STREAM_NAME", self.stream)
+        monkeypatch.setattr(Config, "REDIS_STREAM_LEASE_S", 1.5)
+        monkeypatch.setattr(Config, "TRANSPORT_PARTITIONS", PARTITIONS)
+        monkeypatch.setattr(Config, "KAFKA_CONSUMER_MAX_RECORDS", MAX_RECORDS)
+        monkeypatch.setattr(Config, "KAFKA_PUBLISH_BATCH_SIZE", PUBLISH_BATCH)
+        self.transport_class = RedisStreamsTransport
+        self.transports = []
+        self.max_buffered = PUBLISH_BATCH
+
+    async def _connect(self, role: str):
+        transport = self.transport_class()
+        transport.consumer_name = f"{transport.consumer_name}-{role}-{len(self.transports)}"
+        self.transports.append(transport)
+        await transport.connect()
+        return transport
+
+    async def publisher(self) -> ResultPublisher:
+        return await self._connect("publisher")
+
+    async def consumer(self) -> ResultConsumer:
+        return await self._connect("consumer")
+
+    def buffered(self, publisher) -> int:
+        return len(publisher.publisher)
+
+    async def close(self):
+        import redis.asyncio as redis
+        from app.infrastructure.transport.redis_streams import redis_url
+        for transport in self.transports:
+            await transport.close()
+        client = redis.from_url(redis_url())
+        keys = [key async for key in client.scan_iter(f"{self.stream}:*")]
+        if keys:
+            await client.delete(*keys)
+        await client.aclose()
+
+
+class KafkaHarness:
+    """A topic and consumer group of its own; the producer spills to a temporary directory."""
+
+    can_revoke = True
+
+    def __init__(self, monkeypatch, tmp_path):
+        from app.infrastructure.kafka.consumer import KafkaConsumerClient
+        from app.infrastructure.kafka.producer import KafkaProducerClient
+        _skip_unless_reachable("KAFKA_BROKER_URL", 9092)
+        self.topic = f"test-results-{uuid4().hex}"
+        monkeypatch.setattr(Config, "KAFKA_TOPIC_NAME", self.topic)
+        monkeypatch.setattr(Config, "KAFKA_TOPIC_PARTITIONS", PARTITIONS)
+        monkeypatch.setattr(Config, "KAFKA_CONSUMER_GROUP_ID", f"test-group-{uuid4().hex}")
+        monkeypatch.setattr(Config, "KAFKA_SPILL_DIR", str(tmp_path / "spill"))
+        monkeypatch.setattr(Config, "KAFKA_CONSUMER_MAX_RECORDS", MAX_RECORDS)
+        monkeypatch.setattr(Config, "KAFKA_PUBLISH_BATCH_SIZE", PUBLISH_BATCH)
+        self.producer_class = KafkaProducerClient
+        self.consumer_class = KafkaConsumerClient
+        self.clients = []
+        self.max_buffered = PUBLISH_BATCH
+
+    async def publisher(self) -> ResultPublisher:
+        producer = self.producer_class()
+        self.clients.append(producer)
+        await producer.connect()
+        return producer
+
+    async def consumer(self) -> ResultConsumer:
+        consumer = self.consumer_class()
+        self.clients.append(consumer)
+        await consumer.connect()
+        return consumer
+
+    def buffered(self, publisher) -> int:
+        return len(publisher.publisher)
+
+    async def close(self):
+        from aiokafka.admin import AIOKafkaAdminClient
+        for client in self.clients:
+            await client.close()
+        admin = AIOKafkaAdminClient(bootstrap_servers=Config.KAFKA_BROKER_URL)
+        await admin.start()
+        try:
+            await admin.delete_topics([self.topic])
+        finally:
+            await admin.close()
+
+
+HARNESSES = {"memory": MemoryHarness, "redis": RedisHarness, "kafka": KafkaHarness}
+
+
+@pytest.fixture(params=sorted(HARNESSES))
+async def transport(request, monkeypatch, tmp_path):
+    harness = HARNESSES[request.param](monkeypatch, tmp_path)
+    yield harness
+    await harness.close()
+
+
+async def consume(consumer: ResultConsumer, batches, count: int) -> List[Tuple[Any, Dict[str, Any]]]:
+    """Read and commit batches until `count` results arrived; returns (partition, result) in delivery order."""
+    received: List[Tuple[Any, Dict[str, Any]]] = []
+    while len(received) < count:
+        batch = await asyncio.wait_for(batches.__anext__(), TIMEOUT_S)
+        for partition, results in batch.items():
+            received.extend((partition, result) for result in results)
+        await consumer.commit(list(batch))
+    return received
+
+
+async def wait_for_condition(condition, timeout_s: float = TIMEOUT_S):
+    deadline = asyncio.get_running_loop().time() + timeout_s
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.05)
+
+
+def identity(result: Dict[str, Any]) -> Tuple[str, int]:
+    return result["id"], result["response_time_ms"]
+
+
+async def test_each_endpoint_is_delivered_from_one_partition_in_publish_order(transport, make_result):
+    publisher = await transport.publisher()
+    endpoints = [uuid4() for _ in range(5)]
+    for seq in range(6):
+        for endpoint_id in endpoints:
+            await publisher.publish(make_result(endpoint_id, seq))
+
+    consumer = await transport.consumer()
+    batches = consumer.consume_partition_batches()
+    received = await consume(consumer, batches, len(endpoints) * 6)
+
+    partitions = defaultdict(set)
+    order = defaultdict(list)
+    for partition, result in received:
+        partitions[result["id"]].add(partition)
+        order[result["id"]].append(result["response_time_ms"])
+    for endpoint_id in endpoints:
+        assert len(partitions[str(endpoint_id)]) == 1
+        assert order[str(endpoint_id)] == list(range(6))
+    assert consumer.in_flight == 0
+    await batches.aclose()
+
+
+async def test_uncommitted_partitions_are_redelivered_from_their_first_result(transport, make_result):
+    publisher = await transport.publisher()
+    endpoints = [uuid4() for _ in range(8)]
+    for seq in range(3):
+        for endpoint_id in endpoints:
+            await publisher.publish(make_result(endpoint_id, seq))
+    total = len(endpoints) * 3
+
+    consumer = await transport.consumer()
+    batches = consumer.consume_partition_batches()
+    first = await asyncio.wait_for(batches.__anext__(), TIMEOUT_S)
+    handed_out = sum(len(results) for results in first.values())
+    assert consumer.in_flight == handed_out
+
+    committed, *uncommitted = list(first)
+    await consumer.commit([committed])
+    assert consumer.in_flight == handed_out - len(first[committed])
+
+    rest = await consume(consumer, batches, total - len(first[committed]))
+    assert consumer.in_flight == 0
+
+    redelivered = [identity(result) for _, result in rest]
+    assert len(redelivered) == len(set(redelivered))
+    assert not set(map(identity, first[committed])) & set(redelivered)
+    assert set(map(identity, first[committed])) | set(redelivered) == {
+        (str(endpoint_id), seq) for endpoint_id in endpoints for seq in range(3)}
+    for partition in uncommitted:
+        again = [identity(result) for p, result in rest if p == partition]
+        assert again[:len(first[partition])] == [identity(result) for result in first[partition]]
+    await batches.aclose()
+
+
+async def test_commit_of_unknown_or_repeated_partitions_is_a_no_op(transport, make_result):
+    publisher = await transport.publisher()
+    endpoint_id = uuid4()
+    for seq in range(3):
+        await publisher.publish(make_result(endpoint_id, seq))
+
+    consumer = await transport.consumer()
+    batches = consumer.consume_partition_batches()
+    batch = await asyncio.wait_for(batches.__anext__(), TIMEOUT_S)
+    await consumer.commit(list(batch))
+    await consumer.commit(list(batch))
+    await consumer.commit([])
+    assert consumer.in_flight == 0
+
+    await publisher.publish(make_result(endpoint_id, 3))
+    received = await consume(consumer, batches, 1)
+    assert [identity(result) for _, result in received] == [(str(endpoint_id), 3)]
+    await batches.aclose()
+
+
+async def test_revoked_partitions_are_reported_to_the_listener(transport, make_result):
+    if not transport.can_revoke:
+        pytest.skip("the in-memory transport owns every partition of its process")
+
+    publisher = await transport.publisher()
+    for endpoint_id in [uuid4() for _ in range(8)]:
+        await publisher.publish(make_result(endpoint_id, 0))
+
+    async def keep_consuming(consumer, delivered):
+        async for batch in consumer.consume_partition_batches():
+            delivered.extend(batch)
+            await consumer.commit(list(batch))
+
+    first = await transport.consumer()
+    revoked: List[Any] = []
+    first.on_partitions_revoked(revoked.extend)
+    delivered: List[Any] = []
+    tasks = [asyncio.create_task(keep_consuming(first, delivered))]
+    try:
+        await wait_for_condition(lambda: delivered)
+        assert not revoked
+
+        second = await transport.consumer()
+        tasks.append(asyncio.create_task(keep_consuming(second, [])))
+        await wait_for_condition(lambda: revoked)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def test_publish_is_bounded_while_the_consumer_lags(transport, make_result):
+    publisher = await transport.publisher()
+    consumer = await transport.consumer()
+    batches = consumer.consume_partition_batches()
+    endpoint_id = uuid4()
+    count = MEMORY_MAX_PENDING * 3
+    peak = 0
+
+    async def produce():
+        nonlocal peak
+        for seq in range(count):
+            await publisher.publish(make_result(endpoint_id, seq))
+            peak = max(peak, transport.buffered(publisher))
+
+    producing = asyncio.create_task(produce())
+    await asyncio.sleep(0.2)
+    received = await consume(consumer, batches, count)
+    await asyncio.wait_for(producing, TIMEOUT_S)
+
+    assert 0 < peak <= transport.max_buffered
+    assert [result["response_time_ms"] for _, result in received] == list(range(count))
+    await batches.aclose()
+
+
+def test_revoke_listener_only_hears_about_actual_partitions():
+    from app.infrastructure.transport.memory import MemoryTransport
+    consumer = MemoryTransport()
+    revoked: List[Any] = []
+    consumer._notify_revoked([1])  # no listener yet
+    consumer.on_partitions_revoked(revoked.extend)
+    consumer._notify_revoked([])
+    consumer._notify_revoked(iter([2, 3]))
+    assert revoked == [2, 3]